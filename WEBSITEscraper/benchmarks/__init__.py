@@ -0,0 +1,5 @@
+"""
+Offline benchmarks: a generated ESG site and a stub Gemini endpoint served
+locally, so crawler and pipeline performance can be measured and compared
+between runs without touching live sites. Run with `python -m benchmarks.run`.
+"""
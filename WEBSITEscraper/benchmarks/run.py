@@ -0,0 +1,390 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List
+
+from rich.console import Console
+from rich.table import Table
+
+from src.core.browser import browser_manager
+from src.core.cache import http_cache
+from src.core.config import settings
+from src.core.fetcher import fetch_tier
+from src.core.metrics import metrics
+from src.core.scheduler import host_scheduler
+from src.engine.crawler import Crawler
+from src.pipeline.extractor import Extractor
+from src.pipeline.llm_cache import llm_cache
+from src.pipeline.parsing import parse_html, shutdown_parse_pool
+from src.pipeline.pdf import shutdown_pdf_pool
+from src.pipeline.pdf_cache import pdf_text_cache
+from src.pipeline.stream import map_concurrent
+from src.utils import clean_html_content, get_pdf_text
+
+from .server import BenchmarkServer, StubGeminiModel
+from .site import SyntheticSite
+
+try:
+    import psutil
+except ImportError:  # Memory is read from /proc instead (Linux only)
+    psutil = None
+
+console = Console()
+
+STAGES = ["crawl", "clean_html", "pdf", "extract"]
+RESULT_VERSION = 1
+
+# Compared against a baseline: True when higher is better
+COMPARED = {"per_second": True, "p50_ms": False, "p99_ms": False, "cpu_seconds": False, "peak_rss_mb": False}
+
+def _child_pids() -> List[int]:
+    """PIDs of this process's children (the parse and PDF worker pools)."""
+    parent = str(os.getpid())
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # "pid (name) state ppid ...", the name may contain spaces
+        if stat[stat.rfind(")") + 2:].split()[1] == parent:
+            children.append(int(entry))
+    return children
+
+def rss_bytes() -> int | None:
+    """Resident memory of this process and its worker processes (None where it can't be read)."""
+    if psutil is not None:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for pid in [os.getpid(), *_child_pids()]:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            pass
+    return total
+
+def cpu_seconds() -> float:
+    """User + system CPU time of this process and its exited children."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+class ResourceMonitor:
+    """
+    Wall time, CPU time and peak RSS of the enclosed block. RSS is sampled in
+    a background thread; worker processes only count towards CPU time once
+    they have exited, so stages shut their pools down before the block ends.
+    """
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self):
+        while True:
+            rss = rss_bytes()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._cpu_started = cpu_seconds()
+        self._thread = threading.Thread(target=self._sample, name="benchmark-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        self.cpu_seconds = cpu_seconds() - self._cpu_started
+
+@dataclass
+class StageResult:
+    stage: str
+    unit: str  # What an item is, e.g. "pages"
+    items: int
+    seconds: float
+    per_second: float
+    p50_ms: float
+    p99_ms: float
+    cpu_seconds: float
+    cpu_percent: float  # Above 100 when worker processes run in parallel
+    peak_rss_mb: float | None
+    latency_span: str  # Span the latency percentiles are taken from
+    spans: Dict[str, dict] = field(default_factory=dict)  # Every timed sub-stage
+    counters: Dict[str, float] = field(default_factory=dict)
+
+async def _iterate(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+def use_fresh_caches(directory: Path):
+    """Points the HTTP, PDF text and LLM caches at an empty directory, so every stage starts cold."""
+    directory.mkdir(parents=True, exist_ok=True)
+    settings.HTTP_CACHE_DIR = str(directory / "http")
+    http_cache.configure(settings.HTTP_CACHE_DIR)
+    pdf_text_cache.configure(str(directory / "pdf_text.db"))
+    llm_cache.configure(str(directory / "llm.db"))
+
+def configure(args: argparse.Namespace):
+    """Settings for a local benchmark: no politeness delays, no browser, stub Gemini."""
+    settings.CONCURRENCY_LIMIT = args.concurrency
+    settings.MAX_DEPTH = 3
+    settings.MAX_PAGES = 0
+    settings.OFFLINE = False
+    settings.HTTP_FIRST = True
+    settings.SITEMAP_DISCOVERY = False
+    settings.RESPECT_CRAWL_DELAY = False
+    host_scheduler.rate = 1_000_000.0
+    host_scheduler.burst = args.concurrency
+    host_scheduler.jitter = 0.0
+    host_scheduler.respect_crawl_delay = False
+    host_scheduler.reset()
+    settings.GEMINI_API_KEY = "benchmark"
+    settings.LLM_REQUESTS_PER_MINUTE = args.llm_rpm
+    settings.LLM_TOKENS_PER_MINUTE = 1_000_000_000
+    settings.LLM_RETRY_BASE_DELAY = args.llm_backoff
+    settings.LLM_RETRY_JITTER = args.llm_backoff
+    settings.TRACE_PATH = None
+
+async def run_stage(name: str, unit: str, latency_span: str, func: Callable[[], Awaitable[int]],
+                    cache_dir: Path) -> StageResult:
+    """Runs one stage with cold caches and measures it."""
+    use_fresh_caches(cache_dir / name)
+    metrics.reset()
+    console.print(f"[bold]Running {name}...[/bold]")
+    with ResourceMonitor() as monitor:
+        try:
+            items = await func()
+        finally:
+            # Joins the worker processes, so their CPU time counts towards this stage
+            shutdown_parse_pool()
+            shutdown_pdf_pool()
+
+    stats = {s.stage: s for s in metrics.stats()}
+    latency = stats.get(latency_span)
+    return StageResult(
+        stage=name,
+        unit=unit,
+        items=items,
+        seconds=round(monitor.seconds, 3),
+        per_second=round(items / monitor.seconds, 2) if monitor.seconds else 0.0,
+        p50_ms=round(latency.p50 * 1000, 2) if latency else 0.0,
+        p99_ms=round(latency.p99 * 1000, 2) if latency else 0.0,
+        cpu_seconds=round(monitor.cpu_seconds, 3),
+        cpu_percent=round(100 * monitor.cpu_seconds / monitor.seconds, 1) if monitor.seconds else 0.0,
+        peak_rss_mb=round(monitor.peak_rss / 1e6, 1) if monitor.peak_rss is not None else None,
+        latency_span=latency_span,
+        spans={
+            s.stage: {"count": s.count, "total_s": round(s.total, 3), "mean_ms": round(s.mean * 1000, 2),
+                      "p50_ms": round(s.p50 * 1000, 2), "p95_ms": round(s.p95 * 1000, 2),
+                      "p99_ms": round(s.p99 * 1000, 2), "max_ms": round(s.max * 1000, 2)}
+            for s in stats.values()
+        },
+        counters=dict(sorted(metrics.counters.items())),
+    )
+
+async def bench_crawl(server: BenchmarkServer, concurrency: int) -> int:
+    crawler = Crawler(browser_manager, concurrency=concurrency, max_pages=0)
+    try:
+        await crawler.crawl(f"{server.base_url}/")
+    finally:
+        crawler.store.close()
+    return crawler.pages_stored
+
+async def bench_clean_html(site: SyntheticSite) -> int:
+    for html in site.pages.values():
+        with metrics.span("bench.clean_html"):
+            clean_html_content(html)
+    return len(site.pages)
+
+async def bench_pdf(server: BenchmarkServer, site: SyntheticSite, concurrency: int) -> int:
+    async def extract(url: str) -> str:
+        with metrics.span("bench.pdf", url=url):
+            return await get_pdf_text(url)
+
+    urls = [f"{server.base_url}{path}" for path in site.pdfs]
+    extracted = 0
+    async for _, text in map_concurrent(_iterate(urls), extract, concurrency):
+        extracted += bool(text)
+    return extracted
+
+async def bench_extract(server: BenchmarkServer, site: SyntheticSite, documents: int) -> int:
+    # Cleaned as the crawler stores them; done before the timed stage starts
+    texts = [(parse_html(site.pages[path]).to_markdown(), f"{server.base_url}{path}")
+             for path in site.article_paths[:documents]]
+    extractor = Extractor()
+    model = extractor.model = StubGeminiModel(server.llm_endpoint)
+
+    async def extract(document: tuple) -> bool:
+        text, url = document
+        with metrics.span("bench.extract", url=url):
+            return await extractor.extract_document(text, url, is_html=False) is not None
+
+    try:
+        extracted = 0
+        async for _, ok in map_concurrent(_iterate(texts), extract, settings.LLM_CONCURRENCY):
+            extracted += ok
+        return extracted
+    finally:
+        await model.close()
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    started_at = datetime.now().isoformat(timespec="seconds")
+    console.print(f"Generating a site of {args.pages} pages and {args.pdfs} PDFs ({args.pdf_pages} pages each)...")
+    site = SyntheticSite(args.pages, args.pdfs, args.pdf_pages, args.seed)
+    server = BenchmarkServer(site, args.llm_latency, args.llm_error_rate, args.seed)
+    configure(args)
+
+    stages = {
+        "crawl": ("pages", "crawl.fetch", lambda: bench_crawl(server, args.concurrency)),
+        "clean_html": ("pages", "bench.clean_html", lambda: bench_clean_html(site)),
+        "pdf": ("PDFs", "bench.pdf", lambda: bench_pdf(server, site, args.concurrency)),
+        "extract": ("documents", "bench.extract", lambda: bench_extract(server, site, args.documents)),
+    }
+    results = {}
+    await server.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="esg-benchmark-") as cache_dir:
+            for name in args.stages:
+                unit, latency_span, func = stages[name]
+                results[name] = asdict(await run_stage(name, unit, latency_span, func, Path(cache_dir)))
+            http_cache.close()
+            pdf_text_cache.close()
+            llm_cache.close()
+    finally:
+        await fetch_tier.close()
+        await server.stop()
+
+    return {
+        "version": RESULT_VERSION,
+        "started_at": started_at,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "pages": args.pages, "pdfs": args.pdfs, "pdf_pages": args.pdf_pages, "documents": args.documents,
+            "concurrency": args.concurrency, "llm_latency": args.llm_latency, "llm_error_rate": args.llm_error_rate,
+            "llm_concurrency": settings.LLM_CONCURRENCY, "html_backend": settings.HTML_BACKEND, "seed": args.seed,
+        },
+        "site": {"pages": len(site.pages), "pdfs": len(site.pdfs),
+                 "html_mb": round(site.html_bytes / 1e6, 2), "pdf_mb": round(site.pdf_bytes / 1e6, 2)},
+        "server": {"requests": server.requests, "llm_requests": server.llm_requests,
+                   "llm_rate_limited": server.llm_rate_limited},
+        "stages": results,
+    }
+
+def print_results(report: dict):
+    table = Table(title="Benchmark Results")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Items", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Items/s", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p99 (ms)", justify="right")
+    table.add_column("CPU (s)", justify="right")
+    table.add_column("CPU %", justify="right")
+    table.add_column("Peak RSS (MB)", justify="right")
+    for r in report["stages"].values():
+        rss = "n/a" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+        table.add_row(r["stage"], str(r["items"]), f"{r['seconds']:.2f}", f"{r['per_second']:.1f}",
+                      f"{r['p50_ms']:.1f}", f"{r['p99_ms']:.1f}", f"{r['cpu_seconds']:.2f}",
+                      f"{r['cpu_percent']:.0f}", rss)
+    console.print(table)
+    server = report["server"]
+    console.print(f"[dim]Stub Gemini: {server['llm_requests']} calls, {server['llm_rate_limited']} answered with 429[/dim]")
+
+def compare(report: dict, baseline: dict, threshold: float) -> int:
+    """Prints the change against `baseline`. Returns the number of metrics worse by more than `threshold`."""
+    if baseline.get("config") != report["config"]:
+        console.print("[yellow]Baseline was run with a different configuration; changes may not be comparable.[/yellow]")
+    table = Table(title="Compared with Baseline")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Metric")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Current", justify="right")
+    table.add_column("Change", justify="right")
+    regressions = 0
+    for name, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            style = "red" if worse > threshold else "green" if worse < -threshold else ""
+            regressions += worse > threshold
+            table.add_row(name, metric, f"{old:g}", f"{new:g}", f"[{style}]{change:+.1%}[/{style}]" if style else f"{change:+.1%}")
+    console.print(table)
+    if regressions:
+        console.print(f"[bold red]{regressions} metric(s) regressed by more than {threshold:.0%}[/bold red]")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the crawler and pipeline against a local synthetic ESG site")
+    parser.add_argument("--pages", type=int, default=2000, help="HTML pages on the site (default: 2000)")
+    parser.add_argument("--pdfs", type=int, default=20, help="Sustainability report PDFs on the site (default: 20)")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Pages per PDF (default: 20)")
+    parser.add_argument("--documents", type=int, default=200, help="Pages sent to the extractor (default: 200)")
+    parser.add_argument("--concurrency", "-c", type=int, default=settings.CONCURRENCY_LIMIT,
+                        help=f"Crawl workers and parallel PDF downloads (default: {settings.CONCURRENCY_LIMIT})")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mean stub Gemini response time in seconds (default: 0.2)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.05, help="Share of stub Gemini calls answered with 429 (default: 0.05)")
+    parser.add_argument("--llm-rpm", type=int, default=60_000, help="LLM requests per minute allowed by the rate limiter (default: 60000)")
+    parser.add_argument("--llm-backoff", type=float, default=0.5, help="Base backoff (and max jitter) after a 429, in seconds (default: 0.5)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the site and the stub's latency and errors")
+    parser.add_argument("--output", "-o", default="benchmark.json", help="Result JSON file (default: benchmark.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier result JSON to compare with; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression (default: 0.10)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Keep the pipeline's INFO logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmark(args))
+    print_results(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    console.print(f"[bold blue]Results written to {args.output}[/bold blue]")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import urllib.error
+import urllib.request
+
+import aiohttp
+from aiohttp import web
+from google.api_core import exceptions
+
+from .site import SyntheticSite
+
+logger = logging.getLogger(__name__)
+
+def stub_report(prompt: str) -> dict:
+    """A schema-valid extraction result derived from the prompt, so equal prompts get equal answers."""
+    digest = hashlib.sha256(prompt.encode()).digest()
+
+    def category(i: int) -> dict:
+        return {"score": digest[i] % 101, "assessment": "Synthetic assessment.", "gaps": "None identified."}
+
+    return {
+        "company_name": "Benchmark Company",
+        "summary": f"Synthetic summary {digest[:4].hex()}.",
+        "environmental": category(0),
+        "social": category(1),
+        "governance": category(2),
+    }
+
+class BenchmarkServer:
+    """
+    Serves a `SyntheticSite` and a stub of Gemini's `generateContent` on
+    localhost. The stub answers after `llm_latency` seconds (+/- 50%) and
+    rejects `llm_error_rate` of the calls with HTTP 429, like an exhausted
+    quota.
+    """
+    def __init__(self, site: SyntheticSite, llm_latency: float = 0.2, llm_error_rate: float = 0.0,
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.site = site
+        self.llm_latency = llm_latency
+        self.llm_error_rate = llm_error_rate
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.llm_requests = 0
+        self.llm_rate_limited = 0
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def llm_endpoint(self) -> str:
+        return f"{self.base_url}/v1beta/models/benchmark:generateContent"
+
+    async def _get(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        path = request.path
+        if path == "/robots.txt":
+            return web.Response(text="User-agent: *\nAllow: /\n")
+        if path in self.site.pages:
+            return web.Response(text=self.site.pages[path], content_type="text/html")
+        if path in self.site.pdfs:
+            return web.Response(body=self.site.pdfs[path], content_type="application/pdf")
+        return web.Response(status=404, text="Not found")
+
+    async def _generate(self, request: web.Request) -> web.Response:
+        self.llm_requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.llm_latency * self.rng.uniform(0.5, 1.5))
+        if self.rng.random() < self.llm_error_rate:
+            self.llm_rate_limited += 1
+            return web.json_response({"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                                "status": "RESOURCE_EXHAUSTED"}}, status=429)
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        text = json.dumps(stub_report(prompt))
+        return web.json_response({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                                  "finishReason": "STOP"}]})
+
+    async def start(self):
+        app = web.Application(client_max_size=10_000_000)
+        app.router.add_post("/v1beta/models/{call}", self._generate)
+        app.router.add_get("/{path:.*}", self._get)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Benchmark site on {self.base_url} ({len(self.site.pages)} pages, {len(self.site.pdfs)} PDFs)")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+class StubGeminiModel:
+    """
+    Stands in for `genai.GenerativeModel`, posting prompts to the stub
+    endpoint. A 429 raises `ResourceExhausted`, as the real client does, so
+    the extractor's quota handling runs unchanged.
+    """
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._session: aiohttp.ClientSession | None = None
+
+    @staticmethod
+    def _payload(prompt: str) -> dict:
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    @staticmethod
+    def _response(data: dict) -> _Response:
+        return _Response(data["candidates"][0]["content"]["parts"][0]["text"])
+
+    async def generate_content_async(self, prompt: str) -> _Response:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.post(self.endpoint, json=self._payload(prompt)) as response:
+            if response.status == 429:
+                raise exceptions.ResourceExhausted((await response.json())["error"]["message"])
+            response.raise_for_status()
+            return self._response(await response.json())
+
+    def generate_content(self, prompt: str) -> _Response:
+        request = urllib.request.Request(self.endpoint, json.dumps(self._payload(prompt)).encode(),
+                                         {"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return self._response(json.load(response))
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise exceptions.ResourceExhausted(str(e))
+            raise
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,181 @@
+import random
+import textwrap
+import zlib
+from typing import Dict, List
+
+SECTIONS = ["climate", "social", "governance", "reporting", "investors", "news", "careers", "about"]
+
+HEADINGS = [
+    "Climate and energy", "Pollution and resources", "Own workforce", "Workers in the value chain",
+    "Business conduct", "EU Taxonomy alignment", "Governance and oversight", "Targets and progress",
+    "Double materiality assessment", "Biodiversity and ecosystems",
+]
+
+SENTENCES = [
+    "{company} reduced Scope {scope} emissions by {pct}% against its {year} baseline.",
+    "The share of renewable electricity across our operations reached {pct}% in {year}.",
+    "Women held {pct}% of senior management positions at the end of {year}.",
+    "The audit committee met {n} times and reviewed the double materiality assessment.",
+    "Water withdrawal in high-stress regions fell to {n} megalitres, {pct}% below the previous year.",
+    "{company} reports taxonomy-aligned capital expenditure of EUR {n} million under the ESRS.",
+    "The lost-time injury frequency rate improved to {rate} per million hours worked.",
+    "Supplier audits covered {pct}% of procurement spend, with {n} findings on human rights due diligence.",
+    "Executive remuneration is linked to climate targets validated by the Science Based Targets initiative.",
+    "Our transition plan commits {company} to net zero across the value chain by {target}.",
+    "Employee turnover stood at {pct}% and average training reached {n} hours per employee.",
+    "The board oversees sustainability matters through a dedicated committee chaired by an independent director.",
+]
+
+COMPANIES = [
+    "Northwind Energy", "Aurelia Foods", "Helix Logistics", "Verdant Materials", "Castellan Bank",
+    "Orbis Telecom", "Lumen Pharma", "Tessera Retail", "Kestrel Mobility", "Atlas Chemicals",
+]
+
+_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} | {company}</title>
+<meta name="description" content="{description}">
+<link rel="stylesheet" href="/assets/site.css">
+<style>body{{font-family:sans-serif;margin:0}}.nav a{{padding:0 8px}}.kpi td{{text-align:right}}</style>
+<script>window.dataLayer=window.dataLayer||[];function gtag(){{dataLayer.push(arguments)}}gtag('js',new Date());</script>
+<script async src="https://www.googletagmanager.com/gtag/js?id=G-BENCH"></script>
+</head>
+<body>
+<header><a class="logo" href="/">{company}</a>
+<nav class="nav">{nav}</nav></header>
+"""
+
+_FOOT = """<footer><p>&copy; {year} {company}. All rights reserved.</p>
+<a href="/about/">About</a> <a href="/investors/">Investors</a> <a href="/reporting/">Reporting</a></footer>
+<script>document.querySelectorAll('.nav a').forEach(function(a){{a.dataset.track='nav'}});</script>
+</body>
+</html>
+"""
+
+def _escape_pdf(text: str) -> bytes:
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("latin-1", errors="replace")
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal PDF with one Flate-compressed Helvetica text stream per page (one line per entry)."""
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]  # 1: catalog, 2: pages
+    page_ids = []
+    for lines in pages:
+        content = b"BT /F1 10 Tf 12 TL 56 770 Td " + b" ".join(b"(" + _escape_pdf(line) + b") Tj T*" for line in lines) + b" ET"
+        stream = zlib.compress(content)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+class SyntheticSite:
+    """
+    A deterministic corporate sustainability site: a home page, one index
+    page per section, `pages` pages in total, and `pdfs` sustainability
+    reports of `pdf_pages` pages each. Paths map to HTML (`pages`) or PDF
+    bytes (`pdfs`); links are root-relative, so any host can serve it.
+
+    Articles link to their section, to related articles and now and then to
+    a report, so a crawl from "/" reaches everything within depth 3.
+    """
+    def __init__(self, pages: int = 2000, pdfs: int = 20, pdf_pages: int = 20, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.company = self.rng.choice(COMPANIES)
+        self.pages: Dict[str, str] = {}
+        self.pdfs: Dict[str, bytes] = {}
+
+        company_slug = self.company.lower().replace(" ", "-")
+        self.report_paths = [f"/reports/{company_slug}-sustainability-report-{i + 1}.pdf" for i in range(pdfs)]
+        articles = max(0, pages - 1 - len(SECTIONS))
+        self.article_paths = [f"/{SECTIONS[i % len(SECTIONS)]}/{self._slug()}-{i}" for i in range(articles)]
+        self.titles = {path: self._title() for path in self.article_paths}
+
+        self.pages["/"] = self._home()
+        for section in SECTIONS:
+            self.pages[f"/{section}/"] = self._section(section)
+        for index, path in enumerate(self.article_paths):
+            self.pages[path] = self._article(index, path)
+        for path in self.report_paths:
+            self.pdfs[path] = make_pdf([self._pdf_page() for _ in range(pdf_pages)])
+
+    @property
+    def html_bytes(self) -> int:
+        return sum(len(html.encode()) for html in self.pages.values())
+
+    @property
+    def pdf_bytes(self) -> int:
+        return sum(len(pdf) for pdf in self.pdfs.values())
+
+    def _slug(self) -> str:
+        return "-".join(self.rng.choice(HEADINGS).lower().split()[:2] + [self.rng.choice(["update", "progress", "approach", "policy", "results"])])
+
+    def _title(self) -> str:
+        return f"{self.rng.choice(HEADINGS)}: {self.rng.choice(['our approach', 'progress in 2024', 'policy', 'key figures', 'case study'])}"
+
+    def _sentence(self) -> str:
+        return self.rng.choice(SENTENCES).format(
+            company=self.company, scope=self.rng.randint(1, 3), pct=self.rng.randint(3, 95),
+            year=self.rng.randint(2015, 2024), n=self.rng.randint(4, 900),
+            rate=round(self.rng.uniform(0.2, 4.0), 2), target=self.rng.choice([2030, 2040, 2045, 2050]),
+        )
+
+    def _paragraph(self) -> str:
+        return " ".join(self._sentence() for _ in range(self.rng.randint(3, 7)))
+
+    def _page(self, title: str, body: str) -> str:
+        nav = "".join(f'<a href="/{section}/">{section.title()}</a>' for section in SECTIONS)
+        head = _HEAD.format(title=title, company=self.company, description=self._sentence(), nav=nav)
+        return head + body + _FOOT.format(year=2024, company=self.company)
+
+    def _home(self) -> str:
+        latest = "".join(f'<li><a href="{path}">{self.titles[path]}</a></li>' for path in self.article_paths[:20])
+        reports = "".join(f'<li><a href="{path}">Sustainability report, part {i + 1}</a></li>'
+                          for i, path in enumerate(self.report_paths))
+        return self._page("Sustainability", f"<main><h1>Sustainability at {self.company}</h1><p>{self._paragraph()}</p>"
+                                            f"<h2>Latest</h2><ul>{latest}</ul><h2>Reports</h2><ul>{reports}</ul></main>")
+
+    def _section(self, section: str) -> str:
+        links = "".join(f'<li><a href="{path}">{self.titles[path]}</a></li>'
+                        for path in self.article_paths if path.startswith(f"/{section}/"))
+        return self._page(section.title(), f"<main><h1>{section.title()}</h1><p>{self._paragraph()}</p><ul>{links}</ul></main>")
+
+    def _article(self, index: int, path: str) -> str:
+        section = path.split("/")[1]
+        parts = [f'<main><nav class="breadcrumbs"><a href="/">Home</a> / <a href="/{section}/">{section.title()}</a></nav>',
+                 f"<article><h1>{self.titles[path]}</h1>"]
+        for _ in range(self.rng.randint(3, 6)):
+            parts.append(f"<h2>{self.rng.choice(HEADINGS)}</h2>")
+            parts.extend(f"<p>{self._paragraph()}</p>" for _ in range(self.rng.randint(2, 4)))
+        if self.rng.random() < 0.5:
+            rows = "".join(f"<tr><th>{self.rng.choice(HEADINGS)}</th><td>{self.rng.randint(1, 999)}</td><td>{self.rng.randint(1, 999)}</td></tr>"
+                           for _ in range(self.rng.randint(3, 8)))
+            parts.append(f'<table class="kpi"><tr><th>Indicator</th><th>2023</th><th>2024</th></tr>{rows}</table>')
+        parts.append("</article><aside><h2>Related</h2><ul>")
+        for related in self.rng.sample(self.article_paths, min(6, len(self.article_paths))):
+            parts.append(f'<li><a href="{related}">{self.titles[related]}</a></li>')
+        if self.report_paths and index % 10 == 0:
+            parts.append(f'<li><a href="{self.rng.choice(self.report_paths)}">Download the sustainability report (PDF)</a></li>')
+        parts.append("</ul></aside></main>")
+        return self._page(self.titles[path], "\n".join(parts))
+
+    def _pdf_page(self) -> List[str]:
+        lines = [self.rng.choice(HEADINGS).upper(), ""]
+        while len(lines) < 55:
+            lines.extend(textwrap.wrap(self._paragraph(), 95) + [""])
+        return lines[:60]
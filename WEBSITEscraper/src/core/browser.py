@@ -1,74 +1,342 @@
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
-from playwright_stealth.stealth import Stealth
-from .config import settings
-from .network import network_manager
-import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class BrowserManager:
-    """
-    Manages Playwright browser instances and contexts with stealth features.
-    """
-    def __init__(self):
-        self.playwright = None
-        self.browser: Browser | None = None
-
-    async def start(self):
-        """Starts the Playwright engine and browser."""
-        if not self.playwright:
-            self.playwright = await async_playwright().start()
-        
-        if not self.browser:
-            logger.info("Launching browser...")
-            self.browser = await self.playwright.chromium.launch(
-                headless=settings.HEADLESS,
-                args=["--disable-blink-features=AutomationControlled"] # Basic anti-detection flag
-            )
-
-    async def get_new_context(self) -> BrowserContext:
-        """
-        Creates a new browser context with randomized settings for stealth.
-        """
-        if not self.browser:
-            await self.start()
-            
-        user_agent = network_manager.get_random_user_agent()
-        proxy = network_manager.get_proxy_config()
-        
-        logger.debug(f"Creating context with UA: {user_agent}, Proxy: {proxy}")
-        
-        context = await self.browser.new_context(
-            user_agent=user_agent,
-            proxy=proxy,
-            viewport={"width": 1920, "height": 1080}, # Standard desktop resolution
-            device_scale_factor=1,
-        )
-        
-        return context
-
-    async def get_new_page(self, context: BrowserContext) -> Page:
-        """
-        Creates a new page in the given context and applies stealth scripts.
-        """
-        page = await context.new_page()
-        
-        if settings.STEALTH_ENABLED:
-            stealth = Stealth()
-            await stealth.apply_stealth_async(page)
-            
-        return page
-
-    async def stop(self):
-        """Stops the browser and Playwright engine."""
-        if self.browser:
-            await self.browser.close()
-            self.browser = None
-            
-        if self.playwright:
-            await self.playwright.stop()
-            self.playwright = None
-
-browser_manager = BrowserManager()
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Route
+from playwright_stealth.stealth import Stealth
+from .config import settings
+from .network import network_manager
+import asyncio
+import logging
+import weakref
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List
+from urllib.parse import urlparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rough transfer sizes used to estimate what an aborted request would have cost.
+# Aborted requests never reach the network, so the real size is unknown.
+ESTIMATED_RESOURCE_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+class RequestBlocker:
+    """
+    Route-level blocking policy for a browser context.
+
+    Aborts requests whose resource type or host is on the block lists and keeps
+    counters for the crawl that owns it. Navigations are never blocked.
+    """
+    def __init__(self, resource_types: Iterable[str] | None = None, domains: Iterable[str] | None = None):
+        self.resource_types = set(settings.BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types)
+        self.domains = tuple(d.lower().lstrip(".") for d in (settings.BLOCKED_DOMAINS if domains is None else domains))
+        self.blocked_requests = 0
+        self.allowed_requests = 0
+        self.bytes_saved = 0
+        self.blocked_by_type: Counter = Counter()
+
+    def is_blocked_domain(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == d or host.endswith("." + d) for d in self.domains)
+
+    def should_block(self, resource_type: str, url: str, is_navigation: bool = False) -> bool:
+        if is_navigation:
+            return False
+        return resource_type in self.resource_types or self.is_blocked_domain(url)
+
+    async def handle(self, route: Route):
+        request = route.request
+        resource_type = request.resource_type
+
+        if self.should_block(resource_type, request.url, request.is_navigation_request()):
+            self.blocked_requests += 1
+            self.blocked_by_type[resource_type] += 1
+            self.bytes_saved += ESTIMATED_RESOURCE_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed_requests += 1
+            await route.continue_()
+
+    def summary(self) -> str:
+        by_type = ", ".join(f"{t}: {n}" for t, n in self.blocked_by_type.most_common())
+        return (
+            f"Blocked {self.blocked_requests} of {self.blocked_requests + self.allowed_requests} requests "
+            f"(~{self.bytes_saved / 1_000_000:.1f} MB saved){f' [{by_type}]' if by_type else ''}"
+        )
+
+class BrowserManager:
+    """
+    Manages Playwright browser instances and contexts with stealth features.
+    """
+    def __init__(self):
+        self.playwright = None
+        self.browser: Browser | None = None
+        # One Stealth instance; its scripts are installed once per context
+        self._stealth = Stealth() if settings.STEALTH_ENABLED else None
+        self._stealth_contexts: weakref.WeakSet = weakref.WeakSet()
+
+    async def start(self):
+        """Starts the Playwright engine and browser."""
+        if not self.playwright:
+            self.playwright = await async_playwright().start()
+        
+        if not self.browser:
+            logger.info("Launching browser...")
+            self.browser = await self.playwright.chromium.launch(
+                headless=settings.HEADLESS,
+                args=["--disable-blink-features=AutomationControlled"] # Basic anti-detection flag
+            )
+
+    async def get_new_context(self, blocker: RequestBlocker | None = None) -> BrowserContext:
+        """
+        Creates a new browser context with randomized settings for stealth.
+
+        If `blocker` is given (or BLOCK_REQUESTS is enabled), every request made
+        by the context is routed through it. Stealth scripts are installed on
+        the context, so every page opened in it is patched without extra setup.
+        """
+        if not self.browser:
+            await self.start()
+            
+        user_agent = network_manager.get_random_user_agent()
+        proxy = network_manager.get_proxy_config()
+        
+        logger.debug(f"Creating context with UA: {user_agent}, Proxy: {proxy}")
+        
+        context = await self.browser.new_context(
+            user_agent=user_agent,
+            proxy=proxy,
+            viewport={"width": 1920, "height": 1080}, # Standard desktop resolution
+            device_scale_factor=1,
+        )
+
+        if blocker is None and settings.BLOCK_REQUESTS:
+            blocker = RequestBlocker()
+        if blocker is not None:
+            await context.route("**/*", blocker.handle)
+
+        if self._stealth is not None:
+            await self._stealth.apply_stealth_async(context)
+            self._stealth_contexts.add(context)
+
+        return context
+
+    async def get_new_page(self, context: BrowserContext) -> Page:
+        """
+        Creates a new page in the given context and applies stealth scripts.
+        """
+        page = await context.new_page()
+        
+        if self._stealth is not None and context not in self._stealth_contexts:
+            # Contexts not created by `get_new_context` are patched per page
+            await self._stealth.apply_stealth_async(page)
+            
+        return page
+
+    async def stop(self):
+        """Stops the browser and Playwright engine."""
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+            
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+class PooledContext:
+    """A browser context owned by a `PagePool`, with its own UA and proxy."""
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.pages_opened = 0
+        self.open_pages = 0
+        self.retired = False
+
+class PagePool:
+    """
+    Pool of warm, stealth-patched browser pages shared by a crawl's workers.
+
+    Pages are spread over BROWSER_CONTEXTS contexts, each created with a
+    freshly rotated user agent and proxy. A page goes back to the pool after
+    every navigation and is closed and replaced after PAGE_MAX_NAVIGATIONS
+    uses, when its JS heap exceeds PAGE_MAX_HEAP_MB, or when the navigation
+    failed. A context that has opened CONTEXT_MAX_PAGES pages is retired and
+    closed once its last page is gone, which returns its memory to Chromium.
+
+    Use `async with pool.page() as page:`; the page is always returned, so
+    exceptions never leak it.
+    """
+    def __init__(self, browser_manager: BrowserManager, size: int | None = None,
+                 blocker: RequestBlocker | None = None, contexts: int | None = None):
+        self.browser_manager = browser_manager
+        self.size = max(1, size or settings.CONCURRENCY_LIMIT)
+        self.blocker = blocker
+        self.max_contexts = max(1, min(contexts or settings.BROWSER_CONTEXTS, self.size))
+        self._contexts: List[PooledContext] = []
+        self._owner: Dict[Page, PooledContext] = {}
+        self._uses: Dict[Page, int] = {}
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._open = 0  # Pages open or being opened
+        self._lock = asyncio.Lock()
+        self._warming: set = set()
+        self._closed = False
+        self._waiting = 0  # acquire() calls blocked on the idle queue
+        self.pages_opened = 0
+        self.pages_recycled = 0
+        self.contexts_opened = 0
+        self.navigations = 0
+
+    async def start(self):
+        """Opens every page up front (BROWSER_PREWARM), so no worker waits on setup later."""
+        if settings.BROWSER_PREWARM:
+            await asyncio.gather(*(self._add_page() for _ in range(self.size - self._open)))
+
+    async def _context_for_new_page(self) -> PooledContext:
+        async with self._lock:
+            live = [c for c in self._contexts if not c.retired]
+            if len(live) < self.max_contexts:
+                pooled = PooledContext(await self.browser_manager.get_new_context(blocker=self.blocker))
+                self._contexts.append(pooled)
+                self.contexts_opened += 1
+                live.append(pooled)
+            # Least loaded context first
+            pooled = min(live, key=lambda c: c.open_pages)
+            pooled.pages_opened += 1
+            pooled.open_pages += 1
+            if pooled.pages_opened >= settings.CONTEXT_MAX_PAGES:
+                pooled.retired = True
+            return pooled
+
+    async def _open_page(self) -> Page:
+        self._open += 1
+        try:
+            pooled = await self._context_for_new_page()
+            try:
+                page = await self.browser_manager.get_new_page(pooled.context)
+            except Exception:
+                pooled.open_pages -= 1
+                raise
+        except BaseException:
+            self._open -= 1
+            raise
+        self._owner[page] = pooled
+        self._uses[page] = 0
+        self.pages_opened += 1
+        return page
+
+    async def _add_page(self):
+        """Opens a page into the idle queue (a None wakes a waiter to retry if that fails)."""
+        try:
+            page = await self._open_page()
+        except Exception as e:
+            logger.warning(f"Could not open a pooled page: {e}")
+            page = None
+        self._idle.put_nowait(page)
+
+    def _warm(self):
+        task = asyncio.create_task(self._add_page())
+        self._warming.add(task)
+        task.add_done_callback(self._warming.discard)
+
+    async def acquire(self) -> Page:
+        while True:
+            if self._closed:
+                raise RuntimeError("Page pool is closed")
+            if self._idle.empty() and self._open < self.size:
+                return await self._open_page()
+            self._waiting += 1
+            try:
+                page = await self._idle.get()
+            finally:
+                self._waiting -= 1
+            if page is not None:
+                return page
+
+    async def release(self, page: Page, discard: bool = False):
+        """Returns `page` to the pool, replacing it if it is worn out or broken."""
+        self.navigations += 1
+        self._uses[page] = self._uses.get(page, 0) + 1
+        if self._closed or discard or page.is_closed() or await self._worn_out(page):
+            await self._retire_page(page)
+            if not self._closed:
+                self.pages_recycled += 1
+                self._warm()
+        else:
+            self._idle.put_nowait(page)
+
+    async def _worn_out(self, page: Page) -> bool:
+        if self._uses[page] >= settings.PAGE_MAX_NAVIGATIONS:
+            return True
+        if settings.PAGE_MAX_HEAP_MB:
+            try:
+                heap = await page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : 0")
+            except Exception:
+                return True
+            return heap > settings.PAGE_MAX_HEAP_MB * 1_000_000
+        return False
+
+    async def _retire_page(self, page: Page):
+        self._open -= 1
+        self._uses.pop(page, None)
+        pooled = self._owner.pop(page, None)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        if pooled is None:
+            return
+        pooled.open_pages -= 1
+        if pooled.retired and pooled.open_pages == 0 and pooled in self._contexts:
+            self._contexts.remove(pooled)
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Borrows a page for one navigation. A page that raised is replaced."""
+        page = await self.acquire()
+        failed = False
+        try:
+            yield page
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(page, discard=failed)
+
+    async def close(self):
+        """
+        Closes every page and context. Borrowed pages are closed when released;
+        workers still waiting in `acquire` get a RuntimeError.
+        """
+        self._closed = True
+        for task in list(self._warming):
+            task.cancel()
+        await asyncio.gather(*self._warming, return_exceptions=True)
+        while not self._idle.empty():
+            page = self._idle.get_nowait()
+            if page is not None:
+                await self._retire_page(page)
+        for _ in range(self._waiting):
+            self._idle.put_nowait(None)  # Wakes a waiter, which then sees the pool is closed
+        for pooled in self._contexts:
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        self._owner.clear()
+
+    def summary(self) -> str:
+        return (
+            f"Browser pool: {self.navigations} navigations on {self.pages_opened} pages "
+            f"({self.pages_recycled} recycled) in {self.contexts_opened} contexts"
+        )
+
+browser_manager = BrowserManager()
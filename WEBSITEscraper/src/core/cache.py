@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+def normalize_url(url: str) -> str:
+    """
+    Cache key for a URL: lowercase scheme and host, no default port, no
+    fragment, and sorted query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+@dataclass
+class CacheEntry:
+    url: str
+    path: Path
+    etag: str | None
+    last_modified: str | None
+    content_type: str
+    size: int
+    fetched_at: float
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+    def read_text(self) -> str:
+        return self.read_bytes().decode("utf-8", errors="replace")
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+class HttpCache:
+    """
+    On-disk HTTP cache for pages and PDFs.
+
+    Bodies live in content files under `<cache_dir>/bodies`, metadata
+    (validators, size, last access) in a SQLite index. Entries are revalidated
+    with If-None-Match / If-Modified-Since and evicted least-recently-used
+    once the total size exceeds `max_bytes`.
+
+    The methods block on disk and SQLite; async callers run them with
+    `asyncio.to_thread`.
+    """
+    def __init__(self, cache_dir: str | None = None, max_bytes: int | None = None):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._total = 0  # Bytes indexed, summed once per connection and kept up to date
+        self.revalidated = 0  # 304 Not Modified, body served from disk
+        self.stored = 0  # new or changed bodies written
+        self.offline_hits = 0  # served without touching the network
+
+    @property
+    def cache_dir(self) -> Path:
+        return Path(self._cache_dir or settings.HTTP_CACHE_DIR)
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes or settings.HTTP_CACHE_MAX_BYTES
+
+    @property
+    def enabled(self) -> bool:
+        return settings.HTTP_CACHE_ENABLED or settings.OFFLINE
+
+    def configure(self, cache_dir: str | None = None, max_bytes: int | None = None):
+        """Points the cache at another directory (closing the current index)."""
+        self.close()
+        self._cache_dir = cache_dir or self._cache_dir
+        self._max_bytes = max_bytes or self._max_bytes
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            (self.cache_dir / "bodies").mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.cache_dir / "index.db", check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+                " content_type TEXT, size INTEGER, fetched_at REAL, accessed_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)")
+            self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _body_path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / "bodies" / digest[:2] / digest
+
+    def get(self, url: str) -> CacheEntry | None:
+        """Returns the cached entry for `url` and marks it as recently used."""
+        if not self.enabled:
+            return None
+        key = normalize_url(url)
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT url, etag, last_modified, content_type, size, fetched_at FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            path = self._body_path(key)
+            if not path.exists():
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total -= row[4] or 0
+                return None
+            db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(row[0], path, row[1], row[2], row[3] or "", row[4], row[5])
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry | None) -> dict:
+        """Request headers that revalidate `entry` instead of refetching it."""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(self, url: str, body: bytes, headers=None, content_type: str = "") -> CacheEntry | None:
+        """Stores a response body."""
+        if not self.enabled:
+            return None
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        return self.put_file(url, tmp_name, headers, content_type)
+
+    def put_file(self, url: str, source_path: str, headers=None, content_type: str = "") -> CacheEntry | None:
+        """Stores a response body that was already written to `source_path` (moved, not copied)."""
+        if not self.enabled:
+            return None
+        headers = headers or {}
+        key = normalize_url(url)
+        path = self._body_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(source_path, path)
+
+        size = path.stat().st_size
+        now = time.time()
+        etag = headers.get("ETag") or headers.get("etag")
+        last_modified = headers.get("Last-Modified") or headers.get("last-modified")
+        content_type = content_type or headers.get("Content-Type") or headers.get("content-type") or ""
+
+        with self._lock:
+            db = self._connect()
+            replaced = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, content_type, size, now, now),
+            )
+            self._total += size - ((replaced[0] or 0) if replaced else 0)
+            self.stored += 1
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+        return CacheEntry(url, path, etag, last_modified, content_type, size, now)
+
+    def touch(self, entry: CacheEntry, headers=None):
+        """Records a successful revalidation (HTTP 304)."""
+        headers = headers or {}
+        key = normalize_url(entry.url)
+        etag = headers.get("ETag") or headers.get("etag") or entry.etag
+        last_modified = headers.get("Last-Modified") or headers.get("last-modified") or entry.last_modified
+        with self._lock:
+            self._connect().execute(
+                "UPDATE entries SET fetched_at = ?, etag = ?, last_modified = ? WHERE key = ?",
+                (time.time(), etag, last_modified, key),
+            )
+        self.revalidated += 1
+
+    def evict(self):
+        """Drops least-recently-used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            db = self._connect()
+            if self._total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+                if self._total <= target:
+                    break
+                self._body_path(key).unlink(missing_ok=True)
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total -= size or 0
+                removed += 1
+        logger.info(f"HTTP cache evicted {removed} entries")
+
+    def summary(self) -> str:
+        return (
+            f"HTTP cache: {self.revalidated} revalidated (304), {self.stored} stored, "
+            f"{self.offline_hits} served offline"
+        )
+
+http_cache = HttpCache()
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from urllib.parse import urlparse
+
+import aiohttp
+from playwright.async_api import BrowserContext, Error as PlaywrightError, Page, TimeoutError as PlaywrightTimeoutError
+
+from .browser import PagePool
+from .cache import http_cache
+from .config import settings
+from .network import network_manager
+from .scheduler import HostUnavailable, host_scheduler
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class FetchResult:
+    """A fetched document, whichever tier produced it."""
+    url: str
+    status: int
+    content: str
+    content_type: str = "text/html"
+    via: str = "http"  # "http" or "browser"
+    path: Path | None = None  # PDFs: the body on disk instead of in `content`
+    temporary: bool = False  # `path` is a temp file (cache disabled) the consumer deletes
+
+    @property
+    def is_html(self) -> bool:
+        return "html" in self.content_type or "xml" in self.content_type
+
+# --- Heuristics deciding whether a page needs JavaScript to render ---
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SCRIPT_TAG_RE = re.compile(r"<script\b", re.I)
+_NOSCRIPT_RE = re.compile(r"<noscript\b[^>]*>(.*?)</noscript\s*>", re.I | re.S)
+_NOSCRIPT_WALL_RE = re.compile(r"(enable|requires?|turn on)\s+javascript|javascript\s+(is\s+)?(required|disabled)", re.I)
+_SPA_ROOT_RE = re.compile(
+    r"<(div|main|app-root)\b[^>]*(id=[\"'](root|app|__next|__nuxt|svelte)[\"']|ng-app|data-reactroot)[^>]*>\s*</\1>",
+    re.I,
+)
+_CHALLENGE_RE = re.compile(r"cf-browser-verification|challenge-platform|<title>\s*just a moment", re.I)
+
+MIN_VISIBLE_TEXT = 200
+
+async def save_body(response: aiohttp.ClientResponse, max_bytes: int, suffix: str = "") -> str | None:
+    """
+    Streams a response body to a temp file and returns its name, or None
+    (and no file) if the body is larger than `max_bytes`.
+    """
+    fd, tmp_name = tempfile.mkstemp(suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in response.content.iter_chunked(256 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    break
+                f.write(chunk)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    if size > max_bytes:
+        os.unlink(tmp_name)
+        return None
+    return tmp_name
+
+def is_server_failure(status: int) -> bool:
+    """Responses that say the server is overloaded or broken rather than that the page is missing."""
+    return status == 429 or status >= 500
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Timeouts and network-level failures, which another attempt may get past.
+    Other errors (a browser navigation that starts a download, bugs) would
+    fail the same way again.
+    """
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError, HostUnavailable, PlaywrightTimeoutError)):
+        return True
+    # Chromium's network errors; ERR_ABORTED is the navigation being cancelled, e.g. by a download
+    message = str(error)
+    return isinstance(error, PlaywrightError) and "net::ERR_" in message and "net::ERR_ABORTED" not in message
+
+def visible_text_length(html: str) -> int:
+    """Cheap approximation of the amount of rendered text, without a full parse."""
+    text = _TAG_RE.sub(" ", _SCRIPT_STYLE_RE.sub(" ", html))
+    return len(" ".join(text.split()))
+
+def needs_browser(html: str) -> bool:
+    """
+    Returns True when a server response looks like it only renders with
+    JavaScript: empty bodies, noscript walls, SPA shells or bot challenges.
+    """
+    if not html.strip():
+        return True
+    if _CHALLENGE_RE.search(html):
+        return True
+
+    text_length = visible_text_length(html)
+    if _SPA_ROOT_RE.search(html) and text_length < MIN_VISIBLE_TEXT * 5:
+        return True
+    if any(_NOSCRIPT_WALL_RE.search(block) for block in _NOSCRIPT_RE.findall(html)) and text_length < MIN_VISIBLE_TEXT * 5:
+        return True
+    if text_length < MIN_VISIBLE_TEXT and len(_SCRIPT_TAG_RE.findall(html)) >= 3:
+        return True
+    return False
+
+class FetchTier:
+    """
+    Two-tier fetcher: a pooled async HTTP client first, Chromium only for pages
+    that need JavaScript. The verdict for the first page of a host is
+    remembered, so JS-only hosts skip the HTTP attempt from then on.
+
+    Every response time and failure is reported to the host scheduler, which
+    derives the host's timeouts and circuit breaker state from them.
+    """
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+        self.host_modes: Dict[str, str] = {}  # host -> "http" | "browser"
+        self.http_pages = 0
+        self.browser_pages = 0
+        self.fallbacks = 0
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.HTTP_POOL_SIZE,
+                limit_per_host=settings.CONCURRENCY_LIMIT,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT),
+                headers={"Accept": "text/html,application/xhtml+xml,*/*;q=0.8"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def wants_http(self, url: str) -> bool:
+        if settings.OFFLINE:
+            return True
+        return settings.HTTP_FIRST and self.host_modes.get(self.host_of(url)) != "browser"
+
+    async def from_cache(self, url: str) -> FetchResult:
+        """Offline mode: serves `url` from the HTTP cache or reports a miss (504)."""
+        entry = await asyncio.to_thread(http_cache.get, url)
+        if entry is None:
+            logger.info(f"Offline cache miss: {url}")
+            return FetchResult(url, 504, "", "", via="cache")
+        http_cache.offline_hits += 1
+        if "pdf" in entry.content_type:
+            return FetchResult(entry.url, 200, "", entry.content_type, via="cache", path=entry.path)
+        content = await asyncio.to_thread(entry.read_text)
+        return FetchResult(entry.url, 200, content, entry.content_type, via="cache")
+
+    def _remember(self, url: str, mode: str):
+        host = self.host_of(url)
+        if host not in self.host_modes:
+            self.host_modes[host] = mode
+            logger.info(f"Fetch tier for {host}: {mode}")
+
+    async def try_http(self, url: str) -> FetchResult | None:
+        """
+        Fetches `url` with the HTTP client. Returns None when the browser should
+        be used instead (JS-rendered page, blocked request, network error).
+        PDFs are streamed to disk, see `FetchResult.path`.
+        """
+        if settings.OFFLINE:
+            return await self.from_cache(url)
+        if not self.wants_http(url):
+            return None
+
+        # The cache index and bodies are on disk; keep them off the event loop
+        cached = await asyncio.to_thread(http_cache.get, url)
+        session = await self.get_session()
+        headers = {"User-Agent": network_manager.get_random_user_agent()}
+        headers.update(http_cache.conditional_headers(cached))
+        proxy = network_manager.get_proxy_config()
+        started = time.monotonic()
+        try:
+            # A deadline rather than the session timeout, so a PDF download can be given longer
+            async with asyncio.timeout(host_scheduler.timeout(url, "http", settings.HTTP_TIMEOUT)) as deadline, \
+                    session.get(url, headers=headers, proxy=proxy["server"] if proxy else None,
+                                timeout=aiohttp.ClientTimeout()) as response:
+                content_type = response.headers.get("Content-Type", "").lower()
+                final_url = str(response.url)
+                if is_server_failure(response.status):
+                    host_scheduler.record_failure(url)
+                else:
+                    host_scheduler.record_success(url, "http", time.monotonic() - started)
+
+                if response.status == 304 and cached is not None:
+                    await asyncio.to_thread(http_cache.touch, cached, response.headers)
+                    if "pdf" in cached.content_type:
+                        return FetchResult(final_url, 200, "", cached.content_type, via="cache", path=cached.path)
+                    html = await asyncio.to_thread(cached.read_text)
+                    content_type = cached.content_type
+                    from_cache = True
+                elif response.status in (404, 410):
+                    return FetchResult(final_url, response.status, "", content_type)
+                elif response.status >= 400:
+                    # 403/429/503 are often bot walls that a real browser gets through
+                    # (the crawler skips the browser if this failure opened the host's circuit)
+                    logger.debug(f"HTTP {response.status} for {url}, falling back to browser")
+                    self.fallbacks += 1
+                    return None
+                elif "pdf" in content_type:
+                    # Kept from this response, so the report isn't downloaded a second time
+                    deadline.reschedule(asyncio.get_running_loop().time() + settings.PDF_DOWNLOAD_TIMEOUT)
+                    tmp_name = await save_body(response, settings.PDF_MAX_BYTES, ".pdf")
+                    if tmp_name is None:
+                        logger.warning(f"PDF larger than {settings.PDF_MAX_BYTES} bytes, skipped: {url}")
+                        return FetchResult(final_url, response.status, "", content_type)
+                    entry = await asyncio.to_thread(http_cache.put_file, url, tmp_name, response.headers, "application/pdf")
+                    self.http_pages += 1
+                    if entry is not None:
+                        return FetchResult(final_url, response.status, "", content_type, path=entry.path)
+                    return FetchResult(final_url, response.status, "", content_type, path=Path(tmp_name), temporary=True)
+                elif "html" not in content_type and "xml" not in content_type:
+                    return FetchResult(final_url, response.status, "", content_type)
+                else:
+                    chunks = []
+                    size = 0
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= settings.HTTP_MAX_BYTES:
+                            break
+                    html = b"".join(chunks).decode(response.charset or "utf-8", errors="replace")
+                    from_cache = False
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"HTTP fetch failed for {url}: {e!r}")
+            host_scheduler.record_failure(url, timed_out=isinstance(e, asyncio.TimeoutError))
+            self.fallbacks += 1
+            return None
+        except LookupError as e:
+            logger.debug(f"HTTP fetch failed for {url}: {e}")
+            self.fallbacks += 1
+            return None
+
+        if needs_browser(html):
+            self._remember(url, "browser")
+            self.fallbacks += 1
+            return None
+
+        if not from_cache:
+            await asyncio.to_thread(http_cache.put, url, html.encode("utf-8"), response.headers, content_type)
+
+        self._remember(url, "http")
+        self.http_pages += 1
+        return FetchResult(final_url, 200, html, content_type, via="cache" if from_cache else "http")
+
+    async def fetch_browser(self, url: str, page: Page, record_failures: bool = True) -> FetchResult:
+        """
+        Navigates `page` to `url` and returns the rendered DOM. Timeouts,
+        network errors and 5xx/429 count against the host's circuit breaker,
+        unless `record_failures` is False because an HTTP attempt at the same
+        URL already reported this attempt's outcome.
+        """
+        timeout = host_scheduler.timeout(url, "browser", settings.REQUEST_TIMEOUT / 1000)
+        started = time.monotonic()
+        try:
+            response = await page.goto(url, timeout=timeout * 1000, wait_until="domcontentloaded")
+        except PlaywrightError as e:
+            if record_failures and is_transient_error(e):
+                host_scheduler.record_failure(url, timed_out=isinstance(e, PlaywrightTimeoutError))
+            raise
+        if response is not None and is_server_failure(response.status):
+            if record_failures:
+                host_scheduler.record_failure(url)
+        else:
+            host_scheduler.record_success(url, "browser", time.monotonic() - started)
+        content = await page.content()
+        self._remember(url, "browser")
+        self.browser_pages += 1
+        status = response.status if response else 200
+        content_type = response.headers.get("content-type", "text/html") if response else "text/html"
+        if status < 400:
+            # Rendered DOMs have no validators; they are kept for --offline runs
+            await asyncio.to_thread(http_cache.put, url, content.encode("utf-8"), content_type=content_type)
+        return FetchResult(page.url or url, status, content, content_type, via="browser")
+
+    async def fetch(self, url: str, context: BrowserContext | None = None, page: Page | None = None,
+                    pool: PagePool | None = None) -> FetchResult | None:
+        """
+        Convenience wrapper for one-off fetches: waits for the host's politeness
+        slot, tries HTTP, then falls back to `page`, a page borrowed from `pool`
+        or a temporary page opened in `context`. Returns None if no tier is
+        available.
+        """
+        if not settings.OFFLINE:
+            await host_scheduler.acquire(url)
+        attempted_http = self.wants_http(url)
+        result = await self.try_http(url)
+        if result is not None:
+            return result
+
+        if page is None and pool is None and context is None:
+            return None
+
+        if attempted_http:
+            # The browser is a second request to the same host
+            await host_scheduler.acquire(url)
+
+        if page is None and pool is not None:
+            async with pool.page() as pooled:
+                return await self.fetch_browser(url, pooled, record_failures=not attempted_http)
+
+        temp_page = None
+        try:
+            if page is None:
+                temp_page = page = await context.new_page()
+            return await self.fetch_browser(url, page, record_failures=not attempted_http)
+        finally:
+            if temp_page is not None:
+                await temp_page.close()
+
+    def summary(self) -> str:
+        return (
+            f"Fetched {self.http_pages} pages over HTTP and {self.browser_pages} with the browser "
+            f"({self.fallbacks} HTTP fallbacks)"
+        )
+
+fetch_tier = FetchTier()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List
+
+from aiohttp import web
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+@dataclass
+class StageStats:
+    stage: str
+    count: int
+    total: float  # Seconds
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+def _quantile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+class Metrics:
+    """
+    Per-stage timings and counters for a run.
+
+    `span(stage)` times a block (sync or async code alike). Every duration is
+    kept per stage for the summary table and Prometheus quantiles; with
+    TRACE_PATH set, spans are also recorded as Chrome trace events (one track
+    per asyncio task or thread) for chrome://tracing or Perfetto.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, array] = defaultdict(lambda: array("d"))
+        self.counters: Counter = Counter()
+        self._events: List[dict] = []
+        self._tracks: Dict[int, int] = {}
+        self._origin = time.perf_counter()
+        self.dropped_events = 0
+
+    @property
+    def tracing(self) -> bool:
+        return bool(settings.TRACE_PATH)
+
+    def _track(self) -> int:
+        """Trace track of the caller: its asyncio task, else its thread. Lock held."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = len(self._tracks) + 1
+            name = task.get_name() if task is not None else threading.current_thread().name
+            self._events.append({"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": track,
+                                 "args": {"name": name}})
+        return track
+
+    def record(self, stage: str, start: float, duration: float, args: dict | None = None):
+        """Adds a measured duration (`start` from `time.perf_counter()`)."""
+        with self._lock:
+            self._durations[stage].append(duration)
+            if not self.tracing:
+                return
+            if len(self._events) >= settings.TRACE_MAX_EVENTS:
+                self.dropped_events += 1
+                return
+            event = {
+                "name": stage, "cat": stage.split(".")[0], "ph": "X", "pid": os.getpid(), "tid": self._track(),
+                "ts": round((start - self._origin) * 1e6), "dur": round(duration * 1e6),
+            }
+            if args:
+                event["args"] = args
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, stage: str, **args) -> Iterator[None]:
+        """Times the enclosed block as `stage`; `args` show up in the trace."""
+        if not settings.METRICS_ENABLED:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, start, time.perf_counter() - start, args)
+
+    def count(self, name: str, value: float = 1):
+        if settings.METRICS_ENABLED:
+            with self._lock:
+                self.counters[name] += value
+
+    def stats(self) -> List[StageStats]:
+        with self._lock:
+            snapshot = {stage: sorted(durations) for stage, durations in self._durations.items()}
+        return [
+            StageStats(stage, len(ordered), sum(ordered), sum(ordered) / len(ordered),
+                       *(_quantile(ordered, q) for q in QUANTILES), ordered[-1])
+            for stage, ordered in sorted(snapshot.items()) if ordered
+        ]
+
+    def write_trace(self, path: str):
+        """Writes the Chrome trace (JSON object format)."""
+        with self._lock:
+            events = list(self._events)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"dropped_events": self.dropped_events}}, f)
+        logger.info(f"Wrote {len(events)} trace events to {path}")
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP esg_stage_duration_seconds Time spent per pipeline stage.",
+            "# TYPE esg_stage_duration_seconds summary",
+        ]
+        for stats in self.stats():
+            label = f'stage="{stats.stage}"'
+            for q, value in zip(QUANTILES, (stats.p50, stats.p95, stats.p99)):
+                lines.append(f'esg_stage_duration_seconds{{{label},quantile="{q}"}} {value:.6f}')
+            lines.append(f"esg_stage_duration_seconds_sum{{{label}}} {stats.total:.6f}")
+            lines.append(f"esg_stage_duration_seconds_count{{{label}}} {stats.count}")
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            metric = "esg_" + re.sub(r"[^a-zA-Z0-9_]", "_", name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Writes the metrics file atomically (e.g. for node_exporter's textfile collector)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    async def serve(self, port: int) -> web.AppRunner:
+        """Serves `/metrics` on `port` until the returned runner is cleaned up."""
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(text=self.prometheus(), content_type="text/plain", charset="utf-8",
+                                headers={"X-Content-Type-Options": "nosniff"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, settings.METRICS_HOST, port).start()
+        logger.info(f"Serving metrics on http://{settings.METRICS_HOST}:{port}/metrics")
+        return runner
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self.counters.clear()
+            self._events.clear()
+            self._tracks.clear()
+            self._origin = time.perf_counter()
+            self.dropped_events = 0
+
+metrics = Metrics()
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import math
+import random
+import time
+import urllib.request
+import urllib.robotparser
+from dataclasses import dataclass
+from typing import Dict
+from urllib.parse import urlparse
+
+from .config import settings
+from .network import network_manager
+
+logger = logging.getLogger(__name__)
+
+class HostUnavailable(Exception):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+@dataclass
+class HostStats:
+    """Queue wait and failure accounting for a single host."""
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    crawl_delay: float | None = None
+    failures: int = 0  # Timeouts, network errors, 5xx and 429 responses
+    timeouts: int = 0
+    circuit_trips: int = 0
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+class TokenBucket:
+    """
+    Classic token bucket. `reserve` never blocks: it takes a token (possibly
+    going into debt) and returns how long the caller must wait for it, so
+    concurrent callers are spaced out in arrival order.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = asyncio.get_running_loop().time()
+
+    def reserve(self, amount: float = 1) -> float:
+        now = asyncio.get_running_loop().time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+class LatencyEstimator:
+    """
+    Smoothed response time and its variation, as TCP estimates round trips
+    (RFC 6298). `timeout` is the time a response can take before it is
+    unusually late for this host.
+    """
+    def __init__(self):
+        self.samples = 0
+        self.srtt = 0.0
+        self.rttvar = 0.0
+
+    def add(self, seconds: float):
+        if not self.samples:
+            self.srtt = seconds
+            self.rttvar = seconds / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - seconds)
+            self.srtt = 0.875 * self.srtt + 0.125 * seconds
+        self.samples += 1
+
+    @property
+    def timeout(self) -> float:
+        return self.srtt + 4 * self.rttvar
+
+class _HostState:
+    def __init__(self):
+        self.bucket: TokenBucket | None = None
+        self.ready: asyncio.Task | None = None
+        self.stats = HostStats()
+        # Per fetch tier ("http", "browser"): rendering makes browser responses much slower
+        self.latency: Dict[str, LatencyEstimator] = {}
+        self.timeout_backoff = 1  # Doubled on every timeout, reset by a response
+        # Circuit breaker: closed while open_until is None
+        self.consecutive_failures = 0
+        self.open_until: float | None = None
+        self.probing = False  # A half-open host's probe request is in flight
+        self.probe_until = 0.0  # ...and is given up on after this
+        self.trips = 0
+
+class HostScheduler:
+    """
+    Per-host politeness: every host gets its own token bucket, so requests to
+    different hosts proceed in parallel while each host is still paced.
+    Optionally honours the `Crawl-delay` directive of the host's robots.txt.
+
+    Also tracks each host's health from the outcomes the fetch tier reports:
+    timeouts adapt to the host's observed response times, and a circuit
+    breaker pauses a host after CIRCUIT_BREAKER_THRESHOLD consecutive
+    failures. Once the cooldown has passed, one probe request is let through;
+    a response closes the circuit, a failure reopens it for twice as long.
+    """
+    def __init__(self, rate: float | None = None, burst: int | None = None,
+                 jitter: float | None = None, respect_crawl_delay: bool | None = None):
+        self.rate = rate or settings.HOST_RATE_LIMIT
+        self.burst = burst or settings.HOST_BURST
+        self.jitter = settings.HOST_JITTER if jitter is None else jitter
+        self.respect_crawl_delay = (settings.RESPECT_CRAWL_DELAY
+                                    if respect_crawl_delay is None else respect_crawl_delay)
+        self._hosts: Dict[str, _HostState] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    @staticmethod
+    def _fetch_crawl_delay(scheme: str, host: str) -> float | None:
+        """Blocking robots.txt lookup, run in a thread."""
+        robots_url = f"{scheme}://{host}/robots.txt"
+        request = urllib.request.Request(robots_url, headers={"User-Agent": network_manager.get_random_user_agent()})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                lines = response.read().decode("utf-8", errors="ignore").splitlines()
+        except Exception as e:
+            logger.debug(f"No robots.txt for {host}: {e}")
+            return None
+
+        parser = urllib.robotparser.RobotFileParser(robots_url)
+        parser.parse(lines)
+        delay = parser.crawl_delay("*")
+        return float(delay) if delay else None
+
+    async def _prepare(self, state: _HostState, scheme: str, host: str):
+        rate = self.rate
+        try:
+            if self.respect_crawl_delay:
+                delay = await asyncio.to_thread(self._fetch_crawl_delay, scheme, host)
+                if delay:
+                    state.stats.crawl_delay = delay
+                    rate = min(rate, 1.0 / delay)
+                    logger.info(f"robots.txt Crawl-delay for {host}: {delay}s")
+        finally:
+            state.bucket = TokenBucket(rate, self.burst)
+
+    async def acquire(self, url: str) -> float:
+        """
+        Waits until `url`'s host may be fetched again. Returns the time spent
+        queueing, in seconds.
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        state = self._state(host)
+        if state.ready is None:
+            state.ready = asyncio.create_task(self._prepare(state, parsed.scheme or "https", host))
+        if not state.ready.done():
+            await asyncio.shield(state.ready)
+
+        delay = state.bucket.reserve()
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        waited = loop.time() - start
+        stats = state.stats
+        stats.requests += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        return waited
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def timeout(self, url: str, tier: str, ceiling: float) -> float:
+        """
+        Seconds to wait for a `tier` response from `url`'s host: a generous
+        margin over its usual response time once ADAPTIVE_TIMEOUT_SAMPLES
+        responses were seen, never more than `ceiling`.
+        """
+        if not settings.ADAPTIVE_TIMEOUTS:
+            return ceiling
+        state = self._state(self.host_of(url))
+        estimator = state.latency.get(tier)
+        if estimator is None or estimator.samples < settings.ADAPTIVE_TIMEOUT_SAMPLES:
+            return ceiling
+        return min(ceiling, max(settings.ADAPTIVE_TIMEOUT_MIN, estimator.timeout) * state.timeout_backoff)
+
+    def record_success(self, url: str, tier: str, seconds: float):
+        """The host answered (any status except 5xx/429) after `seconds`."""
+        host = self.host_of(url)
+        state = self._state(host)
+        state.latency.setdefault(tier, LatencyEstimator()).add(seconds)
+        state.timeout_backoff = 1
+        state.consecutive_failures = 0
+        if state.open_until is not None:
+            logger.info(f"Circuit closed for {host}: it is responding again")
+            state.open_until = None
+            state.probing = False
+            state.trips = 0
+
+    def record_failure(self, url: str, timed_out: bool = False):
+        """A request to the host timed out, failed at the network level or got a 5xx/429."""
+        host = self.host_of(url)
+        state = self._state(host)
+        state.stats.failures += 1
+        state.consecutive_failures += 1
+        if timed_out:
+            state.stats.timeouts += 1
+            # Like TCP's RTO backoff: a slow host gets longer timeouts until it answers again
+            state.timeout_backoff = min(state.timeout_backoff * 2, 64)
+
+        tripped = state.open_until is None and state.consecutive_failures >= settings.CIRCUIT_BREAKER_THRESHOLD
+        if tripped or state.probing:
+            state.trips += 1
+            state.stats.circuit_trips += 1
+            state.probing = False
+            if state.trips > settings.CIRCUIT_BREAKER_MAX_TRIPS:
+                state.open_until = math.inf
+                logger.error(f"Giving up on {host}: still failing after {state.trips - 1} pauses")
+                return
+            cooldown = min(settings.CIRCUIT_BREAKER_COOLDOWN * 2 ** (state.trips - 1), settings.CIRCUIT_BREAKER_MAX_COOLDOWN)
+            state.open_until = time.monotonic() + cooldown
+            logger.warning(f"Circuit open for {host} after {state.consecutive_failures} consecutive failures, "
+                           f"pausing it for {cooldown:.0f}s")
+
+    def circuit_open(self, url: str) -> bool:
+        """True while requests to `url`'s host are held back (half-open included)."""
+        state = self._hosts.get(self.host_of(url))
+        return state is not None and state.open_until is not None
+
+    def circuit_wait(self, url: str) -> float:
+        """
+        Seconds until a request to `url`'s host may be sent: 0 to go ahead
+        now, `math.inf` once the host was given up. When the cooldown is
+        over, the first caller gets 0 and its request is the probe.
+        """
+        state = self._hosts.get(self.host_of(url))
+        if state is None or state.open_until is None:
+            return 0.0
+        now = time.monotonic()
+        if now < state.open_until:
+            return state.open_until - now
+        if not state.probing or now >= state.probe_until:
+            # Half-open. Should the probe never report back, another one is let through
+            state.probing = True
+            state.probe_until = now + (self.timeout(url, "http", settings.HTTP_TIMEOUT)
+                                       + self.timeout(url, "browser", settings.REQUEST_TIMEOUT / 1000))
+            return 0.0
+        # Check back shortly; the probe's outcome decides
+        return min(state.probe_until - now, settings.ADAPTIVE_TIMEOUT_MIN)
+
+    def report(self) -> Dict[str, HostStats]:
+        """Returns per-host queue wait statistics."""
+        return {host: state.stats for host, state in self._hosts.items()}
+
+    def log_report(self):
+        for host, stats in self.report().items():
+            logger.info(
+                f"Host {host}: {stats.requests} requests, "
+                f"avg wait {stats.avg_wait:.2f}s, max wait {stats.max_wait:.2f}s, "
+                f"{stats.failures} failures ({stats.timeouts} timeouts), circuit opened {stats.circuit_trips} times"
+            )
+
+    def reset(self):
+        """Forgets all hosts (buckets, robots.txt delays, health and statistics)."""
+        self._hosts.clear()
+
+host_scheduler = HostScheduler()
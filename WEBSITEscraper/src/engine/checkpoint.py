@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CrawlInfo:
+    crawl_id: str
+    start_url: str
+    max_depth: int
+    max_pages: int
+    created_at: float
+
+def new_crawl_id() -> str:
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+class CrawlCheckpoint:
+    """
+    Incremental, resumable record of one crawl: every enqueued URL (the
+    visited set and, while not done, the frontier) and the text of every
+    completed page.
+
+    Writes are buffered and flushed in a background thread every
+    CHECKPOINT_BATCH operations or CHECKPOINT_INTERVAL seconds, so the crawl
+    loop never waits on SQLite. A crash loses at most the last unflushed
+    batch; those URLs are simply fetched again after `--resume`.
+    """
+    def __init__(self, crawl_id: str, path: str | None = None):
+        self.crawl_id = crawl_id
+        self.path = Path(path or settings.CHECKPOINT_PATH)
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._flushing: asyncio.Task | None = None
+        self.completed = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS crawls ("
+                " crawl_id TEXT PRIMARY KEY, start_url TEXT, max_depth INTEGER, max_pages INTEGER,"
+                " created_at REAL, updated_at REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                " crawl_id TEXT, url TEXT, depth INTEGER, priority REAL, done INTEGER DEFAULT 0,"
+                " PRIMARY KEY (crawl_id, url))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " crawl_id TEXT, url TEXT, content_type TEXT, depth INTEGER, text BLOB,"
+                " PRIMARY KEY (crawl_id, url))"
+            )
+        return self._db
+
+    # --- Crawl metadata ---
+
+    def start(self, start_url: str, max_depth: int, max_pages: int):
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT OR IGNORE INTO crawls VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.crawl_id, start_url, max_depth, max_pages, time.time(), time.time()),
+                )
+
+    def info(self) -> CrawlInfo | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT crawl_id, start_url, max_depth, max_pages, created_at FROM crawls WHERE crawl_id = ?",
+                (self.crawl_id,),
+            ).fetchone()
+        return CrawlInfo(*row) if row else None
+
+    # --- Resume ---
+
+    def visited(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT url FROM urls WHERE crawl_id = ?", (self.crawl_id,)).fetchall()
+        return (row[0] for row in rows)
+
+    def queued(self) -> List[Tuple[str, int, float]]:
+        """URLs enqueued but not completed, including those in flight when the crawl stopped."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT url, depth, priority FROM urls WHERE crawl_id = ? AND done = 0",
+                (self.crawl_id,),
+            ).fetchall()
+
+    def completed_pages(self) -> Iterator[Tuple[str, str, str, int]]:
+        """Stored pages in completion order as `(url, content, content_type, depth)`."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT url, content_type, depth, text FROM pages WHERE crawl_id = ? ORDER BY rowid",
+                (self.crawl_id,),
+            ).fetchall()
+        for url, content_type, depth, text in rows:
+            yield url, zlib.decompress(text).decode("utf-8"), content_type, depth
+
+    def completed_count(self) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM urls WHERE crawl_id = ? AND done = 1", (self.crawl_id,)
+            ).fetchone()[0]
+
+    # --- Incremental writes ---
+
+    def enqueued(self, url: str, depth: int, priority: float):
+        self._pending.append(("enqueued", url, depth, priority))
+        self._maybe_flush()
+
+    def done(self, url: str, content: str | None = None, content_type: str = "", depth: int = 0):
+        """Marks `url` as completed, storing its text when a page was kept."""
+        self.completed += 1
+        self._pending.append(("done", url, content, content_type, depth))
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self._flushing is not None and not self._flushing.done():
+            return
+        if (len(self._pending) >= settings.CHECKPOINT_BATCH
+                or time.monotonic() - self._last_flush >= settings.CHECKPOINT_INTERVAL):
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            self._flushing = asyncio.create_task(asyncio.to_thread(self._write, batch))
+
+    def _write(self, batch: List[tuple]):
+        """Runs in a thread: applies a batch in one transaction, in order."""
+        try:
+            self._apply(batch)
+        except sqlite3.Error as e:
+            logger.error(f"Checkpoint write failed for crawl {self.crawl_id}: {e}")
+
+    def _apply(self, batch: List[tuple]):
+        with self._lock:
+            db = self._connect()
+            with db:
+                for op in batch:
+                    if op[0] == "enqueued":
+                        db.execute(
+                            "INSERT OR IGNORE INTO urls (crawl_id, url, depth, priority) VALUES (?, ?, ?, ?)",
+                            (self.crawl_id, op[1], op[2], op[3]),
+                        )
+                    else:
+                        _, url, content, content_type, depth = op
+                        db.execute("UPDATE urls SET done = 1 WHERE crawl_id = ? AND url = ?", (self.crawl_id, url))
+                        if content is not None:
+                            db.execute(
+                                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                                (self.crawl_id, url, content_type, depth, zlib.compress(content.encode("utf-8"))),
+                            )
+                db.execute("UPDATE crawls SET updated_at = ? WHERE crawl_id = ?", (time.time(), self.crawl_id))
+
+    async def flush(self):
+        """Writes everything still buffered (waits for a flush in progress first)."""
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        if self._pending:
+            batch, self._pending = self._pending, []
+            await asyncio.to_thread(self._write, batch)
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
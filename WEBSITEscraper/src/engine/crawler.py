@@ -1,102 +1,485 @@
-import asyncio
-from typing import Set, List
-from urllib.parse import urljoin, urlparse
-from collections import deque
-from bs4 import BeautifulSoup
-import logging
-
-from ..core.browser import BrowserManager
-from ..core.config import settings
-from ..core.network import network_manager
-
-logger = logging.getLogger(__name__)
-
-class Crawler:
-    """
-    Robust crawler engine that manages URL queues, depth, and visiting logic.
-    """
-    def __init__(self, browser_manager: BrowserManager):
-        self.browser_manager = browser_manager
-        self.visited_urls: Set[str] = set()
-        self.queue: deque = deque() # Queue of (url, depth) tuples
-        self.results: List[dict] = []
-
-    def is_valid_url(self, url: str, base_domain: str) -> bool:
-        """
-        Validates if a URL should be crawled based on domain restrictions.
-        """
-        parsed_url = urlparse(url)
-        parsed_base = urlparse(base_domain)
-        
-        # Must be same domain or subdomain
-        if parsed_url.netloc != parsed_base.netloc:
-             return False
-        
-        # Skip common non-content extensions
-        skip_exts = ['.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.zip']
-        if any(url.lower().endswith(ext) for ext in skip_exts):
-            return False
-            
-        return True
-
-    async def crawl(self, start_url: str):
-        """
-        Main crawling loop.
-        """
-        logger.info(f"Starting crawl for {start_url}")
-        self.queue.append((start_url, 0))
-        self.visited_urls.add(start_url)
-        
-        # Create a browser context for this session
-        context = await self.browser_manager.get_new_context()
-        page = await self.browser_manager.get_new_page(context)
-        
-        try:
-            while self.queue:
-                current_url, depth = self.queue.popleft()
-                
-                if depth > settings.MAX_DEPTH:
-                    continue
-                
-                logger.info(f"Visiting: {current_url} (Depth: {depth})")
-                
-                # Polite delay
-                await network_manager.natural_delay()
-                
-                try:
-                    await page.goto(current_url, timeout=settings.REQUEST_TIMEOUT, wait_until="domcontentloaded")
-                    content = await page.content()
-                    
-                    # Store result (raw for now, pipeline handles extraction)
-                    self.results.append({
-                        "url": current_url,
-                        "content": content,
-                        "depth": depth
-                    })
-                    
-                    # Extract links if not at max depth
-                    if depth < settings.MAX_DEPTH:
-                        soup = BeautifulSoup(content, 'html.parser')
-                        links = soup.find_all('a', href=True)
-                        
-                        for link in links:
-                            href = link['href']
-                            full_url = urljoin(current_url, href)
-                            
-                            # Remove fragments
-                            full_url = full_url.split('#')[0]
-                            
-                            if (full_url not in self.visited_urls and 
-                                self.is_valid_url(full_url, start_url)):
-                                
-                                self.visited_urls.add(full_url)
-                                self.queue.append((full_url, depth + 1))
-                                
-                except Exception as e:
-                    logger.error(f"Failed to crawl {current_url}: {e}")
-                    # Could add retry logic here if needed
-                    
-        finally:
-            await context.close()
-            
-        return self.results
+import asyncio
+import math
+import random
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+import logging
+
+from ..core.browser import BrowserManager, PagePool, RequestBlocker
+from ..core.config import settings
+from ..core.fetcher import FetchResult, FetchTier, fetch_tier, is_server_failure, is_transient_error
+from ..core.metrics import metrics
+from ..core.scheduler import HostScheduler, HostUnavailable, host_scheduler
+from ..pipeline.parsing import Link, parse_html, parse_html_async
+from ..pipeline.pdf import fetch_pdf, is_pdf_url
+from ..utils import get_pdf_text
+from .checkpoint import CrawlCheckpoint
+from .frontier import Frontier
+from .shared_frontier import SharedFrontier
+from .sitemap import SitemapDiscovery
+from .urls import VisitedSet
+from .page_store import PageRecord, PageStore
+from .relevance import relevance_score
+
+logger = logging.getLogger(__name__)
+
+class Crawler:
+    """
+    Robust crawler engine that manages URL queues, depth, and visiting logic.
+
+    Pages are fetched by a pool of `concurrency` workers that share one
+    best-first frontier and one visited set. Browser fetches borrow a warm
+    page from a shared `PagePool`.
+    Links are ranked by ESG relevance, so with a `max_pages` budget the most
+    promising pages are fetched first.
+
+    Pages go into a memory-bounded `PageStore`. `crawl` returns all of their
+    records at the end; `pages` streams them while the crawl is still running.
+    With a `checkpoint`, progress is persisted and an interrupted crawl
+    continues where it stopped. With a `SharedFrontier`, several crawler
+    processes (possibly on different machines) work through one crawl.
+    With `SitemapDiscovery`, the frontier is seeded from the site's sitemaps
+    and only URLs that are new or changed since the last run are fetched.
+
+    A fetch that times out, fails at the network level or gets a 5xx/429 is
+    retried up to MAX_RETRIES times with jittered exponential backoff. The
+    URL waits on a timer rather than in a worker, so workers keep fetching
+    other URLs meanwhile; URLs of a host whose circuit breaker is open are
+    set aside the same way until the host may be probed again.
+    """
+    def __init__(self, browser_manager: BrowserManager, concurrency: int | None = None,
+                 scheduler: HostScheduler | None = None, fetcher: FetchTier | None = None,
+                 on_page: Callable[[PageRecord], None] | None = None, max_pages: int | None = None,
+                 store: PageStore | None = None, checkpoint: CrawlCheckpoint | None = None,
+                 frontier: Frontier | SharedFrontier | None = None, sitemaps: SitemapDiscovery | None = None):
+        self.browser_manager = browser_manager
+        self.scheduler = scheduler or host_scheduler
+        self.fetch_tier = fetcher or fetch_tier
+        self.concurrency = max(1, concurrency or settings.CONCURRENCY_LIMIT)
+        # Canonical URL fingerprints, so tracking parameters, index.html etc. are fetched once
+        self.visited_urls = VisitedSet()
+        self.frontier = frontier if frontier is not None else Frontier()
+        self.max_pages = settings.MAX_PAGES if max_pages is None else max_pages  # 0 = unlimited
+        self.pages_started = 0
+        self.pages_stored = 0
+        self.store = store if store is not None else PageStore()
+        self.checkpoint = checkpoint
+        if sitemaps is None and settings.SITEMAP_DISCOVERY:
+            sitemaps = SitemapDiscovery()
+        self.sitemaps = sitemaps
+        # Called with every stored page, e.g. to start extraction while crawling
+        self.on_page = on_page
+        # Per-crawl request blocking counters (None when blocking is disabled)
+        self.request_blocker = RequestBlocker() if settings.BLOCK_REQUESTS else None
+        self._stopping = False
+        self.page_pool: PagePool | None = None
+        self._pool_lock: asyncio.Lock | None = None
+        self._output: asyncio.Queue | None = None  # Set while streaming via `pages`
+        self._attempts: Dict[str, int] = {}  # Failed fetches of URLs still being retried
+        self._retry_timers: Dict[str, Tuple[asyncio.TimerHandle, int, float]] = {}  # url -> (timer, depth, priority)
+        self._requeued: asyncio.Event | None = None
+
+    @property
+    def results(self) -> List[PageRecord]:
+        return self.store.records
+
+    def is_valid_url(self, url: str, base_domain: str) -> bool:
+        """
+        Validates if a URL should be crawled based on domain restrictions.
+        """
+        parsed_url = urlparse(url)
+        parsed_base = urlparse(base_domain)
+
+        # Must be same domain or subdomain
+        if parsed_url.netloc != parsed_base.netloc:
+             return False
+
+        # Skip common non-content extensions
+        skip_exts = ['.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.zip']
+        if any(url.lower().endswith(ext) for ext in skip_exts):
+            return False
+
+        return True
+
+    def enqueue(self, url: str, depth: int, anchor_text: str = "") -> bool:
+        """
+        Adds a URL to the frontier unless it was already seen or is too deep.
+        """
+        if depth > settings.MAX_DEPTH or not self.visited_urls.add(url):
+            return False
+        priority = relevance_score(url, anchor_text, depth)
+        self.frontier.push(url, depth, priority)
+        if self.checkpoint:
+            self.checkpoint.enqueued(url, depth, priority)
+        return True
+
+    def stop(self):
+        """
+        Requests a graceful drain: pages already being fetched finish, queued
+        URLs are discarded and `crawl` returns the results collected so far.
+        """
+        self._stopping = True
+        for url, (timer, depth, priority) in self._retry_timers.items():
+            # Dropped like the queued URLs (a shared frontier hands them on)
+            timer.cancel()
+            self.frontier.release(url, depth, priority)
+        self._retry_timers.clear()
+        if self._requeued is not None:
+            self._requeued.set()
+        dropped = self.frontier.drain()
+        if dropped:
+            logger.info(f"Crawl stopping, dropped {dropped} queued URLs")
+
+    def filter_links(self, links: List[Link], start_url: str) -> List[Tuple[str, str]]:
+        """
+        Returns the crawlable same-domain links among a parsed page's links as
+        `(url, anchor_text)` pairs.
+        """
+        return [(link.url, link.text) for link in links if self.is_valid_url(link.url, start_url)]
+
+    def extract_links(self, content: str, current_url: str, start_url: str) -> List[Tuple[str, str]]:
+        """Parses `content` and returns its crawlable links, see `filter_links`."""
+        return self.filter_links(parse_html(content, current_url).links, start_url)
+
+    async def _get_pool(self) -> PagePool:
+        """
+        Creates the crawl's page pool on first use. Crawls of static sites
+        served entirely over HTTP never open a browser page.
+        """
+        async with self._pool_lock:
+            if self.page_pool is None:
+                pool = PagePool(self.browser_manager, size=self.concurrency, blocker=self.request_blocker)
+                await pool.start()
+                self.page_pool = pool
+            return self.page_pool
+
+    async def fetch(self, url: str, worker_id: int) -> FetchResult:
+        """
+        Fetches a URL over HTTP when possible, otherwise with a page borrowed
+        from the crawl's page pool.
+        """
+        attempted_http = self.fetch_tier.wants_http(url)
+        if attempted_http:
+            if not settings.OFFLINE:
+                # Per-host politeness: only waits on this URL's host
+                with metrics.span("fetch.wait", url=url):
+                    await self.scheduler.acquire(url)
+            with metrics.span("fetch.http", url=url):
+                result = await self.fetch_tier.try_http(url)
+            if result is not None:
+                return result
+
+            if self.scheduler.circuit_open(url):
+                # The HTTP attempt opened the host's circuit; don't follow up with a browser request
+                raise HostUnavailable(f"Circuit open for {self.scheduler.host_of(url)}")
+
+        if is_pdf_url(url):
+            # A browser would start a download rather than render it; fetch the file itself
+            with metrics.span("fetch.pdf", url=url):
+                return await fetch_pdf(url)
+
+        pool = await self._get_pool()
+        with metrics.span("fetch.wait", url=url):
+            await self.scheduler.acquire(url)
+        with metrics.span("fetch.browser", url=url):
+            async with pool.page() as page:
+                # A failed HTTP attempt already counted against the host
+                return await self.fetch_tier.fetch_browser(url, page, record_failures=not attempted_http)
+
+    async def _emit(self, page: PageRecord):
+        """
+        Hands a stored page on. When streaming, this blocks while the consumer
+        is behind, which in turn holds back the worker (backpressure).
+        """
+        self.pages_stored += 1
+        if self._output is not None:
+            await self._output.put(page)
+        if self.on_page:
+            self.on_page(page)
+
+    def _checkpoint_done(self, url: str, content: str | None = None, content_type: str = "", depth: int = 0):
+        if self.checkpoint:
+            self.checkpoint.done(url, content, content_type, depth)
+
+    def _restore(self) -> bool:
+        """
+        Loads the visited set and frontier of a checkpointed crawl. Returns
+        False when there is nothing to resume.
+        """
+        visited = list(self.checkpoint.visited())
+        if not visited:
+            return False
+        self.visited_urls.update(visited)
+        queued = self.checkpoint.queued()
+        for url, depth, priority in queued:
+            self.frontier.push(url, depth, priority)
+        self.pages_started = self.checkpoint.completed_count()
+        logger.info(
+            f"Resuming crawl {self.checkpoint.crawl_id}: {len(visited)} URLs seen, "
+            f"{self.pages_started} done, {len(queued)} queued"
+        )
+        return True
+
+    async def _replay(self):
+        """Hands the pages completed before the interruption to the pipeline again."""
+        for url, content, content_type, depth in self.checkpoint.completed_pages():
+            await self._emit(self.store.add(url, content, content_type, depth))
+
+    async def _seed_from_sitemaps(self, start_url: str):
+        """
+        Enqueues the new and changed sitemap URLs while the sitemaps stream in,
+        and marks unchanged ones visited so links don't lead back to them.
+        Falls back to a crawl from `start_url` when the site has no sitemap.
+        """
+        listed = False
+        async for url, changed in self.sitemaps.discover(start_url):
+            listed = True
+            if self._stopping:
+                break
+            if not self.is_valid_url(url, start_url):
+                continue
+            if changed:
+                self.enqueue(url, 0)
+            else:
+                self.visited_urls.add(url)
+        if not listed:
+            logger.info(f"No sitemap found for {start_url}, crawling from the start page")
+            self.enqueue(start_url, 0)
+        elif start_url not in self.visited_urls and await self.sitemaps.changed(start_url):
+            self.enqueue(start_url, 0)
+
+    def _retry_later(self, url: str, depth: int, priority: float, delay: float):
+        """
+        Hands `url` back to the frontier after `delay` seconds, with the
+        priority it was queued with; no worker waits for it.
+        """
+        def requeue():
+            del self._retry_timers[url]
+            self.frontier.requeue(url, depth, priority)
+            self._requeued.set()
+
+        # A shared frontier would otherwise let the lease run out during long circuit-breaker waits
+        self.frontier.hold(url, delay)
+        self._retry_timers[url] = (asyncio.get_running_loop().call_later(delay, requeue), depth, priority)
+
+    def _retry_delay(self, url: str, reason: str) -> float | None:
+        """
+        Counts a failed fetch of `url`. Returns the backoff before the next
+        attempt, or None once MAX_RETRIES retries have failed.
+        """
+        attempts = self._attempts.get(url, 0) + 1
+        if attempts > settings.MAX_RETRIES:
+            logger.warning(f"Giving up on {url} after {attempts} attempts: {reason}")
+            metrics.count("crawl.gave_up")
+            del self._attempts[url]
+            return None
+        self._attempts[url] = attempts
+        # Full backoff at most, half of it at least, so retries of many URLs don't arrive together
+        backoff = settings.RETRY_DELAY_BASE * 2 ** (attempts - 1)
+        delay = random.uniform(backoff / 2, backoff)
+        logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempts + 1} of {settings.MAX_RETRIES + 1}): {reason}")
+        metrics.count("crawl.retries")
+        return delay
+
+    async def _join(self):
+        """Waits until the frontier is drained and no URL is waiting to be retried."""
+        while True:
+            # Cleared first: a retry requeued while join() returns must not be missed
+            self._requeued.clear()
+            await self.frontier.join()
+            if not self._retry_timers and not self._requeued.is_set():
+                return
+            await self._requeued.wait()
+
+    async def _worker(self, worker_id: int, start_url: str):
+        """
+        Pulls URLs from the shared frontier until the crawl is cancelled.
+        """
+        while True:
+            current_url, depth, priority = await self.frontier.pop()
+            retry_in = None  # Set when the URL goes back to the frontier later
+            release = False  # Set when the URL is given back unfetched
+            try:
+                if self._stopping:
+                    release = True
+                    continue
+                wait = 0.0 if settings.OFFLINE else self.scheduler.circuit_wait(current_url)
+                if wait == math.inf:
+                    logger.debug(f"Skipping {current_url} (host given up)")
+                    metrics.count("crawl.host_unavailable")
+                    self._attempts.pop(current_url, None)
+                    self._checkpoint_done(current_url)
+                    continue
+                if wait > 0:
+                    # The host's circuit is open; doesn't count as an attempt
+                    retry_in = wait
+                    metrics.count("crawl.deferred")
+                    continue
+                retrying = current_url in self._attempts
+                if not retrying and self.max_pages and (
+                        self.pages_started >= self.max_pages or not await self.frontier.claim(self.max_pages)):
+                    logger.info(f"Page budget of {self.max_pages} reached")
+                    self.stop()
+                    release = True
+                    continue
+                if not retrying:
+                    self.pages_started += 1
+
+                logger.info(f"[worker {worker_id}] Visiting: {current_url} (Depth: {depth})")
+
+                try:
+                    with metrics.span("crawl.fetch", url=current_url):
+                        result = await self.fetch(current_url, worker_id)
+                except Exception as e:
+                    reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+                    if not is_transient_error(e):
+                        # Would fail the same way again
+                        logger.warning(f"Failed to fetch {current_url}: {reason}")
+                        metrics.count("crawl.errors")
+                        self._attempts.pop(current_url, None)
+                        self._checkpoint_done(current_url)
+                        continue
+                    retry_in = self._retry_delay(current_url, reason)
+                    if retry_in is None:
+                        metrics.count("crawl.errors")
+                        self._checkpoint_done(current_url)
+                    continue
+                metrics.count(f"crawl.fetched.{result.via}")
+                if is_server_failure(result.status) and result.via != "cache":
+                    retry_in = self._retry_delay(current_url, f"HTTP {result.status}")
+                    if retry_in is None:
+                        self._checkpoint_done(current_url)
+                    continue
+                self._attempts.pop(current_url, None)
+                if result.status >= 400:
+                    logger.debug(f"Skipping {current_url} (HTTP {result.status})")
+                    self._checkpoint_done(current_url)
+                    continue
+                links = []
+                if "pdf" in result.content_type:
+                    # Reports are often only published as PDFs; keep their text
+                    if result.path is not None:
+                        content = await get_pdf_text(current_url, downloaded=(result.path, result.temporary))
+                    else:
+                        content = ""  # Over PDF_MAX_BYTES
+                elif result.is_html:
+                    # One parse yields both the outgoing links and the cleaned text
+                    parsed = await parse_html_async(result.content, result.url)
+                    content = parsed.to_markdown()
+                    links = parsed.links
+                else:
+                    logger.debug(f"Skipping {current_url} ({result.content_type})")
+                    self._checkpoint_done(current_url)
+                    continue
+
+                # Store the cleaned text (compressed, pipeline handles extraction)
+                # Time spent here beyond storing is backpressure from the pipeline
+                with metrics.span("crawl.emit", url=current_url):
+                    await self._emit(self.store.add(current_url, content, result.content_type, depth))
+                if self.sitemaps:
+                    self.sitemaps.crawled(current_url)
+
+                # Extract links if not at max depth
+                if depth < settings.MAX_DEPTH and not self._stopping:
+                    for full_url, anchor_text in self.filter_links(links, start_url):
+                        self.enqueue(full_url, depth + 1, anchor_text)
+
+                # After the links, so a checkpointed page never loses its children
+                self._checkpoint_done(current_url, content, result.content_type, depth)
+
+            except Exception as e:
+                logger.error(f"Failed to crawl {current_url}: {e}")
+                metrics.count("crawl.errors")
+                self._checkpoint_done(current_url)
+            finally:
+                if release or (retry_in is not None and self._stopping):
+                    # Never acked: a shared frontier hands it to another process, not marks it done
+                    self.frontier.release(current_url, depth, priority)
+                    self.frontier.done(None)
+                elif retry_in is not None:
+                    self._retry_later(current_url, depth, priority, retry_in)
+                    # Not acked: still outstanding for the checkpoint and a shared frontier
+                    self.frontier.done(None)
+                else:
+                    self.frontier.done(current_url)
+
+    async def crawl(self, start_url: str):
+        """
+        Main crawling loop. Runs the worker pool until the frontier is drained.
+        """
+        logger.info(f"Starting crawl for {start_url} with {self.concurrency} workers")
+        self._stopping = False
+        self.pages_started = 0
+        self.pages_stored = 0
+        resumed = self.checkpoint is not None and self._restore()
+        seed_from_sitemaps = self.sitemaps is not None and not resumed and not settings.OFFLINE
+        if not resumed and not seed_from_sitemaps:
+            self.enqueue(start_url, 0)
+
+        # The page pool is shared by all workers and only created if needed
+        self.page_pool = None
+        self._pool_lock = asyncio.Lock()
+        self._attempts.clear()
+        self._requeued = asyncio.Event()
+        workers = [
+            asyncio.create_task(self._worker(i, start_url))
+            for i in range(self.concurrency)
+        ]
+
+        try:
+            if resumed:
+                await self._replay()
+            if seed_from_sitemaps:
+                # Workers start on the first URLs while the sitemaps are still streaming
+                await self._seed_from_sitemaps(start_url)
+            await self._join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for timer, _, _ in self._retry_timers.values():
+                timer.cancel()
+            self._retry_timers.clear()
+            if self.checkpoint:
+                await self.checkpoint.flush()
+            if self.sitemaps:
+                await self.sitemaps.finish()
+                logger.info(self.sitemaps.summary())
+            if self.page_pool is not None:
+                await self.page_pool.close()
+                logger.info(self.page_pool.summary())
+            self.scheduler.log_report()
+            logger.info(self.fetch_tier.summary())
+            logger.info(self.visited_urls.summary())
+            if self.request_blocker:
+                logger.info(self.request_blocker.summary())
+
+        return self.results
+
+    async def pages(self, start_url: str) -> AsyncIterator[PageRecord]:
+        """
+        Runs the crawl in the background and yields pages as they are stored.
+        At most PIPELINE_QUEUE_SIZE pages are buffered; closing the iterator
+        early stops the crawl.
+        """
+        self._output = queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        crawl_task = asyncio.create_task(self.crawl(start_url))
+        try:
+            while True:
+                getter = asyncio.create_task(queue.get())
+                await asyncio.wait({getter, crawl_task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                # Workers only finish after handing over their pages
+                while not queue.empty():
+                    yield queue.get_nowait()
+                crawl_task.result()
+                return
+        finally:
+            if not crawl_task.done():
+                self.stop()
+                crawl_task.cancel()
+                await asyncio.gather(crawl_task, return_exceptions=True)
+            self._output = None
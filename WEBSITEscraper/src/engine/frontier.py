@@ -0,0 +1,66 @@
+import asyncio
+import itertools
+from typing import Tuple
+
+class Frontier:
+    """
+    Best-first crawl frontier: URLs are handed out highest priority first,
+    ties in insertion order. Mirrors the `asyncio.Queue` protocol (`done`
+    after each `pop`, `join` to wait for all work) so workers can share it.
+    """
+    def __init__(self):
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def push(self, url: str, depth: int, priority: float = 0.0):
+        self._queue.put_nowait((-priority, next(self._counter), url, depth))
+
+    async def pop(self) -> Tuple[str, int, float]:
+        """Waits for the most promising URL. Returns `(url, depth, priority)`."""
+        priority, _, url, depth = await self._queue.get()
+        return url, depth, -priority
+
+    def done(self, url: str | None = None):
+        """Marks a popped URL as processed."""
+        self._queue.task_done()
+
+    async def claim(self, limit: int) -> bool:
+        """
+        Counts a page against a crawl-wide budget of `limit` pages. An
+        in-process frontier serves a single crawler, whose own count is the
+        budget, so always True.
+        """
+        return True
+
+    def hold(self, url: str, seconds: float):
+        """
+        Keeps a popped URL reserved while it waits `seconds` for a retry.
+        Nothing else takes URLs from an in-process frontier, so a no-op.
+        """
+
+    def requeue(self, url: str, depth: int, priority: float = 0.0):
+        """Hands a URL popped earlier back for another attempt."""
+        self.push(url, depth, priority)
+
+    def release(self, url: str, depth: int, priority: float = 0.0):
+        """
+        Gives back a popped URL that was not fetched. The crawl only does so
+        while stopping, when queued URLs are discarded, so it is dropped.
+        """
+
+    async def join(self):
+        await self._queue.join()
+
+    def drain(self) -> int:
+        """Discards all queued URLs. Returns how many were dropped."""
+        dropped = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return dropped
+            self._queue.task_done()
+            dropped += 1
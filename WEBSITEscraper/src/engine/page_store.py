@@ -0,0 +1,151 @@
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import zlib
+from typing import List
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+class PageRecord:
+    """
+    Compact metadata of a stored page. The body (cleaned text with Markdown
+    headings, or a PDF's text) lives in the `PageStore` and is only
+    decompressed when `content` is read.
+    """
+    __slots__ = ("url", "content_type", "depth", "size", "_store", "_body", "_offset", "_length")
+
+    def __init__(self, store: "PageStore", url: str, content_type: str, depth: int, size: int):
+        self._store = store
+        self.url = url
+        self.content_type = content_type
+        self.depth = depth
+        self.size = size  # Uncompressed length in characters
+        self._body: bytes | None = None  # Compressed body while held in memory
+        self._offset = -1  # Position in the spill segment, -1 if not spilled
+        self._length = 0
+
+    @property
+    def content(self) -> str:
+        return self._store.read(self)
+
+    def __repr__(self) -> str:
+        return f"PageRecord({self.url!r}, {self.size} chars)"
+
+class PageStore:
+    """
+    Holds crawled pages within a fixed memory budget.
+
+    Bodies are compressed (zstd when installed, otherwise zlib) and kept in
+    memory until `memory_limit` compressed bytes are in use. Later bodies are
+    appended to a temporary segment file and read back through mmap, so the
+    memory used by a crawl no longer grows with the size of the site.
+    """
+    def __init__(self, memory_limit: int | None = None, spill_dir: str | None = None, level: int | None = None):
+        self.memory_limit = settings.PAGE_STORE_MEMORY_BYTES if memory_limit is None else memory_limit
+        self.spill_dir = spill_dir or settings.PAGE_STORE_SPILL_DIR
+        self.level = level or settings.PAGE_STORE_COMPRESSION_LEVEL
+        self.records: List[PageRecord] = []
+        self.memory_bytes = 0  # Compressed bytes held in memory
+        self.spilled_bytes = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._segment = None
+        self._map: mmap.mmap | None = None
+        self._lock = threading.Lock()
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=self.level)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return self._compressor.compress(data)
+        return zlib.compress(data, min(self.level, 9))
+
+    def _decompress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return self._decompressor.decompress(data)
+        return zlib.decompress(data)
+
+    def add(self, url: str, content: str, content_type: str = "text/html", depth: int = 0) -> PageRecord:
+        """Stores a page body and returns its record."""
+        record = PageRecord(self, url, content_type, depth, len(content))
+        body = self._compress(content.encode("utf-8"))
+        self.raw_bytes += len(content)
+        self.compressed_bytes += len(body)
+
+        with self._lock:
+            if self.memory_bytes + len(body) <= self.memory_limit:
+                record._body = body
+                self.memory_bytes += len(body)
+            else:
+                if self._segment is None:
+                    if self.spill_dir:
+                        os.makedirs(self.spill_dir, exist_ok=True)
+                    self._segment = tempfile.TemporaryFile(prefix="pages-", suffix=".seg", dir=self.spill_dir)
+                    logger.info("Page store memory budget reached, spilling bodies to disk")
+                self._segment.seek(0, os.SEEK_END)
+                record._offset = self._segment.tell()
+                record._length = len(body)
+                self._segment.write(body)
+                self.spilled_bytes += len(body)
+
+        self.records.append(record)
+        return record
+
+    def read(self, record: PageRecord) -> str:
+        """Decompresses a record's body ("" once it was released)."""
+        with self._lock:
+            if record._body is not None:
+                body = record._body
+            elif record._offset >= 0:
+                end = record._offset + record._length
+                if self._map is None or len(self._map) < end:
+                    # The segment grew since it was mapped
+                    self._segment.flush()
+                    if self._map is not None:
+                        self._map.close()
+                    self._map = mmap.mmap(self._segment.fileno(), 0, access=mmap.ACCESS_READ)
+                body = self._map[record._offset:end]
+            else:
+                return ""
+        return self._decompress(body).decode("utf-8")
+
+    def release(self, record: PageRecord):
+        """Drops a record's body once the pipeline is done with it (metadata is kept)."""
+        with self._lock:
+            if record._body is not None:
+                self.memory_bytes -= len(record._body)
+                record._body = None
+            record._offset = -1
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def summary(self) -> str:
+        ratio = self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0
+        return (
+            f"Page store: {len(self.records)} pages, {self.raw_bytes / 1_000_000:.1f} MB raw, "
+            f"{self.memory_bytes / 1_000_000:.1f} MB in memory, {self.spilled_bytes / 1_000_000:.1f} MB spilled "
+            f"({ratio:.1f}x compression)"
+        )
@@ -0,0 +1,92 @@
+import re
+from urllib.parse import urlparse
+
+# Weighted vocabulary for ranking links by how likely they lead to ESG content.
+# Drawn from the keyword lists of the legacy scraper and the regulatory scrapers.
+ESG_TERMS = {
+    "esg": 3.0,
+    "csrd": 3.0,
+    "esrs": 3.0,
+    "sfdr": 2.5,
+    "taxonomy": 2.0,
+    "sustainability": 3.0,
+    "sustainable": 2.0,
+    "non-financial": 2.5,
+    "nonfinancial": 2.5,
+    "climate": 2.0,
+    "tcfd": 2.5,
+    "emissions": 2.0,
+    "carbon": 2.0,
+    "ghg": 2.0,
+    "environment": 1.5,
+    "environmental": 1.5,
+    "social": 1.0,
+    "governance": 1.5,
+    "diversity": 1.0,
+    "human-rights": 1.5,
+    "responsibility": 1.5,
+    "csr": 2.0,
+    "impact": 1.0,
+    "annual-report": 2.0,
+    "report": 1.0,
+    "reports": 1.0,
+    "disclosures": 1.5,
+    "investors": 0.5,
+}
+
+# Sections that eat the page budget without ESG content
+LOW_VALUE_TERMS = {
+    "careers": -2.0,
+    "jobs": -2.0,
+    "vacancies": -2.0,
+    "products": -1.5,
+    "product": -1.0,
+    "shop": -2.0,
+    "store": -1.5,
+    "cart": -3.0,
+    "login": -3.0,
+    "signin": -3.0,
+    "account": -2.0,
+    "privacy": -1.5,
+    "cookie": -2.0,
+    "cookies": -2.0,
+    "terms": -1.5,
+    "legal": -1.0,
+    "contact": -1.0,
+    "events": -1.0,
+    "press": -0.5,
+}
+
+PDF_BONUS = 2.0
+DEPTH_PENALTY = 0.5
+RECENT_YEAR_BONUS = 0.5
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_YEAR_RE = re.compile(r"20[12]\d")
+
+def _tokens(text: str) -> set:
+    tokens = set(_TOKEN_RE.findall(text.lower()))
+    # Also index the parts of hyphenated tokens ("sustainability-report")
+    for token in list(tokens):
+        if "-" in token:
+            tokens.update(token.split("-"))
+    return tokens
+
+def _score_tokens(tokens: set) -> float:
+    return sum(ESG_TERMS.get(t, 0.0) + LOW_VALUE_TERMS.get(t, 0.0) for t in tokens)
+
+def relevance_score(url: str, anchor_text: str = "", depth: int = 0) -> float:
+    """
+    Cheap local estimate of how ESG-relevant the page behind a link is, from
+    the anchor text, the URL path and query, and whether it looks like a
+    PDF. Higher is better.
+    """
+    parsed = urlparse(url)
+    path = f"{parsed.path} {parsed.query}"
+
+    score = _score_tokens(_tokens(anchor_text)) + 0.75 * _score_tokens(_tokens(path))
+    if parsed.path.lower().endswith(".pdf"):
+        score += PDF_BONUS
+    if _YEAR_RE.search(path) or _YEAR_RE.search(anchor_text):
+        score += RECENT_YEAR_BONUS
+    return score - DEPTH_PENALTY * depth
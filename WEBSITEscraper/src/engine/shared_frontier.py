@@ -0,0 +1,498 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Sequence, Tuple
+
+from ..core.config import settings
+from .urls import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # Only needed for redis:// frontiers
+    redis = None
+
+# (url, depth, priority)
+FrontierItem = Tuple[str, int, float]
+
+class FrontierBackend:
+    """
+    Storage shared by every process of a distributed crawl. URLs move from
+    queued to leased (handed to one worker until the lease expires) to done.
+    An expired lease, e.g. of a crashed worker, makes the URL available again.
+    A URL counts as seen by its canonical form, so variants of a page that
+    different processes found are only queued once.
+
+    All methods are blocking and safe to call from several threads.
+    """
+    def add(self, crawl_id: str, items: Sequence[FrontierItem]) -> int:
+        """Queues URLs whose canonical form was never seen in this crawl. Returns how many were new."""
+        raise NotImplementedError
+
+    def lease(self, crawl_id: str, worker: str, count: int, lease_seconds: float) -> List[FrontierItem]:
+        """Hands out up to `count` of the highest-priority URLs as `(url, depth, priority)`."""
+        raise NotImplementedError
+
+    def extend(self, crawl_id: str, worker: str, leases: Sequence[Tuple[str, float]]):
+        """Moves the expiry of `worker`'s leases to the given Unix times, given as `(url, until)`."""
+        raise NotImplementedError
+
+    def claim(self, crawl_id: str, limit: int) -> bool:
+        """Counts one more page started in this crawl. False, without counting it, once `limit` were."""
+        raise NotImplementedError
+
+    def ack(self, crawl_id: str, worker: str, urls: Sequence[str]):
+        """Marks URLs leased by `worker` as done (also if the lease expired but nobody took it over)."""
+        raise NotImplementedError
+
+    def release(self, crawl_id: str, worker: str, urls: Sequence[str]):
+        """Returns URLs leased by `worker` to the queue without processing them."""
+        raise NotImplementedError
+
+    def unfinished(self, crawl_id: str) -> int:
+        """Queued plus leased URLs; 0 once the crawl is complete."""
+        raise NotImplementedError
+
+    def stats(self, crawl_id: str) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class SqliteFrontierBackend(FrontierBackend):
+    """Frontier in a SQLite file, for several processes on one machine (or a shared volume)."""
+    QUEUED, LEASED, DONE = 0, 1, 2
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=60)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS frontier ("
+                " crawl_id TEXT, url TEXT, depth INTEGER, priority REAL, state INTEGER DEFAULT 0,"
+                " lease_until REAL, worker TEXT, PRIMARY KEY (crawl_id, url))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS frontier_next ON frontier(crawl_id, state, priority)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS seen (crawl_id TEXT, key TEXT, PRIMARY KEY (crawl_id, key))")
+            self._db.execute("CREATE TABLE IF NOT EXISTS budget (crawl_id TEXT PRIMARY KEY, started INTEGER)")
+        return self._db
+
+    def add(self, crawl_id, items):
+        with self._lock:
+            db = self._connect()
+            added = 0
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for url, depth, priority in items:
+                    if db.execute("INSERT OR IGNORE INTO seen VALUES (?, ?)", (crawl_id, canonicalize_url(url))).rowcount:
+                        db.execute(
+                            "INSERT OR IGNORE INTO frontier (crawl_id, url, depth, priority) VALUES (?, ?, ?, ?)",
+                            (crawl_id, url, depth, priority),
+                        )
+                        added += 1
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return added
+
+    def lease(self, crawl_id, worker, count, lease_seconds):
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            # IMMEDIATE takes the write lock up front, so two processes never lease the same rows
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = db.execute(
+                    "SELECT url, depth, priority FROM frontier WHERE crawl_id = ?"
+                    " AND (state = ? OR (state = ? AND lease_until < ?))"
+                    " ORDER BY priority DESC LIMIT ?",
+                    (crawl_id, self.QUEUED, self.LEASED, now, count),
+                ).fetchall()
+                db.executemany(
+                    "UPDATE frontier SET state = ?, lease_until = ?, worker = ? WHERE crawl_id = ? AND url = ?",
+                    [(self.LEASED, now + lease_seconds, worker, crawl_id, url) for url, _, _ in rows],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def extend(self, crawl_id, worker, leases):
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Only leases still held: an expired one may belong to another worker by now
+                db.executemany(
+                    "UPDATE frontier SET lease_until = ?"
+                    " WHERE crawl_id = ? AND url = ? AND state = ? AND worker = ?",
+                    [(until, crawl_id, url, self.LEASED, worker) for url, until in leases],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def claim(self, crawl_id, limit):
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT OR IGNORE INTO budget VALUES (?, 0)", (crawl_id,))
+                claimed = db.execute(
+                    "UPDATE budget SET started = started + 1 WHERE crawl_id = ? AND started < ?", (crawl_id, limit)
+                ).rowcount
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return claimed == 1
+
+    def _set_state(self, crawl_id, worker, urls, state):
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # A lease that expired and went to another worker is no longer ours to end
+                db.executemany(
+                    "UPDATE frontier SET state = ?, lease_until = NULL"
+                    " WHERE crawl_id = ? AND url = ? AND state = ? AND worker = ?",
+                    [(state, crawl_id, url, self.LEASED, worker) for url in urls],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def ack(self, crawl_id, worker, urls):
+        self._set_state(crawl_id, worker, urls, self.DONE)
+
+    def release(self, crawl_id, worker, urls):
+        self._set_state(crawl_id, worker, urls, self.QUEUED)
+
+    def unfinished(self, crawl_id):
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM frontier WHERE crawl_id = ? AND state != ?", (crawl_id, self.DONE)
+            ).fetchone()[0]
+
+    def stats(self, crawl_id):
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT state, COUNT(*) FROM frontier WHERE crawl_id = ? GROUP BY state", (crawl_id,)
+            ).fetchall()
+        counts = dict(rows)
+        return {"queued": counts.get(self.QUEUED, 0), "leased": counts.get(self.LEASED, 0), "done": counts.get(self.DONE, 0)}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# KEYS: seen, queue, meta. ARGV: url, canonical url, depth, priority, url, canonical url, ...
+_REDIS_ADD = """
+local added = 0
+for i = 1, #ARGV, 4 do
+    if redis.call('SADD', KEYS[1], ARGV[i + 1]) == 1 then
+        redis.call('HSET', KEYS[3], ARGV[i], ARGV[i + 2] .. '|' .. ARGV[i + 3])
+        redis.call('ZADD', KEYS[2], ARGV[i + 3], ARGV[i])
+        added = added + 1
+    end
+end
+return added
+"""
+
+# KEYS: queue, leases, meta, owners. ARGV: now, lease expiry, count, worker.
+# URLs without meta were acked meanwhile and are dropped.
+_REDIS_LEASE = """
+for _, url in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+    redis.call('ZREM', KEYS[2], url)
+    local meta = redis.call('HGET', KEYS[3], url)
+    if meta then
+        redis.call('ZADD', KEYS[1], string.match(meta, '|(.*)$'), url)
+    end
+end
+local popped = redis.call('ZPOPMAX', KEYS[1], ARGV[3])
+local leased = {}
+for i = 1, #popped, 2 do
+    local meta = redis.call('HGET', KEYS[3], popped[i])
+    if meta then
+        redis.call('ZADD', KEYS[2], ARGV[2], popped[i])
+        redis.call('HSET', KEYS[4], popped[i], ARGV[4])
+        table.insert(leased, popped[i])
+        table.insert(leased, meta)
+    end
+end
+return leased
+"""
+
+# KEYS: queue, leases, meta, owners. ARGV: worker, url, url, ...
+# Only URLs `worker` leased last; an expired lease may be back in the queue.
+_REDIS_ACK = """
+for i = 2, #ARGV do
+    if redis.call('HGET', KEYS[4], ARGV[i]) == ARGV[1] then
+        redis.call('ZREM', KEYS[1], ARGV[i])
+        redis.call('ZREM', KEYS[2], ARGV[i])
+        redis.call('HDEL', KEYS[3], ARGV[i])
+        redis.call('HDEL', KEYS[4], ARGV[i])
+    end
+end
+"""
+
+# KEYS: queue, leases, meta, owners. ARGV: worker, url, url, ...
+_REDIS_RELEASE = """
+for i = 2, #ARGV do
+    local meta = redis.call('HGET', KEYS[3], ARGV[i])
+    if meta and redis.call('HGET', KEYS[4], ARGV[i]) == ARGV[1] and redis.call('ZREM', KEYS[2], ARGV[i]) == 1 then
+        redis.call('ZADD', KEYS[1], string.match(meta, '|(.*)$'), ARGV[i])
+    end
+end
+"""
+
+# KEYS: budget. ARGV: limit
+_REDIS_CLAIM = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') < tonumber(ARGV[1]) then
+    redis.call('INCR', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: leases, owners. ARGV: worker, url, expiry, url, expiry, ...
+_REDIS_EXTEND = """
+for i = 2, #ARGV, 2 do
+    if redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[1] then
+        redis.call('ZADD', KEYS[1], 'XX', ARGV[i + 1], ARGV[i])
+    end
+end
+"""
+
+class RedisFrontierBackend(FrontierBackend):
+    """
+    Frontier in Redis (or any server speaking its protocol, 5.0+), for
+    crawls spread over several machines. Lease and add run as Lua scripts,
+    so they are atomic across workers.
+    """
+    def __init__(self, url: str, prefix: str = "esg:frontier"):
+        if redis is None:
+            raise RuntimeError("The redis package is required for redis:// frontiers (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._add = self.client.register_script(_REDIS_ADD)
+        self._lease = self.client.register_script(_REDIS_LEASE)
+        self._ack = self.client.register_script(_REDIS_ACK)
+        self._release = self.client.register_script(_REDIS_RELEASE)
+        self._extend = self.client.register_script(_REDIS_EXTEND)
+        self._claim = self.client.register_script(_REDIS_CLAIM)
+
+    def _keys(self, crawl_id: str) -> Dict[str, str]:
+        base = f"{self.prefix}:{crawl_id}"
+        return {name: f"{base}:{name}" for name in ("seen", "queue", "leases", "meta", "owners", "budget")}
+
+    def add(self, crawl_id, items):
+        if not items:
+            return 0
+        keys = self._keys(crawl_id)
+        args = [value for url, depth, priority in items for value in (url, canonicalize_url(url), depth, priority)]
+        return int(self._add(keys=[keys["seen"], keys["queue"], keys["meta"]], args=args))
+
+    def lease(self, crawl_id, worker, count, lease_seconds):
+        keys = self._keys(crawl_id)
+        now = time.time()
+        flat = self._lease(
+            keys=[keys["queue"], keys["leases"], keys["meta"], keys["owners"]],
+            args=[now, now + lease_seconds, count, worker],
+        )
+        items = []
+        for i in range(0, len(flat), 2):
+            if not flat[i + 1]:
+                continue
+            depth, priority = flat[i + 1].split("|")
+            items.append((flat[i], int(depth), float(priority)))
+        return items
+
+    def extend(self, crawl_id, worker, leases):
+        if leases:
+            keys = self._keys(crawl_id)
+            self._extend(keys=[keys["leases"], keys["owners"]],
+                         args=[worker] + [value for lease in leases for value in lease])
+
+    def claim(self, crawl_id, limit):
+        return bool(self._claim(keys=[self._keys(crawl_id)["budget"]], args=[limit]))
+
+    def _end_leases(self, script, crawl_id, worker, urls):
+        if urls:
+            keys = self._keys(crawl_id)
+            script(keys=[keys["queue"], keys["leases"], keys["meta"], keys["owners"]], args=[worker, *urls])
+
+    def ack(self, crawl_id, worker, urls):
+        self._end_leases(self._ack, crawl_id, worker, urls)
+
+    def release(self, crawl_id, worker, urls):
+        self._end_leases(self._release, crawl_id, worker, urls)
+
+    def unfinished(self, crawl_id):
+        keys = self._keys(crawl_id)
+        return self.client.zcard(keys["queue"]) + self.client.zcard(keys["leases"])
+
+    def stats(self, crawl_id):
+        keys = self._keys(crawl_id)
+        queued, leased, seen = self.client.zcard(keys["queue"]), self.client.zcard(keys["leases"]), self.client.scard(keys["seen"])
+        return {"queued": queued, "leased": leased, "done": seen - queued - leased}
+
+    def close(self):
+        self.client.close()
+
+def open_frontier_backend(spec: str) -> FrontierBackend:
+    """`redis://host:6379/0` for Redis, `sqlite:///path.db` or a plain path for SQLite."""
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisFrontierBackend(spec)
+    if spec.startswith("sqlite:///"):
+        spec = spec[len("sqlite:///"):]
+    return SqliteFrontierBackend(spec)
+
+class SharedFrontier:
+    """
+    `Frontier` drop-in backed by a `FrontierBackend`, so crawlers in several
+    processes or on several machines work through one crawl.
+
+    Pushes and acks are buffered locally and sent in batches; URLs are leased
+    FRONTIER_LEASE_BATCH at a time. `join` returns once no process has
+    queued or leased URLs left. A page budget (`claim`) is counted in the
+    backend, so it holds for the crawl as a whole.
+    """
+    def __init__(self, backend: FrontierBackend, crawl_id: str, worker: str | None = None):
+        self.backend = backend
+        self.crawl_id = crawl_id
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        self._buffer: Deque[FrontierItem] = deque()
+        self._pushes: List[FrontierItem] = []
+        self._acks: List[str] = []
+        self._holds: List[Tuple[str, float]] = []
+        self._releases: List[str] = []
+        self._in_flight = 0
+        self._stopped = False
+        self._lock: asyncio.Lock | None = None
+        self.leased = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer) + len(self._pushes)
+
+    def push(self, url: str, depth: int, priority: float = 0.0):
+        self._pushes.append((url, depth, priority))
+
+    async def _sync(self):
+        """Sends buffered pushes, acks, lease extensions and releases to the backend."""
+        if self._pushes:
+            batch, self._pushes = self._pushes, []
+            await asyncio.to_thread(self.backend.add, self.crawl_id, batch)
+        if self._acks:
+            batch, self._acks = self._acks, []
+            await asyncio.to_thread(self.backend.ack, self.crawl_id, self.worker, batch)
+        if self._holds:
+            batch, self._holds = self._holds, []
+            await asyncio.to_thread(self.backend.extend, self.crawl_id, self.worker, batch)
+        if self._releases:
+            batch, self._releases = self._releases, []
+            await asyncio.to_thread(self.backend.release, self.crawl_id, self.worker, batch)
+
+    async def pop(self) -> FrontierItem:
+        """Waits for a leased URL. Returns `(url, depth, priority)`."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        while True:
+            if self._stopped:
+                # Nothing more for this process; the crawl cancels idle workers
+                await asyncio.Event().wait()
+            if self._buffer:
+                self._in_flight += 1
+                return self._buffer.popleft()
+            async with self._lock:
+                if not self._buffer:
+                    await self._sync()
+                    leased = await asyncio.to_thread(
+                        self.backend.lease, self.crawl_id, self.worker,
+                        settings.FRONTIER_LEASE_BATCH, settings.FRONTIER_LEASE_SECONDS,
+                    )
+                    self.leased += len(leased)
+                    if self._stopped:
+                        # drain() ran while the lease was in flight; nobody will pop these
+                        self._releases.extend(url for url, _, _ in leased)
+                    else:
+                        self._buffer.extend(leased)
+            if not self._buffer:
+                await asyncio.sleep(settings.FRONTIER_POLL_INTERVAL)
+
+    def done(self, url: str | None = None):
+        """Marks a popped URL as processed (acknowledged with the next sync)."""
+        self._in_flight -= 1
+        if url is not None:
+            self._acks.append(url)
+
+    async def claim(self, limit: int) -> bool:
+        """Counts a page against a budget of `limit` pages shared by every process of the crawl."""
+        return await asyncio.to_thread(self.backend.claim, self.crawl_id, limit)
+
+    def hold(self, url: str, seconds: float):
+        """
+        Extends the lease of a popped URL that waits `seconds` for a retry, so
+        it doesn't expire meanwhile and get fetched by another process too.
+        """
+        self._holds.append((url, time.time() + seconds + settings.FRONTIER_LEASE_SECONDS))
+
+    def requeue(self, url: str, depth: int, priority: float = 0.0):
+        """
+        Hands a URL popped earlier (and marked done without an ack) back for
+        another attempt, by whichever process leases it next.
+        """
+        self._releases.append(url)
+
+    def release(self, url: str, depth: int, priority: float = 0.0):
+        """
+        Gives back a popped URL that was not fetched (marked done without an
+        ack), so its lease ends and another process can lease it.
+        """
+        self._releases.append(url)
+
+    async def join(self):
+        while True:
+            # Checked before the sync: workers may still ack or release while it runs
+            idle = self._in_flight == 0 and not self._buffer
+            await self._sync()
+            if idle:
+                if self._stopped:
+                    return
+                if await asyncio.to_thread(self.backend.unfinished, self.crawl_id) == 0:
+                    return
+            await asyncio.sleep(settings.FRONTIER_POLL_INTERVAL)
+
+    def drain(self) -> int:
+        """Stops leasing and hands this process's unstarted URLs back to the other workers."""
+        self._stopped = True
+        dropped = len(self._buffer)
+        self._releases.extend(url for url, _, _ in self._buffer)
+        self._buffer.clear()
+        return dropped
+
+    def summary(self) -> str:
+        stats = self.backend.stats(self.crawl_id)
+        return (
+            f"Shared frontier {self.crawl_id}: {self.leased} URLs leased by {self.worker}, "
+            f"{stats['done']} done, {stats['queued']} queued, {stats['leased']} leased overall"
+        )
@@ -0,0 +1,379 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+from ..core.config import settings
+from ..core.fetcher import fetch_tier
+from ..core.network import network_manager
+from ..core.scheduler import host_scheduler
+from .urls import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+class SitemapEntry(NamedTuple):
+    url: str
+    lastmod: float | None  # Unix time
+    is_sitemap: bool = False  # A child of a sitemap index
+
+class SitemapTooLarge(Exception):
+    pass
+
+def parse_lastmod(value: str | None) -> float | None:
+    """W3C datetime (`2024-05-01`, `2024-05-01T10:00:00+02:00`) as Unix time; None if unparseable."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _namespace(tag: str) -> str:
+    return tag[1:].split("}", 1)[0] if tag.startswith("{") else ""
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+class SitemapParser:
+    """
+    Incremental parser for sitemaps and sitemap indexes. Bytes are fed as they
+    arrive (gzip is detected from the magic bytes) and finished entries are
+    returned right away; parsed elements are dropped, so memory stays flat
+    however long the file is.
+    """
+    def __init__(self, max_bytes: int | None = None):
+        self.max_bytes = max_bytes or settings.SITEMAP_MAX_BYTES
+        self.size = 0  # Decompressed bytes so far
+        self._xml = ET.XMLPullParser(events=("start", "end"))
+        self._gunzip = None
+        self._started = False
+        self._root: ET.Element | None = None
+        self._loc: str | None = None
+        self._lastmod: float | None = None
+
+    def feed(self, data: bytes) -> List[SitemapEntry]:
+        if not self._started:
+            self._started = True
+            if data[:2] == b"\x1f\x8b":
+                self._gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._gunzip is not None:
+            # Bounded, so a gzip bomb can't expand past the limit
+            data = self._gunzip.decompress(data, self.max_bytes - self.size + 1)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise SitemapTooLarge(f"sitemap larger than {self.max_bytes} bytes")
+        self._xml.feed(data)
+        return self._entries()
+
+    def close(self) -> List[SitemapEntry]:
+        self._xml.close()
+        return self._entries()
+
+    def _entries(self) -> List[SitemapEntry]:
+        entries = []
+        for event, el in self._xml.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = el
+                continue
+            tag = _local(el.tag)
+            # <loc> of extensions (image:loc, video:loc) lives in another namespace
+            if tag == "loc" and _namespace(el.tag) == _namespace(self._root.tag):
+                self._loc = (el.text or "").strip()
+            elif tag == "lastmod":
+                self._lastmod = parse_lastmod(el.text)
+            elif tag in ("url", "sitemap"):
+                if self._loc:
+                    entries.append(SitemapEntry(self._loc, self._lastmod, tag == "sitemap"))
+                self._loc = self._lastmod = None
+                self._root.clear()
+        return entries
+
+class RecrawlState:
+    """
+    What previous runs crawled: per URL the time of the last successful fetch,
+    the `<lastmod>` it had then and the sitemap that listed it; per sitemap the
+    `<lastmod>` it had when all of its changed URLs were last crawled.
+
+    Methods block on SQLite; `SitemapDiscovery` calls the lookups through
+    `asyncio.to_thread`. Crawled URLs are buffered and, on an event loop,
+    full batches are written from a thread (like `CrawlCheckpoint`).
+    """
+    LOOKUP_BATCH = 500  # URLs per SELECT, below SQLite's bound-parameter limit
+
+    def __init__(self, path: str | None = None):
+        self.path = Path(path or settings.SITEMAP_STATE_PATH)
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._flushing: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, crawled_at REAL, lastmod REAL, sitemap TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS urls_sitemap ON urls (sitemap)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sitemaps (url TEXT PRIMARY KEY, lastmod REAL)")
+        return self._db
+
+    def get(self, url: str) -> Tuple[float, float | None] | None:
+        """`(crawled_at, lastmod)` of a canonical URL, None if it was never crawled."""
+        with self._lock:
+            return self._connect().execute("SELECT crawled_at, lastmod FROM urls WHERE url = ?", (url,)).fetchone()
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, Tuple[float, float | None]]:
+        """`get` for many canonical URLs at once; URLs never crawled are missing from the result."""
+        urls = list(dict.fromkeys(urls))
+        found = {}
+        with self._lock:
+            db = self._connect()
+            for start in range(0, len(urls), self.LOOKUP_BATCH):
+                batch = urls[start:start + self.LOOKUP_BATCH]
+                rows = db.execute(
+                    f"SELECT url, crawled_at, lastmod FROM urls WHERE url IN ({','.join('?' * len(batch))})", batch
+                )
+                found.update((url, (crawled_at, lastmod)) for url, crawled_at, lastmod in rows)
+        return found
+
+    def sitemap_lastmod(self, url: str) -> float | None:
+        with self._lock:
+            row = self._connect().execute("SELECT lastmod FROM sitemaps WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def urls_from(self, sitemap: str) -> List[Tuple[str, float, float | None]]:
+        """`(url, crawled_at, lastmod)` of every URL last crawled from `sitemap`."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT url, crawled_at, lastmod FROM urls WHERE sitemap = ?", (sitemap,)
+            ).fetchall()
+
+    def crawled(self, url: str, lastmod: float | None, sitemap: str | None):
+        self._pending.append(("url", url, time.time(), lastmod, sitemap))
+        if len(self._pending) >= settings.CHECKPOINT_BATCH:
+            self._maybe_flush()
+
+    def sitemap_done(self, url: str, lastmod: float):
+        self._pending.append(("sitemap", url, lastmod))
+
+    def _maybe_flush(self):
+        if self._flushing is not None and not self._flushing.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # Not on an event loop, nothing to hold up
+            return
+        batch, self._pending = self._pending, []
+        self._flushing = loop.create_task(asyncio.to_thread(self._write, batch))
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._write(batch)
+
+    def _write(self, batch: List[tuple]):
+        with self._lock, self._connect() as db:
+            db.executemany(
+                "INSERT INTO urls VALUES (?, ?, ?, ?) ON CONFLICT (url) DO UPDATE SET "
+                "crawled_at = excluded.crawled_at, lastmod = excluded.lastmod, "
+                "sitemap = COALESCE(excluded.sitemap, urls.sitemap)",
+                [op[1:] for op in batch if op[0] == "url"],
+            )
+            db.executemany("INSERT OR REPLACE INTO sitemaps VALUES (?, ?)", [op[1:] for op in batch if op[0] == "sitemap"])
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def aclose(self):
+        """`close` for the event loop: waits for a flush in progress, then writes the rest from a thread."""
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        await asyncio.to_thread(self.close)
+
+class SitemapDiscovery:
+    """
+    Seeds a crawl from the site's sitemaps instead of rediscovering it link by
+    link. Sitemaps are taken from robots.txt (falling back to /sitemap.xml),
+    streamed, and sitemap indexes are followed up to SITEMAP_MAX_DEPTH levels.
+
+    With the `RecrawlState` of earlier runs, `discover` flags each listed URL
+    as changed (new, `<lastmod>` newer than at the last crawl, or no
+    `<lastmod>` and older than SITEMAP_REFRESH_DAYS) or unchanged. Child
+    sitemaps whose own `<lastmod>` hasn't moved are not even downloaded: the
+    URLs they listed come from the state, and those without `<lastmod>` are
+    still refreshed once older than SITEMAP_REFRESH_DAYS.
+    """
+    def __init__(self, state: RecrawlState | None = None):
+        self.state = state if state is not None else RecrawlState()
+        self.stats: Counter = Counter()
+        # Changed URLs waiting to be crawled: canonical URL -> (lastmod, sitemap)
+        self._pending: Dict[str, Tuple[float | None, str | None]] = {}
+        self._outstanding: Counter = Counter()  # Sitemap -> changed URLs not crawled yet
+        self._sitemap_lastmods: Dict[str, float] = {}  # Sitemaps read in full this run
+
+    async def _stream(self, url: str) -> AsyncIterator[bytes]:
+        if not settings.OFFLINE:
+            await host_scheduler.acquire(url)
+        session = await fetch_tier.get_session()
+        headers = {"User-Agent": network_manager.get_random_user_agent(), "Accept": "application/xml,text/xml,*/*"}
+        # Large sitemaps take longer than a page, so the session's per-page timeout doesn't apply
+        timeout = aiohttp.ClientTimeout(total=settings.SITEMAP_TIMEOUT, sock_read=settings.HTTP_TIMEOUT)
+        async with session.get(url, headers=headers, timeout=timeout) as response:
+            if response.status >= 400:
+                logger.info(f"No sitemap at {url} (HTTP {response.status})")
+                return
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                yield chunk
+
+    async def sitemap_urls(self, start_url: str) -> List[str]:
+        """Sitemaps declared in robots.txt, or the conventional /sitemap.xml."""
+        parts = urlsplit(start_url)
+        root = f"{parts.scheme}://{parts.netloc}/"
+        declared = []
+        try:
+            body = b"".join([chunk async for chunk in self._stream(urljoin(root, "robots.txt"))])
+            for line in body.decode("utf-8", errors="ignore").splitlines():
+                key, _, value = line.partition(":")
+                if key.strip().lower() == "sitemap" and value.strip():
+                    declared.append(urljoin(root, value.strip()))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"robots.txt unavailable for {parts.netloc}: {e}")
+        return declared or [urljoin(root, "sitemap.xml")]
+
+    async def changed(self, url: str, lastmod: float | None = None, sitemap: str | None = None) -> bool:
+        """Whether `url` is new or changed since it was last crawled (see class docstring)."""
+        canonical = canonicalize_url(url)
+        known = await asyncio.to_thread(self.state.get, canonical)
+        return self._classify(canonical, lastmod, sitemap, known)
+
+    async def _changed_many(self, entries: List[SitemapEntry], sitemap: str) -> List[bool]:
+        """`changed` for a batch of entries, with one state lookup off the event loop."""
+        if not entries:
+            return []
+        canonicals = [canonicalize_url(entry.url) for entry in entries]
+        known = await asyncio.to_thread(self.state.get_many, canonicals)
+        return [
+            self._classify(canonical, entry.lastmod, sitemap, known.get(canonical))
+            for canonical, entry in zip(canonicals, entries)
+        ]
+
+    def _classify(self, canonical: str, lastmod: float | None, sitemap: str | None,
+                  known: Tuple[float, float | None] | None) -> bool:
+        if known is None:
+            self.stats["new"] += 1
+        else:
+            crawled_at, crawled_lastmod = known
+            if lastmod is not None:
+                unchanged = lastmod <= (crawled_lastmod if crawled_lastmod is not None else crawled_at)
+            else:
+                unchanged = time.time() - crawled_at < settings.SITEMAP_REFRESH_DAYS * 86400
+            if unchanged:
+                self.stats["unchanged"] += 1
+                return False
+            self.stats["changed"] += 1
+        if sitemap is not None and canonical not in self._pending:
+            self._outstanding[sitemap] += 1
+        self._pending[canonical] = (lastmod, sitemap)
+        return True
+
+    async def discover(self, start_url: str) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        Streams `(url, changed)` for every URL in the site's sitemaps, while
+        they are still downloading. Nothing is yielded if the site has none.
+        """
+        queue = deque((url, 0, None) for url in await self.sitemap_urls(start_url))
+        seen = set()
+        listed = 0
+        while queue and listed < settings.SITEMAP_MAX_URLS:
+            sitemap, level, lastmod = queue.popleft()
+            if sitemap in seen:
+                continue
+            seen.add(sitemap)
+
+            if lastmod is not None:
+                previous = await asyncio.to_thread(self.state.sitemap_lastmod, sitemap)
+                if previous is not None and lastmod <= previous:
+                    # Unchanged since its URLs were last crawled: skip the download, but URLs
+                    # without <lastmod> could still have changed and age out as usual
+                    self.stats["sitemaps skipped"] += 1
+                    for url, crawled_at, url_lastmod in await asyncio.to_thread(self.state.urls_from, sitemap):
+                        listed += 1
+                        yield url, self._classify(url, url_lastmod, sitemap, (crawled_at, url_lastmod))
+                        if listed >= settings.SITEMAP_MAX_URLS:
+                            logger.info(f"Sitemap limit of {settings.SITEMAP_MAX_URLS} URLs reached")
+                            return
+                    continue
+
+            self.stats["sitemaps"] += 1
+            parser = SitemapParser()
+            try:
+                async for chunk in self._stream(sitemap):
+                    entries = []
+                    for entry in parser.feed(chunk):
+                        if entry.is_sitemap:
+                            if level < settings.SITEMAP_MAX_DEPTH:
+                                queue.append((urljoin(sitemap, entry.url), level + 1, entry.lastmod))
+                            continue
+                        entries.append(entry)
+                    entries = entries[:settings.SITEMAP_MAX_URLS - listed]
+                    for entry, changed in zip(entries, await self._changed_many(entries, sitemap)):
+                        listed += 1
+                        yield entry.url, changed
+                    if listed >= settings.SITEMAP_MAX_URLS:
+                        logger.info(f"Sitemap limit of {settings.SITEMAP_MAX_URLS} URLs reached")
+                        return
+                if parser.size:
+                    parser.close()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError, zlib.error, SitemapTooLarge) as e:
+                logger.warning(f"Could not read sitemap {sitemap}: {e}")
+                continue
+            if lastmod is not None:
+                self._sitemap_lastmods[sitemap] = lastmod
+
+    def crawled(self, url: str):
+        """Records a successful fetch of `url`."""
+        canonical = canonicalize_url(url)
+        lastmod, sitemap = self._pending.pop(canonical, (None, None))
+        if sitemap is not None:
+            self._outstanding[sitemap] -= 1
+        self.state.crawled(canonical, lastmod, sitemap)
+
+    async def finish(self):
+        """
+        Persists the crawl state. A sitemap's `<lastmod>` is only stored once
+        every changed URL it listed was crawled, so an interrupted or budgeted
+        run never causes updates to be skipped next time.
+        """
+        for sitemap, lastmod in self._sitemap_lastmods.items():
+            if self._outstanding[sitemap] <= 0:
+                self.state.sitemap_done(sitemap, lastmod)
+        await self.state.aclose()
+
+    def summary(self) -> str:
+        return (
+            f"Sitemaps: {self.stats['sitemaps']} read, {self.stats['sitemaps skipped']} unchanged; "
+            f"{self.stats['new']} new, {self.stats['changed']} changed, "
+            f"{self.stats['unchanged']} unchanged URLs (not fetched)"
+        )
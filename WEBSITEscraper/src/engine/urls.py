@@ -0,0 +1,197 @@
+import hashlib
+import math
+import posixpath
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ..core.config import settings
+
+# Query parameters that never change the content of a page. Generic names such
+# as `ref`, `source` or `sid` select content on some sites, so they are only
+# dropped when listed in URL_STRIP_PARAMS or a host rule.
+TRACKING_PARAMS = frozenset({
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "hsctatracking", "igshid",
+    "jsessionid", "phpsessid", "aspsessionid", "cfid", "cftoken",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+
+INDEX_PAGES = frozenset({"index.html", "index.htm", "index.php", "index.asp", "index.aspx", "default.asp", "default.aspx"})
+
+_SESSION_PATH_RE = re.compile(r";(jsessionid|phpsessid|sid)=[^/?#]*", re.I)
+_ESCAPE_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+
+@dataclass(frozen=True)
+class HostRule:
+    """Per-host canonicalization, configured through URL_HOST_RULES (and URL_STRIP_PARAMS for every host)."""
+    strip_params: FrozenSet[str] = frozenset()  # Extra parameters to drop on this host
+    keep_params: FrozenSet[str] = frozenset()  # Tracking-looking parameters that matter here
+    lowercase_path: bool = False  # Case-insensitive servers (IIS)
+    drop_www: bool = False  # www.host and host serve the same site
+
+_rules: Dict[str, HostRule] | None = None
+
+def host_rules() -> Dict[str, HostRule]:
+    global _rules
+    if _rules is None:
+        common = frozenset(p.lower() for p in settings.URL_STRIP_PARAMS)
+        _rules = {"": HostRule(strip_params=common)}
+        _rules.update({
+            host.lower(): HostRule(
+                strip_params=common | frozenset(p.lower() for p in rule.get("strip_params", [])),
+                keep_params=frozenset(p.lower() for p in rule.get("keep_params", [])),
+                lowercase_path=rule.get("lowercase_path", False),
+                drop_www=rule.get("drop_www", False),
+            )
+            for host, rule in settings.URL_HOST_RULES.items()
+        })
+    return _rules
+
+def _rule_for(host: str) -> HostRule:
+    rules = host_rules()
+    bare = host[4:] if host.startswith("www.") else host
+    return rules.get(host) or rules.get(bare) or rules[""]
+
+def _normalize_escape(match: re.Match) -> str:
+    # Unreserved characters are decoded, everything else keeps an uppercase escape (RFC 3986, 6.2.2)
+    char = chr(int(match.group(1), 16))
+    return char if char.isascii() and (char.isalnum() or char in "-._~") else match.group(0).upper()
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for duplicate detection: lowercase scheme and host,
+    no default port, fragment, session path parameters or tracking query
+    parameters; resolved dot segments, no duplicate or trailing slashes, no
+    `index.html`-style file names; sorted query. Host rules can add more.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    rule = _rule_for(host)
+    if rule.drop_www and host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    path = _SESSION_PATH_RE.sub("", parts.path)
+    path = _ESCAPE_RE.sub(_normalize_escape, re.sub(r"/{2,}", "/", path))
+    path = posixpath.normpath(path) if path else "/"
+    head, _, last = path.rpartition("/")
+    if last.lower() in INDEX_PAGES:
+        path = head + "/"
+    path = path.rstrip("/") or "/"
+    if rule.lowercase_path:
+        path = path.lower()
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() in rule.keep_params or not (
+            key.lower() in TRACKING_PARAMS or key.lower().startswith(TRACKING_PREFIXES) or key.lower() in rule.strip_params
+        )
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ""))
+
+def url_fingerprint(canonical_url: str) -> int:
+    """64-bit fingerprint of a canonical URL (collision odds ~1 in 10^19 per pair)."""
+    return int.from_bytes(hashlib.blake2b(canonical_url.encode("utf-8"), digest_size=8).digest(), "big")
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for `capacity` items at `error_rate` false
+    positives. A false positive means a never-seen URL is treated as visited.
+    """
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint: int) -> Iterable[int]:
+        # Kirsch-Mitzenmacher double hashing from the two 32-bit halves
+        h1, h2 = fingerprint >> 32, (fingerprint & 0xFFFFFFFF) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, fingerprint: int) -> bool:
+        """Sets the item's bits. Returns True if it was (probably) not present yet."""
+        new = False
+        for position in self._positions(fingerprint):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return all(self.bits[p // 8] & (1 << (p % 8)) for p in self._positions(fingerprint))
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Current expected false-positive rate, given the items added so far."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+class VisitedSet:
+    """
+    Memory-compact set of visited URLs, keyed by the fingerprint of their
+    canonical form. `exact` keeps 64-bit fingerprints; `bloom` uses a fixed
+    Bloom filter (VISITED_BLOOM_CAPACITY, VISITED_BLOOM_ERROR_RATE) whose size
+    doesn't grow with the crawl.
+    """
+    def __init__(self, mode: str | None = None):
+        self.mode = mode or settings.VISITED_SET
+        if self.mode == "bloom":
+            self._bloom = BloomFilter(settings.VISITED_BLOOM_CAPACITY, settings.VISITED_BLOOM_ERROR_RATE)
+        else:
+            self._fingerprints: set = set()
+        self.variants_avoided = 0  # Rejected URLs that were not in canonical form
+        self.repeats_avoided = 0  # Same URL string seen again
+
+    def add(self, url: str) -> bool:
+        """Records `url`. Returns False if it (or an equivalent URL) was seen before."""
+        canonical = canonicalize_url(url)
+        fingerprint = url_fingerprint(canonical)
+        if self.mode == "bloom":
+            new = self._bloom.add(fingerprint)
+        else:
+            new = fingerprint not in self._fingerprints
+            self._fingerprints.add(fingerprint)
+        if not new:
+            if url.split("#")[0] == canonical:
+                self.repeats_avoided += 1
+            else:
+                self.variants_avoided += 1
+        return new
+
+    def update(self, urls: Iterable[str]):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url: str) -> bool:
+        fingerprint = url_fingerprint(canonicalize_url(url))
+        if self.mode == "bloom":
+            return fingerprint in self._bloom
+        return fingerprint in self._fingerprints
+
+    def __len__(self) -> int:
+        return self._bloom.count if self.mode == "bloom" else len(self._fingerprints)
+
+    @property
+    def duplicates_avoided(self) -> int:
+        return self.variants_avoided + self.repeats_avoided
+
+    def summary(self) -> str:
+        if self.mode == "bloom":
+            index = (f"Bloom filter, {len(self._bloom.bits) / 1_000_000:.1f} MB, "
+                     f"~{self._bloom.false_positive_rate:.2e} false positives")
+        else:
+            index = "64-bit fingerprints"
+        return (
+            f"Visited set: {len(self)} URLs ({index}); {self.duplicates_avoided} duplicate fetches avoided "
+            f"({self.variants_avoided} URL variants, {self.repeats_avoided} repeats)"
+        )
@@ -1,104 +1,428 @@
-import asyncio
-import argparse
-import json
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.table import Table
-from rich.panel import Panel
-
-from ..core.config import settings
-from ..core.browser import browser_manager
-from ..engine.crawler import Crawler
-from ..pipeline.extractor import extractor
-
-console = Console()
-
-async def run_scraper(url: str, depth: int, output_file: str = None, gdocs: bool = False):
-    """
-    Orchestrates the scraping process.
-    """
-    # Override settings if needed
-    settings.MAX_DEPTH = depth
-    
-    console.print(Panel(f"[bold green]Starting Industrial Scraper[/bold green]\nURL: {url}\nDepth: {depth}", title="Configuration"))
-
-    crawler = Crawler(browser_manager)
-    
-    results = []
-    
-    try:
-        await browser_manager.start()
-        
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console
-        ) as progress:
-            
-            task_id = progress.add_task(f"Crawling {url}...", total=None)
-            
-            # 1. Crawl
-            raw_data = await crawler.crawl(url)
-            console.print(f"[green]✓[/green] Crawled {len(raw_data)} pages.")
-            
-            # 2. Extract
-            progress.update(task_id, description="Extracting ESG data...")
-            
-            table = Table(title="Scraping Results")
-            table.add_column("URL", style="cyan")
-            table.add_column("Company", style="magenta")
-            table.add_column("ESG Score (Avg)", justify="right")
-            
-            for page in raw_data:
-                # Basic filter: only process if content length is substantial
-                if len(page['content']) < 1000:
-                    continue
-                    
-                report = extractor.extract(page['content'], page['url'])
-                
-                if report:
-                    results.append(report.dict())
-                    
-                    # Calculate average score for display
-                    avg_score = (report.environmental.score + report.social.score + report.governance.score) / 3
-                    table.add_row(report.url[:50] + "...", report.company_name, f"{avg_score:.1f}")
-                    
-                    # 3. GDocs Export (Immediate per item)
-                    if gdocs:
-                        from ..pipeline.export_gdocs import find_or_create_esg_doc, append_esg_analysis
-                        try:
-                            doc_id = find_or_create_esg_doc("ESG Master Report")
-                            if doc_id:
-                                link = append_esg_analysis(doc_id, report)
-                                console.print(f"[blue]Exported to GDoc: {link}[/blue]")
-                        except Exception as e:
-                            console.print(f"[red]GDocs Export Failed: {e}[/red]")
-                else:
-                    console.print(f"[red]Extraction failed for {page['url']}[/red]")
-            
-            console.print(table)
-            
-            # 4. JSON Export
-            if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2)
-                console.print(f"[bold blue]Exported results to {output_file}[/bold blue]")
-                
-    except Exception as e:
-        console.print(f"[bold red]Error:[/bold red] {e}")
-    finally:
-        await browser_manager.stop()
-
-def main():
-    parser = argparse.ArgumentParser(description="Industrial Grade ESG Scraper")
-    parser.add_argument("url", help="Target URL to scrape")
-    parser.add_argument("--depth", type=int, default=1, help="Crawl depth (default: 1)")
-    parser.add_argument("--output", "-o", help="Output JSON file path", default="results.json")
-    parser.add_argument("--gdocs", "-g", action="store_true", help="Export to Google Docs")
-    
-    args = parser.parse_args()
-    
-    asyncio.run(run_scraper(args.url, args.depth, args.output, args.gdocs))
-
-if __name__ == "__main__":
-    main()
+import asyncio
+import argparse
+import json
+import multiprocessing
+import os
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.table import Table
+from rich.panel import Panel
+
+from ..core.config import settings
+from ..core.browser import PagePool, browser_manager
+from ..core.cache import http_cache
+from ..core.fetcher import fetch_tier
+from ..core.metrics import metrics
+from ..core.scheduler import host_scheduler
+from ..engine.checkpoint import CrawlCheckpoint, new_crawl_id
+from ..engine.crawler import Crawler
+from ..engine.shared_frontier import SharedFrontier, open_frontier_backend
+from ..engine.page_store import PageRecord
+from ..pipeline.dedupe import ClusterFallback, NearDuplicateIndex
+from ..pipeline.extractor import extractor
+from ..pipeline.llm_cache import llm_cache
+from ..pipeline.parsing import shutdown_parse_pool
+from ..pipeline.pdf import shutdown_pdf_pool
+from ..pipeline.stream import map_concurrent
+from ..scrapers import SOURCES, create_sources, run_sources
+
+console = Console()
+
+def print_stage_timings():
+    """Summary table of the per-stage timings and counters collected during the run."""
+    stats = metrics.stats()
+    if not stats:
+        return
+    table = Table(title="Stage Timings")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Count", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+    for s in stats:
+        table.add_row(s.stage, str(s.count), f"{s.total:.2f}", f"{s.mean * 1000:.1f}",
+                      f"{s.p50 * 1000:.1f}", f"{s.p95 * 1000:.1f}", f"{s.max * 1000:.1f}")
+    console.print(table)
+    if metrics.counters:
+        console.print("[dim]" + ", ".join(f"{name}: {value:g}" for name, value in sorted(metrics.counters.items())) + "[/dim]")
+
+def export_metrics():
+    """Writes the Chrome trace and Prometheus file, if configured."""
+    try:
+        if settings.TRACE_PATH:
+            metrics.write_trace(settings.TRACE_PATH)
+            console.print(f"[dim]Trace written to {settings.TRACE_PATH} (open in chrome://tracing or ui.perfetto.dev)[/dim]")
+        if settings.METRICS_PATH:
+            metrics.write_prometheus(settings.METRICS_PATH)
+    except OSError as e:
+        console.print(f"[red]Could not write metrics: {e}[/red]")
+
+async def run_scraper(url: str, depth: int, output_file: str = None, gdocs: bool = False, concurrency: int = None,
+                      cache_dir: str = None, offline: bool = False, max_pages: int = None, resume: str = None,
+                      frontier_url: str = None, crawl_id: str = None, sitemap: bool = False):
+    """
+    Orchestrates the scraping process.
+    """
+    checkpoint = None
+    shared_frontier = None
+    frontier_url = frontier_url or settings.FRONTIER_URL
+    if frontier_url:
+        # Several processes/nodes share one crawl. The shared frontier is persistent
+        # itself: running again with the same crawl ID continues the crawl.
+        shared_frontier = SharedFrontier(open_frontier_backend(frontier_url), crawl_id or resume or new_crawl_id())
+    elif resume:
+        # Continue a checkpointed crawl with its original start URL and limits
+        checkpoint = CrawlCheckpoint(resume)
+        info = checkpoint.info()
+        if info is None:
+            console.print(f"[bold red]Error:[/bold red] no checkpoint for crawl {resume}")
+            return
+        url = url or info.start_url
+        depth = info.max_depth if depth is None else depth
+        max_pages = info.max_pages if max_pages is None else max_pages
+    elif settings.CHECKPOINT_ENABLED:
+        checkpoint = CrawlCheckpoint(new_crawl_id())
+    depth = 1 if depth is None else depth
+
+    # Override settings if needed
+    settings.MAX_DEPTH = depth
+    settings.OFFLINE = offline
+    if sitemap:
+        settings.SITEMAP_DISCOVERY = True
+    if cache_dir:
+        settings.HTTP_CACHE_DIR = cache_dir
+        http_cache.configure(cache_dir)
+    
+    crawler = Crawler(browser_manager, concurrency=concurrency, max_pages=max_pages, checkpoint=checkpoint,
+                      frontier=shared_frontier)
+    if checkpoint and not resume:
+        checkpoint.start(url, depth, crawler.max_pages)
+
+    if shared_frontier:
+        crawl_id = f"{shared_frontier.crawl_id} (shared, {shared_frontier.worker})"
+    else:
+        crawl_id = checkpoint.crawl_id if checkpoint else "not checkpointed"
+    console.print(Panel(f"[bold green]Starting Industrial Scraper[/bold green]\nURL: {url}\nDepth: {depth}\nWorkers: {crawler.concurrency}\nPage budget: {crawler.max_pages or 'unlimited'}\nCrawl ID: {crawl_id}", title="Configuration"))
+    
+    results = []
+    gdocs_exporter = None
+    if gdocs:
+        from ..pipeline.export_gdocs import GDocsExporter
+        # Credentials, clients and the document ID are resolved once per run
+        gdocs_exporter = GDocsExporter()
+
+    async def export_to_gdocs(call, *args):
+        # The Google client blocks; run it off the event loop so the crawl keeps going
+        try:
+            link = await asyncio.to_thread(call, *args)
+            if link:
+                console.print(f"[blue]Exported to GDoc: {link}[/blue]")
+        except Exception as e:
+            console.print(f"[red]GDocs Export Failed: {e}[/red]")
+    
+    metrics_server = None
+    try:
+        if settings.METRICS_PORT:
+            try:
+                metrics_server = await metrics.serve(settings.METRICS_PORT)
+            except OSError as e:
+                # e.g. the port is taken by another crawler process
+                console.print(f"[yellow]Metrics endpoint unavailable: {e}[/yellow]")
+        await browser_manager.start()
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console
+        ) as progress:
+            
+            task_id = progress.add_task(f"Crawling {url}...", total=None)
+            
+            # Crawl -> clean/dedupe -> extract -> export, all stages running at once.
+            # Bounded queues between the stages keep the crawl from racing ahead of extraction.
+            near_duplicates = NearDuplicateIndex()
+            # A near-duplicate stands in for its cluster's page if that one's extraction fails
+            fallback = ClusterFallback(crawler.store.release)
+            cluster_of = {}  # Near-duplicate extracted in a failed page's place -> its cluster
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            first_result_at = None
+            extracted = 0
+
+            table = Table(title="Scraping Results")
+            table.add_column("URL", style="cyan")
+            table.add_column("Company", style="magenta")
+            table.add_column("ESG Score (Avg)", justify="right")
+
+            async def unique_pages():
+                async for page in crawler.pages(url):
+                    # Basic filter: only process if the page has substantial text
+                    if page.size < 300:
+                        crawler.store.release(page)
+                        continue
+                    # Language variants, print views, tracking params etc. are only extracted once
+                    if settings.DEDUPE_ENABLED:
+                        duplicate_of = await near_duplicates.add_async(page.content, page.url)
+                        if duplicate_of is None:
+                            fallback.started(page.url)
+                        elif fallback.duplicate(duplicate_of, page):
+                            cluster_of[page.url] = duplicate_of
+                        else:
+                            console.print(f"[dim]Skipping {page.url} (near-duplicate of {duplicate_of})[/dim]")
+                            continue
+                    yield page
+
+            async def extract(page: PageRecord):
+                cluster = cluster_of.pop(page.url, page.url)
+                while True:
+                    try:
+                        report = await extractor.extract_document(page.content, page.url, is_html=False)
+                    except Exception as e:
+                        console.print(f"[red]Extraction error for {page.url}: {e}[/red]")
+                        report = None
+                    finally:
+                        # Bodies are only needed until extraction; keeps a long crawl's memory flat
+                        crawler.store.release(page)
+                    following = fallback.finished(cluster, report is not None) if settings.DEDUPE_ENABLED else None
+                    if following is None:
+                        return page, report
+                    console.print(f"[yellow]Extraction failed for {page.url}, trying near-duplicate {following.url}[/yellow]")
+                    page = following
+
+            async for _, (page, report) in map_concurrent(unique_pages(), extract, settings.LLM_CONCURRENCY):
+                extracted += 1
+                progress.update(task_id, description=f"Crawled {crawler.pages_stored} pages, extracted {extracted}...")
+                if not report:
+                    console.print(f"[red]Extraction failed for {page.url}[/red]")
+                    continue
+
+                if first_result_at is None:
+                    first_result_at = loop.time() - started
+                results.append(report.dict())
+
+                # Calculate average score for display
+                avg_score = (report.environmental.score + report.social.score + report.governance.score) / 3
+                table.add_row(report.url[:50] + "...", report.company_name, f"{avg_score:.1f}")
+
+                # GDocs Export (buffered, one batchUpdate every GDOCS_BATCH_SIZE reports)
+                if gdocs_exporter:
+                    await export_to_gdocs(gdocs_exporter.add, report)
+
+            if gdocs_exporter:
+                await export_to_gdocs(gdocs_exporter.flush)
+            console.print(f"[green]✓[/green] Crawled {crawler.pages_stored} pages.")
+            if first_result_at is not None:
+                console.print(f"[dim]First report after {first_result_at:.1f}s, total {loop.time() - started:.1f}s[/dim]")
+            
+            console.print(table)
+
+            host_table = Table(title="Per-host Queue Wait")
+            host_table.add_column("Host", style="cyan")
+            host_table.add_column("Requests", justify="right")
+            host_table.add_column("Avg Wait (s)", justify="right")
+            host_table.add_column("Max Wait (s)", justify="right")
+            host_table.add_column("Failures", justify="right")
+            host_table.add_column("Timeouts", justify="right")
+            host_table.add_column("Circuit Trips", justify="right")
+            for host, stats in host_scheduler.report().items():
+                host_table.add_row(host, str(stats.requests), f"{stats.avg_wait:.2f}", f"{stats.max_wait:.2f}",
+                                   str(stats.failures), str(stats.timeouts), str(stats.circuit_trips))
+            console.print(host_table)
+
+            if settings.DEDUPE_ENABLED:
+                console.print(f"[dim]{near_duplicates.summary(fallback.fallbacks)}[/dim]")
+            console.print(f"[dim]{crawler.visited_urls.summary()}[/dim]")
+            console.print(f"[dim]{crawler.store.summary()}[/dim]")
+            if shared_frontier:
+                console.print(f"[dim]{shared_frontier.summary()}[/dim]")
+            console.print(f"[dim]{fetch_tier.summary()}[/dim]")
+            if crawler.sitemaps:
+                console.print(f"[dim]{crawler.sitemaps.summary()}[/dim]")
+            if crawler.page_pool is not None:
+                console.print(f"[dim]{crawler.page_pool.summary()}[/dim]")
+            console.print(f"[dim]{http_cache.summary()}[/dim]")
+            console.print(f"[dim]{llm_cache.summary()}[/dim]")
+            if gdocs_exporter:
+                console.print(f"[dim]{gdocs_exporter.summary()}[/dim]")
+            if crawler.request_blocker:
+                console.print(f"[dim]{crawler.request_blocker.summary()}[/dim]")
+            print_stage_timings()
+            
+            # JSON Export
+            if output_file:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2)
+                console.print(f"[bold blue]Exported results to {output_file}[/bold blue]")
+                
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        if checkpoint:
+            console.print(f"Resume with: --resume {checkpoint.crawl_id}")
+    finally:
+        if gdocs_exporter and gdocs_exporter.pending:
+            # Reports extracted before a failure still reach the document
+            await export_to_gdocs(gdocs_exporter.flush)
+        crawler.store.close()
+        if checkpoint:
+            checkpoint.close()
+        if shared_frontier:
+            shared_frontier.backend.close()
+        shutdown_parse_pool()
+        shutdown_pdf_pool()
+        await fetch_tier.close()
+        await browser_manager.stop()
+        export_metrics()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+
+async def refresh_sources(names: list | None = None, output_file: str = None, cache_dir: str = None,
+                          offline: bool = False):
+    """
+    Refreshes the regulatory corpus: runs the selected source plugins (all by
+    default) at once in one shared browser and writes their documents as JSON.
+    """
+    settings.OFFLINE = offline
+    if cache_dir:
+        settings.HTTP_CACHE_DIR = cache_dir
+        http_cache.configure(cache_dir)
+
+    sources = create_sources(names)
+    console.print(Panel("\n".join(
+        f"{source.name}: {source.start_url} ({source.concurrency} at a time, up to {source.max_pages} pages)"
+        for source in sources
+    ), title="Regulatory Sources"))
+
+    pool = PagePool(browser_manager, size=sum(source.concurrency for source in sources))
+    documents = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        async for document in run_sources(sources, pool):
+            documents.append(document.to_dict())
+            console.print(f"[dim][{document.source}] {document.kind}: {document.title[:60]} ({len(document.text)} chars)[/dim]")
+
+        table = Table(title="Regulatory Sources")
+        table.add_column("Source", style="cyan")
+        table.add_column("Pages", justify="right")
+        table.add_column("Documents", justify="right")
+        table.add_column("Time (s)", justify="right")
+        for source in sources:
+            table.add_row(source.name, str(source.pages_fetched), str(source.documents_emitted), f"{source.elapsed:.1f}")
+        console.print(table)
+        console.print(f"[green]✓[/green] {len(documents)} documents in {loop.time() - started:.1f}s")
+        console.print(f"[dim]{fetch_tier.summary()}[/dim]")
+        print_stage_timings()
+
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(documents, f, indent=2)
+            console.print(f"[bold blue]Exported documents to {output_file}[/bold blue]")
+    finally:
+        await pool.close()
+        shutdown_parse_pool()
+        shutdown_pdf_pool()
+        await fetch_tier.close()
+        await browser_manager.stop()
+        export_metrics()
+
+def _crawl_process(kwargs: dict):
+    """Entry point of a `--processes` worker."""
+    asyncio.run(run_scraper(**kwargs))
+
+def run_processes(processes: int, frontier_url: str | None, crawl_id: str | None, **kwargs):
+    """
+    Runs `processes` scrapers over one shared frontier (SQLite next to the
+    checkpoint database unless another is given) and merges their JSON output.
+    The page budget is shared through the frontier; Google Docs export runs
+    once, over the merged reports.
+    """
+    default_frontier = os.path.join(os.path.dirname(settings.CHECKPOINT_PATH), "frontier.db")
+    frontier_url = frontier_url or settings.FRONTIER_URL or f"sqlite:///{default_frontier}"
+    resume = kwargs.pop("resume", None)
+    crawl_id = crawl_id or resume or new_crawl_id()
+    gdocs = kwargs.pop("gdocs", False)
+    output_file = kwargs.pop("output_file") or "results.json"
+    stem, suffix = os.path.splitext(output_file)
+    parts = [f"{stem}.p{i}{suffix}" for i in range(processes)]
+
+    console.print(f"[bold green]Crawl {crawl_id}: {processes} processes sharing {frontier_url}[/bold green]")
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=_crawl_process, args=(dict(kwargs, output_file=part, gdocs=False, frontier_url=frontier_url, crawl_id=crawl_id),))
+        for part in parts
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    results = []
+    for part in parts:
+        if os.path.exists(part):
+            with open(part, encoding='utf-8') as f:
+                results.extend(json.load(f))
+            os.remove(part)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    console.print(f"[bold blue]Exported {len(results)} results from {processes} processes to {output_file}[/bold blue]")
+
+    if gdocs and results:
+        from ..pipeline.export_gdocs import GDocsExporter
+        from ..pipeline.models import ESGReport
+        exporter = GDocsExporter(batch_size=0)
+        try:
+            for result in results:
+                exporter.add(ESGReport(**result))
+            console.print(f"[blue]Exported to GDoc: {exporter.flush()}[/blue]")
+        except Exception as e:
+            console.print(f"[red]GDocs Export Failed: {e}[/red]")
+        console.print(f"[dim]{exporter.summary()}[/dim]")
+
+def main():
+    parser = argparse.ArgumentParser(description="Industrial Grade ESG Scraper")
+    parser.add_argument("url", nargs="?", help="Target URL to scrape (optional with --resume)")
+    parser.add_argument("--depth", type=int, default=None, help="Crawl depth (default: 1)")
+    parser.add_argument("--output", "-o", help="Output JSON file path", default="results.json")
+    parser.add_argument("--gdocs", "-g", action="store_true", help="Export to Google Docs")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after this many pages, most ESG-relevant first")
+    parser.add_argument("--cache-dir", help=f"HTTP cache directory (default: {settings.HTTP_CACHE_DIR})")
+    parser.add_argument("--offline", action="store_true", help="Serve pages and PDFs from the cache only")
+    parser.add_argument("--concurrency", "-c", type=int, default=None, help=f"Parallel crawl workers (default: {settings.CONCURRENCY_LIMIT})")
+    parser.add_argument("--resume", metavar="CRAWL_ID", help="Continue an interrupted crawl from its checkpoint")
+    parser.add_argument("--processes", "-p", type=int, default=settings.CRAWL_PROCESSES, help="Crawler processes sharing one frontier (default: 1)")
+    parser.add_argument("--frontier", metavar="URL", help="Shared frontier, sqlite:///path.db or redis://host:6379/0, to crawl from several processes or machines")
+    parser.add_argument("--crawl-id", help="ID of the shared crawl to join (with --frontier)")
+    parser.add_argument("--sources", nargs="*", metavar="NAME", choices=list(SOURCES),
+                        help=f"Refresh the regulatory sources instead of crawling a URL ({', '.join(SOURCES)}; default: all)")
+    parser.add_argument("--trace", metavar="PATH", help="Write a Chrome trace (JSON) of every pipeline stage")
+    parser.add_argument("--metrics", metavar="PATH", help="Write Prometheus-format metrics to this file at the end")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help="Serve Prometheus metrics on /metrics while running")
+    parser.add_argument("--sitemap", action="store_true", help="Seed from the site's sitemaps and only fetch pages new or changed since the last run")
+    
+    args = parser.parse_args()
+    settings.TRACE_PATH = args.trace or settings.TRACE_PATH
+    settings.METRICS_PATH = args.metrics or settings.METRICS_PATH
+    settings.METRICS_PORT = args.metrics_port or settings.METRICS_PORT
+    if args.sources is not None:
+        asyncio.run(refresh_sources(args.sources, args.output, args.cache_dir, args.offline))
+        return
+
+    shared = args.processes > 1 or args.frontier or settings.FRONTIER_URL
+    if not args.url and (shared or not args.resume):
+        parser.error("a URL is required unless --resume is given (it is always required for shared crawls)")
+    
+    if args.processes > 1:
+        run_processes(args.processes, args.frontier, args.crawl_id, url=args.url, depth=args.depth,
+                      output_file=args.output, gdocs=args.gdocs, concurrency=args.concurrency,
+                      cache_dir=args.cache_dir, offline=args.offline, max_pages=args.max_pages, resume=args.resume,
+                      sitemap=args.sitemap)
+        return
+    
+    asyncio.run(run_scraper(args.url, args.depth, args.output, args.gdocs, args.concurrency,
+                            args.cache_dir, args.offline, args.max_pages, args.resume,
+                            args.frontier, args.crawl_id, args.sitemap))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from src.interface.cli import main
-
-if __name__ == "__main__":
-    main()
+from src.interface.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import re
+from typing import List
+
+from ..core.config import settings
+from .parsing import Section, clean_lines, parse_html
+
+_NUMBERED_HEADING_RE = re.compile(r"^(\d+(\.\d+)*\.?|[A-Z]\.|[IVX]+\.)\s+\S")
+_MARKDOWN_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+)$")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+def html_to_sections(html_content: str) -> List[Section]:
+    """Cleans HTML like `clean_html_content`, but keeps h1-h6 as section boundaries."""
+    return parse_html(html_content).sections
+
+def _looks_like_heading(line: str) -> bool:
+    if len(line) > 80 or line.endswith((".", ",", ";", ":")):
+        return False
+    if _NUMBERED_HEADING_RE.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters)
+
+def text_to_sections(text: str) -> List[Section]:
+    """
+    Splits plain text on Markdown headings (pages stored by the crawler) or,
+    for PDF output, on numbered or upper-case heading lines.
+    """
+    sections = [Section("", 0, "")]
+    body: List[str] = []
+    for line in clean_lines(text):
+        markdown = _MARKDOWN_HEADING_RE.match(line)
+        if markdown or _looks_like_heading(line):
+            sections[-1].text = "\n".join(body)
+            body = []
+            if markdown:
+                sections.append(Section(markdown.group(2), len(markdown.group(1)), ""))
+            else:
+                sections.append(Section(line, 1, ""))
+        else:
+            body.append(line)
+    sections[-1].text = "\n".join(body)
+    return [s for s in sections if s.text or s.heading]
+
+def _split_oversized(section: Section, max_tokens: int) -> List[Section]:
+    """Splits a section that alone exceeds the budget on line boundaries."""
+    parts, current, size = [], [], 0
+    for line in section.text.split("\n"):
+        cost = estimate_tokens(line)
+        if current and size + cost > max_tokens:
+            parts.append(Section(section.heading, section.level, "\n".join(current)))
+            current, size = [], 0
+        # Pathologically long single lines are cut hard
+        while cost > max_tokens:
+            parts.append(Section(section.heading, section.level, line[:max_tokens * 4]))
+            line = line[max_tokens * 4:]
+            cost = estimate_tokens(line)
+        current.append(line)
+        size += cost
+    if current:
+        parts.append(Section(section.heading, section.level, "\n".join(current)))
+    return parts
+
+def chunk_sections(sections: List[Section], max_tokens: int | None = None) -> List[str]:
+    """
+    Greedily packs consecutive sections into chunks of at most `max_tokens`,
+    never splitting a section unless it is larger than the budget by itself.
+    """
+    max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for section in sections:
+        for part in _split_oversized(section, max_tokens):
+            block = f"{part.heading}\n{part.text}" if part.heading else part.text
+            cost = estimate_tokens(block)
+            if current and size + cost > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(block)
+            size += cost
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def chunk_document(content: str, is_html: bool = True, max_tokens: int | None = None) -> List[str]:
+    """Cleans and chunks a page or document on its headings."""
+    sections = html_to_sections(content) if is_html else text_to_sections(content)
+    return chunk_sections(sections, max_tokens)
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Generic, List, Tuple, TypeVar
+
+from ..core.config import settings
+from .parsing import get_parse_pool
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+T = TypeVar("T")
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of the word shingles of `text`."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    # A bit is set when most shingle hashes have it set. Rather than visiting all
+    # 64 bits of every hash, count each byte position's values (in C) and add up
+    # the bits per distinct value: at most 8 * 256 values, however long the text.
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    half = len(shingles) / 2
+    fingerprint = 0
+    for position in range(8):
+        counts = Counter(digests[position::8])
+        for bit in range(8):
+            if sum(count for value, count in counts.items() if value >> bit & 1) > half:
+                fingerprint |= 1 << ((7 - position) * 8 + bit)  # Big-endian: byte 0 is the top byte
+    return fingerprint
+
+async def simhash_async(text: str) -> int:
+    """`simhash` in the parse pool (inline for short texts, where IPC costs more)."""
+    if len(text) < settings.HTML_INLINE_PARSE_BYTES:
+        return simhash(text)
+    return await asyncio.get_running_loop().run_in_executor(get_parse_pool(), simhash, text)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class NearDuplicateIndex:
+    """
+    Online clustering of pages by SimHash. The 64-bit fingerprint is split into
+    `max_distance + 1` bands; two fingerprints within `max_distance` bits
+    share at least one band exactly, so only pages in matching band buckets
+    are compared.
+
+    The first page of a cluster is its representative; later near-identical
+    pages are attached to it and only extracted if its extraction fails
+    (`ClusterFallback`).
+    """
+    def __init__(self, max_distance: int | None = None):
+        self.max_distance = settings.DEDUPE_MAX_DISTANCE if max_distance is None else max_distance
+        self.bands = self.max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._buckets: List[Dict[int, List[Tuple[int, str]]]] = [defaultdict(list) for _ in range(self.bands)]
+        self.clusters: Dict[str, List[str]] = {}  # representative url -> duplicate urls
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def find(self, fingerprint: int) -> str | None:
+        """Returns the representative URL of a near-identical page, if any."""
+        for band, value in enumerate(self._band_values(fingerprint)):
+            for other, url in self._buckets[band].get(value, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, text: str, url: str) -> str | None:
+        """
+        Indexes a page. Returns None if it starts a new cluster, or the URL of
+        the representative it duplicates.
+        """
+        return self.add_fingerprint(simhash(text), url)
+
+    async def add_async(self, text: str, url: str) -> str | None:
+        """`add`, fingerprinting long texts in the parse pool instead of on the event loop."""
+        return self.add_fingerprint(await simhash_async(text), url)
+
+    def add_fingerprint(self, fingerprint: int, url: str) -> str | None:
+        representative = self.find(fingerprint)
+        if representative is not None:
+            self.clusters[representative].append(url)
+            return representative
+
+        for band, value in enumerate(self._band_values(fingerprint)):
+            self._buckets[band][value].append((fingerprint, url))
+        self.clusters[url] = []
+        return None
+
+    @property
+    def duplicates(self) -> int:
+        """Number of pages skipped, i.e. extraction calls avoided."""
+        return sum(len(dups) for dups in self.clusters.values())
+
+    def summary(self, fallbacks: int = 0) -> str:
+        """`fallbacks`: duplicates extracted after all (see `ClusterFallback`)."""
+        clustered = sum(1 for dups in self.clusters.values() if dups)
+        return (
+            f"Near-duplicate detection: {len(self.clusters)} unique pages, "
+            f"{self.duplicates} duplicates in {clustered} clusters ({self.duplicates - fallbacks} LLM calls avoided)"
+        )
+
+class ClusterFallback(Generic[T]):
+    """
+    Near-duplicates that arrive while their cluster is being extracted are
+    kept on standby instead of dropped: if the extraction fails, the next
+    member is extracted in its place. Once one extraction of a cluster has
+    succeeded, its remaining members are handed to `release`.
+
+    Clusters are named by their representative's URL (see `NearDuplicateIndex`).
+    """
+    def __init__(self, release: Callable[[T], None]):
+        self.release = release
+        self._standby: Dict[str, List[T]] = {}  # Cluster with an extraction in flight -> members waiting
+        self._extracted: Dict[str, bool] = {}  # Cluster -> whether its last extraction succeeded
+        self.fallbacks = 0
+
+    def started(self, cluster: str):
+        """The cluster's representative is being extracted."""
+        self._standby[cluster] = []
+
+    def duplicate(self, cluster: str, member: T) -> bool:
+        """
+        Takes a near-duplicate of `cluster`. Returns True if it should be
+        extracted right away, because every earlier extraction of the cluster failed.
+        """
+        if cluster in self._standby:
+            self._standby[cluster].append(member)
+            return False
+        if self._extracted.get(cluster, True):
+            self.release(member)
+            return False
+        self.started(cluster)
+        self.fallbacks += 1
+        return True
+
+    def finished(self, cluster: str, extracted: bool) -> T | None:
+        """
+        Records the outcome of an extraction of `cluster`. After a failure,
+        returns the next member to extract, if one is waiting.
+        """
+        standby = self._standby.pop(cluster, [])
+        if not extracted and standby:
+            self._standby[cluster] = standby[1:]
+            self.fallbacks += 1
+            return standby[0]
+        self._extracted[cluster] = extracted
+        for member in standby:
+            self.release(member)
+        return None
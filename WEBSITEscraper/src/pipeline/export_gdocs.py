@@ -1,102 +1,176 @@
-import os.path
-import pickle
-import datetime
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from .models import ESGReport
-
-# If modifying these scopes, delete the file token.pickle.
-SCOPES = ['https://www.googleapis.com/auth/documents', 'https://www.googleapis.com/auth/drive']
-
-def get_credentials():
-    """Shows basic usage of the Docs API.
-    Prints the title of a sample document.
-    """
-    creds = None
-    # The file token.pickle stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first
-    # time.
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists('credentials.json'):
-                print("Error: credentials.json not found.")
-                return None
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    return creds
-
-def find_or_create_esg_doc(title="ESG Master Report"):
-    """Finds an existing ESG doc or creates a new one."""
-    creds = get_credentials()
-    if not creds: return None
-    
-    service_drive = build('drive', 'v3', credentials=creds)
-    service_docs = build('docs', 'v1', credentials=creds)
-    
-    # Search for the file
-    query = f"name = '{title}' and mimeType = 'application/vnd.google-apps.document' and trashed = false"
-    results = service_drive.files().list(q=query, fields="files(id, name)").execute()
-    files = results.get('files', [])
-    
-    if files:
-        # print(f"Found existing document: {files[0]['name']} ({files[0]['id']})")
-        return files[0]['id']
-    else:
-        # Create new
-        body = {'title': title}
-        doc = service_docs.documents().create(body=body).execute()
-        # print(f"Created new document: {title} ({doc.get('documentId')})")
-        return doc.get('documentId')
-
-def append_esg_analysis(document_id: str, report: ESGReport):
-    """Appends (actually prepends to top) analysis to the given document."""
-    creds = get_credentials()
-    if not creds: return None
-    service = build('docs', 'v1', credentials=creds)
-    
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Format text content from Pydantic model
-    text_content = (
-        f"\n--------------------------------------------------\n"
-        f"REPORT DATE: {timestamp}\n"
-        f"TARGET URL: {report.url}\n"
-        f"COMPANY: {report.company_name}\n"
-        f"SUMMARY: {report.summary}\n\n"
-        f"--- Environmental (Score: {report.environmental.score}) ---\n"
-        f"Assessment: {report.environmental.assessment}\n"
-        f"Gaps: {report.environmental.gaps or 'None'}\n\n"
-        f"--- Social (Score: {report.social.score}) ---\n"
-        f"Assessment: {report.social.assessment}\n"
-        f"Gaps: {report.social.gaps or 'None'}\n\n"
-        f"--- Governance (Score: {report.governance.score}) ---\n"
-        f"Assessment: {report.governance.assessment}\n"
-        f"Gaps: {report.governance.gaps or 'None'}\n"
-        f"--------------------------------------------------\n\n"
-    )
-
-    # Insert at index 1 (top of document) so the newest is always first
-    requests = [
-        {
-            'insertText': {
-                'location': {
-                    'index': 1,
-                },
-                'text': text_content
-            }
-        }
-    ]
-    
-    service.documents().batchUpdate(documentId=document_id, body={'requests': requests}).execute()
-    return f"https://docs.google.com/document/d/{document_id}/edit"
+import os.path
+import pickle
+import datetime
+from typing import List
+from google.auth.transport.requests import Request
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from ..core.config import settings
+from ..core.metrics import metrics
+from .models import ESGReport
+
+# If modifying these scopes, delete the file token.pickle.
+SCOPES = ['https://www.googleapis.com/auth/documents', 'https://www.googleapis.com/auth/drive']
+
+def get_credentials():
+    """Shows basic usage of the Docs API.
+    Prints the title of a sample document.
+    """
+    creds = None
+    # The file token.pickle stores the user's access and refresh tokens, and is
+    # created automatically when the authorization flow completes for the first
+    # time.
+    if os.path.exists('token.pickle'):
+        with open('token.pickle', 'rb') as token:
+            creds = pickle.load(token)
+    # If there are no (valid) credentials available, let the user log in.
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            if not os.path.exists('credentials.json'):
+                print("Error: credentials.json not found.")
+                return None
+            flow = InstalledAppFlow.from_client_secrets_file(
+                'credentials.json', SCOPES)
+            creds = flow.run_local_server(port=0)
+        # Save the credentials for the next run
+        with open('token.pickle', 'wb') as token:
+            pickle.dump(creds, token)
+    return creds
+
+def format_report(report: ESGReport, timestamp: str) -> str:
+    """Plain-text block for one report, as inserted into the document."""
+    return (
+        f"\n--------------------------------------------------\n"
+        f"REPORT DATE: {timestamp}\n"
+        f"TARGET URL: {report.url}\n"
+        f"COMPANY: {report.company_name}\n"
+        f"SUMMARY: {report.summary}\n\n"
+        f"--- Environmental (Score: {report.environmental.score}) ---\n"
+        f"Assessment: {report.environmental.assessment}\n"
+        f"Gaps: {report.environmental.gaps or 'None'}\n\n"
+        f"--- Social (Score: {report.social.score}) ---\n"
+        f"Assessment: {report.social.assessment}\n"
+        f"Gaps: {report.social.gaps or 'None'}\n\n"
+        f"--- Governance (Score: {report.governance.score}) ---\n"
+        f"Assessment: {report.governance.assessment}\n"
+        f"Gaps: {report.governance.gaps or 'None'}\n"
+        f"--------------------------------------------------\n\n"
+    )
+
+class GDocsExporter:
+    """
+    Exports reports to one Google Doc with as few API round trips as possible.
+
+    Credentials, the Drive and Docs clients and the document ID are resolved
+    once and cached. Reports are buffered and written with a single
+    batchUpdate every `batch_size` reports (0 = only on `flush`). The newest
+    report stays at the top of the document, as before.
+
+    `docs_service` and `drive_service` can be injected (e.g. stubs with the
+    same `documents()` / `files()` call chain), in which case no credentials
+    are loaded at all.
+    """
+    def __init__(self, title: str | None = None, batch_size: int | None = None,
+                 docs_service=None, drive_service=None, document_id: str | None = None, credentials=None):
+        self.title = title or settings.GDOCS_TITLE
+        self.batch_size = settings.GDOCS_BATCH_SIZE if batch_size is None else batch_size
+        self._docs = docs_service
+        self._drive = drive_service
+        self._creds = credentials
+        self._document_id = document_id
+        self._pending: List[str] = []
+        self.reports_exported = 0
+        self.api_calls = 0
+
+    def _credentials(self):
+        if self._creds is None:
+            self._creds = get_credentials()
+            if self._creds is None:
+                raise RuntimeError("No Google credentials available (credentials.json not found)")
+        return self._creds
+
+    @property
+    def docs(self):
+        if self._docs is None:
+            self._docs = build('docs', 'v1', credentials=self._credentials())
+        return self._docs
+
+    @property
+    def drive(self):
+        if self._drive is None:
+            self._drive = build('drive', 'v3', credentials=self._credentials())
+        return self._drive
+
+    @property
+    def document_id(self) -> str:
+        """ID of the document named `title`, created on first use if it doesn't exist."""
+        if self._document_id is None:
+            with metrics.span("gdocs.lookup"):
+                self._document_id = self._find_or_create()
+        return self._document_id
+
+    def _find_or_create(self) -> str:
+        name = self.title.replace("\\", "\\\\").replace("'", "\\'")
+        query = f"name = '{name}' and mimeType = 'application/vnd.google-apps.document' and trashed = false"
+        results = self.drive.files().list(q=query, fields="files(id, name)").execute()
+        self.api_calls += 1
+        files = results.get('files', [])
+        if files:
+            return files[0]['id']
+        doc = self.docs.documents().create(body={'title': self.title}).execute()
+        self.api_calls += 1
+        return doc.get('documentId')
+
+    @property
+    def link(self) -> str:
+        return f"https://docs.google.com/document/d/{self.document_id}/edit"
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, report: ESGReport) -> str | None:
+        """Buffers `report`. Returns the document link when this triggered a write."""
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._pending.append(format_report(report, timestamp))
+        if self.batch_size and len(self._pending) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> str | None:
+        """
+        Writes all buffered reports in one batchUpdate. Reports stay buffered
+        if the call fails, so a later flush retries them.
+        """
+        if not self._pending:
+            return None
+        # One insert at index 1 (top of document), newest report first
+        text = "".join(reversed(self._pending))
+        requests = [{'insertText': {'location': {'index': 1}, 'text': text}}]
+        document_id = self.document_id
+        with metrics.span("gdocs.flush", reports=len(self._pending)):
+            self.docs.documents().batchUpdate(documentId=document_id, body={'requests': requests}).execute()
+        self.api_calls += 1
+        metrics.count("gdocs.reports", len(self._pending))
+        self.reports_exported += len(self._pending)
+        self._pending = []
+        return self.link
+
+    def summary(self) -> str:
+        return f"Google Docs: {self.reports_exported} reports exported in {self.api_calls} API calls"
+
+def find_or_create_esg_doc(title="ESG Master Report"):
+    """Finds an existing ESG doc or creates a new one."""
+    creds = get_credentials()
+    if not creds: return None
+    return GDocsExporter(title, credentials=creds).document_id
+
+def append_esg_analysis(document_id: str, report: ESGReport):
+    """Appends (actually prepends to top) analysis to the given document. Prefer `GDocsExporter` for many reports."""
+    creds = get_credentials()
+    if not creds: return None
+    exporter = GDocsExporter(document_id=document_id, credentials=creds)
+    exporter.add(report)
+    return exporter.flush()
@@ -1,80 +1,248 @@
-import json
-import logging
-from datetime import datetime
-import google.generativeai as genai
-from .models import ESGReport, EnvironmentalData, SocialData, GovernanceData
-from ..core.config import settings
-
-import time
-import random
-from google.api_core import exceptions
-
-logger = logging.getLogger(__name__)
-
-class Extractor:
-    def __init__(self):
-        if not settings.GEMINI_API_KEY:
-            logger.warning("GEMINI_API_KEY not set. Extraction will fail.")
-        else:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(
-                settings.GEMINI_MODEL,
-                generation_config={"response_mime_type": "application/json"}
-            )
-
-    def extract(self, text: str, url: str) -> ESGReport | None:
-        """
-        Extracts structured ESG data from text using Gemini.
-        """
-        if not settings.GEMINI_API_KEY:
-            return None
-
-        prompt = f"""
-        Analyze the following text for ESG (Environmental, Social, Governance) compliance.
-        Extract the data into a JSON object matching this schema:
-
-        {{
-            "company_name": "string",
-            "url": "{url}",
-            "summary": "string",
-            "environmental": {{ "score": int, "assessment": "string", "gaps": "string" }},
-            "social": {{ "score": int, "assessment": "string", "gaps": "string" }},
-            "governance": {{ "score": int, "assessment": "string", "gaps": "string" }},
-            "timestamp": "{datetime.now().isoformat()}"
-        }}
-
-        Text:
-        {text[:30000]} 
-        """
-        
-        retries = 0
-        max_retries = 5
-        base_delay = 10  # Seconds
-
-        while retries <= max_retries:
-            try:
-                response = self.model.generate_content(prompt)
-                data = json.loads(response.text)
-                
-                # Validate with Pydantic
-                report = ESGReport(**data)
-                return report
-                
-            except exceptions.ResourceExhausted as e:
-                retries += 1
-                if retries > max_retries:
-                    logger.error(f"Quota exceeded for {url}. Max retries reached: {e}")
-                    return None
-                
-                # Calculate backoff with jitter
-                delay = (base_delay * (2 ** (retries - 1))) + random.uniform(0, 5)
-                logger.warning(f"Quota exceeded for {url}. Retrying in {delay:.2f}s... (Attempt {retries}/{max_retries})")
-                time.sleep(delay)
-
-            except Exception as e:
-                logger.error(f"Extraction failed for {url}: {e}")
-                return None
-        
-        return None
-
-extractor = Extractor()
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Iterable, List, Tuple
+import google.generativeai as genai
+from .models import ESG_SCHEMA_VERSION, ESGReport, EnvironmentalData, SocialData, GovernanceData
+from .llm_cache import fingerprint, llm_cache
+from .chunking import chunk_document, estimate_tokens
+from .merge import merge_reports
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.scheduler import TokenBucket
+
+import time
+import random
+from google.api_core import exceptions
+
+logger = logging.getLogger(__name__)
+
+class LLMRateLimiter:
+    """
+    Shared requests-per-minute and tokens-per-minute budget for all extraction
+    calls. A quota error pauses every caller, not just the one that hit it.
+    """
+    def __init__(self, requests_per_minute: int | None = None, tokens_per_minute: int | None = None):
+        self.requests_per_minute = requests_per_minute or settings.LLM_REQUESTS_PER_MINUTE
+        self.tokens_per_minute = tokens_per_minute or settings.LLM_TOKENS_PER_MINUTE
+        self._requests: TokenBucket | None = None
+        self._tokens: TokenBucket | None = None
+        self._paused_until = 0.0
+        self.total_wait = 0.0
+
+    async def acquire(self, tokens: int) -> float:
+        """Waits until a request of `tokens` tokens fits the budget. Returns the wait in seconds."""
+        loop = asyncio.get_running_loop()
+        if self._requests is None:
+            self._requests = TokenBucket(self.requests_per_minute / 60, self.requests_per_minute)
+            self._tokens = TokenBucket(self.tokens_per_minute / 60, self.tokens_per_minute)
+
+        start = loop.time()
+        delay = max(self._requests.reserve(), self._tokens.reserve(tokens), self._paused_until - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        waited = loop.time() - start
+        self.total_wait += waited
+        return waited
+
+    def pause(self, seconds: float):
+        """Holds back every caller for `seconds` (used after a quota error)."""
+        self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + seconds)
+
+class Extractor:
+    def __init__(self):
+        self.limiter = LLMRateLimiter()
+        self._semaphore: asyncio.Semaphore | None = None
+        if not settings.GEMINI_API_KEY:
+            logger.warning("GEMINI_API_KEY not set. Extraction will fail.")
+        else:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            self.model = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                generation_config={"response_mime_type": "application/json"}
+            )
+
+    @staticmethod
+    def prepare_text(text: str) -> str:
+        return text[:30000]
+
+    def build_prompt(self, text: str) -> str:
+        # Deliberately free of per-call values (URL, time) so identical inputs
+        # produce identical prompts and can be served from the LLM cache.
+        return f"""
+        Analyze the following text for ESG (Environmental, Social, Governance) compliance.
+        Extract the data into a JSON object matching this schema:
+
+        {{
+            "company_name": "string",
+            "summary": "string",
+            "environmental": {{ "score": int, "assessment": "string", "gaps": "string" }},
+            "social": {{ "score": int, "assessment": "string", "gaps": "string" }},
+            "governance": {{ "score": int, "assessment": "string", "gaps": "string" }}
+        }}
+
+        Text:
+        {self.prepare_text(text)}
+        """
+
+    @staticmethod
+    def cache_key(text: str) -> str:
+        return fingerprint(settings.GEMINI_MODEL, ESG_SCHEMA_VERSION, Extractor.prepare_text(text))
+
+    @staticmethod
+    def build_report(data: dict, url: str) -> ESGReport:
+        """Validates model output, injecting the source URL and extraction time."""
+        data = {k: v for k, v in data.items() if k not in ("url", "timestamp")}
+        return ESGReport(**data, url=url, timestamp=datetime.now().isoformat())
+
+    def cached_report(self, key: str, url: str) -> ESGReport | None:
+        data = llm_cache.get(key)
+        if data is None:
+            return None
+        try:
+            return self.build_report(data, url)
+        except Exception as e:
+            logger.warning(f"Discarding unusable cached response for {url}: {e}")
+            return None
+
+    @staticmethod
+    def backoff_delay(retries: int) -> float:
+        """Exponential backoff with jitter for the given attempt number (1-based)."""
+        return (settings.LLM_RETRY_BASE_DELAY * (2 ** (retries - 1))) + random.uniform(0, settings.LLM_RETRY_JITTER)
+
+    def extract(self, text: str, url: str) -> ESGReport | None:
+        """
+        Extracts structured ESG data from text using Gemini.
+        Blocking; async callers should use `extract_async`.
+        """
+        if not settings.GEMINI_API_KEY:
+            return None
+
+        key = self.cache_key(text)
+        cached = self.cached_report(key, url)
+        if cached is not None:
+            metrics.count("llm.cache_hits")
+            return cached
+
+        prompt = self.build_prompt(text)
+
+        retries = 0
+        max_retries = settings.LLM_MAX_RETRIES
+
+        while retries <= max_retries:
+            try:
+                metrics.count("llm.calls")
+                with metrics.span("llm.call", url=url):
+                    response = self.model.generate_content(prompt)
+                data = json.loads(response.text)
+
+                # Validate with Pydantic
+                report = self.build_report(data, url)
+                llm_cache.put(key, settings.GEMINI_MODEL, data)
+                return report
+
+            except exceptions.ResourceExhausted as e:
+                retries += 1
+                metrics.count("llm.quota_errors")
+                if retries > max_retries:
+                    logger.error(f"Quota exceeded for {url}. Max retries reached: {e}")
+                    metrics.count("llm.failures")
+                    return None
+
+                # Calculate backoff with jitter
+                delay = self.backoff_delay(retries)
+                logger.warning(f"Quota exceeded for {url}. Retrying in {delay:.2f}s... (Attempt {retries}/{max_retries})")
+                with metrics.span("llm.backoff", url=url, attempt=retries):
+                    time.sleep(delay)
+
+            except Exception as e:
+                logger.error(f"Extraction failed for {url}: {e}")
+                metrics.count("llm.failures")
+                return None
+
+        return None
+
+    async def extract_async(self, text: str, url: str) -> ESGReport | None:
+        """
+        Non-blocking `extract`: bounded by LLM_CONCURRENCY in-flight calls and the
+        shared RPM/TPM limiter, with backoff that only suspends this coroutine.
+        """
+        if not settings.GEMINI_API_KEY:
+            return None
+
+        key = self.cache_key(text)
+        # The cache is SQLite on disk; keep its reads and writes off the event loop
+        cached = await asyncio.to_thread(self.cached_report, key, url)
+        if cached is not None:
+            metrics.count("llm.cache_hits")
+            return cached
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.LLM_CONCURRENCY)
+
+        prompt = self.build_prompt(text)
+        tokens = estimate_tokens(prompt)
+        retries = 0
+        max_retries = settings.LLM_MAX_RETRIES
+
+        async with self._semaphore:
+            while retries <= max_retries:
+                # Rate limiting and, after a quota error, the shared backoff pause
+                with metrics.span("llm.wait", url=url, attempt=retries):
+                    await self.limiter.acquire(tokens)
+                try:
+                    metrics.count("llm.calls")
+                    with metrics.span("llm.call", url=url, tokens=tokens):
+                        response = await self.model.generate_content_async(prompt)
+                    data = json.loads(response.text)
+                    report = self.build_report(data, url)
+                    await asyncio.to_thread(llm_cache.put, key, settings.GEMINI_MODEL, data)
+                    return report
+
+                except exceptions.ResourceExhausted as e:
+                    retries += 1
+                    metrics.count("llm.quota_errors")
+                    if retries > max_retries:
+                        logger.error(f"Quota exceeded for {url}. Max retries reached: {e}")
+                        metrics.count("llm.failures")
+                        return None
+
+                    delay = self.backoff_delay(retries)
+                    logger.warning(f"Quota exceeded for {url}. Retrying in {delay:.2f}s... (Attempt {retries}/{max_retries})")
+                    metrics.count("llm.backoff_seconds", delay)
+                    self.limiter.pause(delay)
+
+                except Exception as e:
+                    logger.error(f"Extraction failed for {url}: {e}")
+                    metrics.count("llm.failures")
+                    return None
+
+        return None
+
+    async def extract_document(self, content: str, url: str, is_html: bool = True) -> ESGReport | None:
+        """
+        Map-reduce extraction for long documents: splits `content` on its
+        headings into chunks of at most CHUNK_MAX_TOKENS, extracts the chunks
+        concurrently and merges the results into a single report.
+        """
+        with metrics.span("llm.chunk", url=url):
+            chunks = chunk_document(content, is_html)
+        if not chunks:
+            return None
+        if len(chunks) > settings.CHUNK_MAX_CHUNKS:
+            logger.info(f"{url}: keeping {settings.CHUNK_MAX_CHUNKS} of {len(chunks)} chunks")
+            chunks = chunks[:settings.CHUNK_MAX_CHUNKS]
+        with metrics.span("llm.extract", url=url, chunks=len(chunks)):
+            if len(chunks) == 1:
+                return await self.extract_async(chunks[0], url)
+
+            logger.info(f"Extracting {url} in {len(chunks)} chunks")
+            reports = await asyncio.gather(*[self.extract_async(chunk, url) for chunk in chunks])
+            return merge_reports(reports, [len(chunk) for chunk in chunks], url)
+
+    async def extract_many(self, pages: Iterable[Tuple[str, str]]) -> List[ESGReport | None]:
+        """Extracts `(text, url)` pairs concurrently; results keep the input order."""
+        return await asyncio.gather(*[self.extract_async(text, url) for text, url in pages])
+
+extractor = Extractor()
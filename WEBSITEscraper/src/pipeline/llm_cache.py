@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of the input, so re-crawls with reflowed markup still hit."""
+    return " ".join(text.split())
+
+def fingerprint(model: str, schema_version: int, text: str) -> str:
+    """Cache key for one extraction: (model, schema version, normalized input hash)."""
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model}|{schema_version}|{text_hash}".encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    SQLite-backed cache of LLM extraction responses keyed by prompt
+    fingerprint. Entries expire after LLM_CACHE_TTL_DAYS and the least recently
+    used ones are dropped beyond LLM_CACHE_MAX_ENTRIES.
+    """
+    def __init__(self, path: str | None = None):
+        self._path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, path: str):
+        self.close()
+        self._path = path
+
+    @property
+    def enabled(self) -> bool:
+        return settings.LLM_CACHE_ENABLED
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            path = Path(self._path or settings.LLM_CACHE_PATH)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, data TEXT, created_at REAL, accessed_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get(self, key: str) -> dict | None:
+        """Returns the cached response data, or None on a miss or expired entry."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT data, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > settings.LLM_CACHE_TTL_DAYS * 86400:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, data: dict):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, json.dumps(data), now, now),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection):
+        db.execute(
+            "DELETE FROM responses WHERE created_at < ?",
+            (time.time() - settings.LLM_CACHE_TTL_DAYS * 86400,),
+        )
+        count = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - settings.LLM_CACHE_MAX_ENTRIES
+        if excess > 0:
+            db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            logger.info(f"LLM cache evicted {excess} entries")
+
+    def summary(self) -> str:
+        return f"LLM cache: {self.hits} hits, {self.misses} misses"
+
+llm_cache = LLMCache()
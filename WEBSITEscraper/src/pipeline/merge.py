@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Sequence
+
+from .models import ESGReport, EnvironmentalData, SocialData, GovernanceData
+
+MAX_MERGED_TEXT = 2000  # Characters kept per merged free-text field
+
+def _join_unique(values: Sequence[str | None], limit: int = MAX_MERGED_TEXT) -> str:
+    seen, parts, size = set(), [], 0
+    for value in values:
+        value = (value or "").strip()
+        key = value.lower()
+        if not value or key in seen or key in ("none", "n/a"):
+            continue
+        if size + len(value) > limit:
+            break
+        seen.add(key)
+        parts.append(value)
+        size += len(value)
+    return " ".join(parts)
+
+def _merge_category(categories, weights: List[int], model):
+    """
+    Length-weighted mean score. Chunks scoring 0 usually just don't cover the
+    category, so they are ignored unless every chunk scored 0.
+    """
+    scored = [(c, w) for c, w in zip(categories, weights) if c.score > 0]
+    if scored:
+        score = round(sum(c.score * w for c, w in scored) / sum(w for _, w in scored))
+    else:
+        score = 0
+
+    # Assessments of the best-covered chunks first
+    ordered = sorted(range(len(categories)), key=lambda i: (-categories[i].score * weights[i], i))
+    return model(
+        score=score,
+        assessment=_join_unique([categories[i].assessment for i in ordered]),
+        gaps=_join_unique([c.gaps for c in categories]) or None,
+    )
+
+def merge_reports(reports: List[ESGReport | None], weights: List[int], url: str) -> ESGReport | None:
+    """
+    Deterministic reduce step for chunked extraction: combines per-chunk
+    reports (in document order, weighted by chunk length) into one report.
+    """
+    pairs = [(r, w) for r, w in zip(reports, weights) if r is not None]
+    if not pairs:
+        return None
+    if len(pairs) == 1:
+        return pairs[0][0]
+
+    reports = [r for r, _ in pairs]
+    weights = [w for _, w in pairs]
+
+    # Most frequent company name; ties go to the earliest chunk
+    names = [r.company_name.strip() for r in reports if r.company_name.strip()]
+    counts = Counter(name.lower() for name in names)
+    company_name = min(names, key=lambda n: (-counts[n.lower()], names.index(n))) if names else "Unknown"
+
+    return ESGReport(
+        company_name=company_name,
+        url=url,
+        summary=_join_unique([r.summary for r in reports]),
+        environmental=_merge_category([r.environmental for r in reports], weights, EnvironmentalData),
+        social=_merge_category([r.social for r in reports], weights, SocialData),
+        governance=_merge_category([r.governance for r in reports], weights, GovernanceData),
+        timestamp=datetime.now().isoformat(),
+    )
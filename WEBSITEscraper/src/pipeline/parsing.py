@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, NamedTuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from ..core.config import settings
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # Falls back to BeautifulSoup's pure-Python parser
+    lxml = None
+
+# Elements whose text never counts as page content
+JUNK_TAGS = ["script", "style", "nav", "footer", "header", "noscript", "iframe", "svg", "template"]
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
+_HEADING_MARK = "§§H"  # Survives text extraction, never appears in real pages
+
+@dataclass
+class Section:
+    heading: str
+    level: int
+    text: str
+
+class Link(NamedTuple):
+    url: str  # Absolute, without fragment
+    text: str
+    classes: str = ""
+
+@dataclass
+class ParsedPage:
+    """Everything the pipeline needs from one HTML document, from a single parse."""
+    links: List[Link] = field(default_factory=list)
+    sections: List[Section] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """Cleaned text, headings on their own lines (what `clean_html_content` returns)."""
+        parts = []
+        for section in self.sections:
+            parts.extend(part for part in (section.heading, section.text) if part)
+        return "\n".join(parts)
+
+    def to_markdown(self) -> str:
+        """Cleaned text with Markdown headings, so section boundaries survive storage."""
+        parts = []
+        for section in self.sections:
+            if section.heading:
+                parts.append(f"{'#' * max(section.level, 1)} {section.heading}")
+            if section.text:
+                parts.append(section.text)
+        return "\n".join(parts)
+
+def clean_lines(text: str) -> List[str]:
+    # Break into lines, split multi-headlines and drop blank lines
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return [chunk for chunk in chunks if chunk]
+
+def _sections_from_marked(text: str) -> List[Section]:
+    """Splits extracted text on the heading markers inserted by the backends."""
+    sections = [Section("", 0, "")]
+    body: List[str] = []
+    for line in clean_lines(text):
+        if line.startswith(_HEADING_MARK):
+            sections[-1].text = "\n".join(body)
+            body = []
+            level = int(line[len(_HEADING_MARK)])
+            sections.append(Section(line[len(_HEADING_MARK) + 1:].strip(), level, ""))
+        else:
+            body.append(line)
+    sections[-1].text = "\n".join(body)
+    return [s for s in sections if s.text or s.heading]
+
+def _make_link(base_url: str, href: str, text: str, classes: str) -> Link | None:
+    href = href.strip()
+    if not href or href.startswith(("javascript:", "mailto:", "tel:")):
+        return None
+    url = urljoin(base_url, href) if base_url else href
+    return Link(url.split("#")[0], " ".join(text.split()), classes)
+
+class HtmlBackend:
+    """Parses HTML into a `ParsedPage`. Subclasses wrap a specific parser."""
+    name = "base"
+
+    def parse(self, html: str, base_url: str = "") -> ParsedPage:
+        raise NotImplementedError
+
+class LxmlBackend(HtmlBackend):
+    """libxml2-based parser, roughly an order of magnitude faster than html.parser."""
+    name = "lxml"
+
+    def parse(self, html: str, base_url: str = "") -> ParsedPage:
+        if not html.strip():
+            return ParsedPage()
+        try:
+            root = lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            # e.g. strings with an XML encoding declaration
+            root = lxml.html.document_fromstring(html.encode("utf-8"))
+
+        links: List[Link] = []
+        parts: List[str] = []
+        skip_depth = 0  # > 0 while inside a junk element or a heading
+
+        for event, el in etree.iterwalk(root, events=("start", "end")):
+            tag = el.tag if isinstance(el.tag, str) else None
+            if event == "start":
+                if tag == "a" and el.get("href") is not None:
+                    link = _make_link(base_url, el.get("href"), el.text_content(), el.get("class", ""))
+                    if link is not None:
+                        links.append(link)
+                if skip_depth:
+                    skip_depth += 1
+                elif tag in JUNK_TAGS:
+                    skip_depth = 1
+                elif tag in HEADING_TAGS:
+                    title = " ".join(el.text_content().split())
+                    parts.append(f"\n{_HEADING_MARK}{tag[1]} {title}\n")
+                    skip_depth = 1
+                elif tag is not None and el.text:
+                    parts.append(el.text)
+            else:
+                if skip_depth:
+                    skip_depth -= 1
+                if not skip_depth and el.tail:
+                    parts.append(el.tail)
+
+        return ParsedPage(links, _sections_from_marked("\n".join(parts)))
+
+class SoupBackend(HtmlBackend):
+    """Pure-Python fallback using BeautifulSoup's html.parser."""
+    name = "bs4"
+
+    def parse(self, html: str, base_url: str = "") -> ParsedPage:
+        soup = BeautifulSoup(html, 'html.parser')
+        links = []
+        for a in soup.find_all('a', href=True):
+            link = _make_link(base_url, a['href'], a.get_text(" "), " ".join(a.get("class", [])))
+            if link is not None:
+                links.append(link)
+
+        for script in soup(JUNK_TAGS):
+            script.extract()
+        for heading in soup.find_all(HEADING_TAGS):
+            title = heading.get_text(" ", strip=True)
+            heading.replace_with(f"\n{_HEADING_MARK}{heading.name[1]} {title}\n")
+
+        return ParsedPage(links, _sections_from_marked(soup.get_text(separator='\n')))
+
+BACKENDS = {"lxml": LxmlBackend, "bs4": SoupBackend}
+
+_backend: HtmlBackend | None = None
+
+def get_backend() -> HtmlBackend:
+    """The backend named by HTML_BACKEND ("auto" prefers lxml when installed)."""
+    global _backend
+    if _backend is None:
+        name = settings.HTML_BACKEND
+        if name == "auto":
+            name = "lxml" if lxml is not None else "bs4"
+        elif name == "lxml" and lxml is None:
+            logger.warning("HTML_BACKEND=lxml but lxml is not installed, using bs4")
+            name = "bs4"
+        _backend = BACKENDS[name]()
+    return _backend
+
+def parse_html(html: str, base_url: str = "") -> ParsedPage:
+    """Parses `html` once, returning its absolute links and cleaned, sectioned text."""
+    with metrics.span("html.parse", bytes=len(html)):
+        return get_backend().parse(html, base_url)
+
+_pool: ProcessPoolExecutor | None = None
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Process pool for HTML parsing, so large pages don't stall the event loop."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.HTML_WORKERS or os.cpu_count())
+    return _pool
+
+def shutdown_parse_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+async def parse_html_async(html: str, base_url: str = "") -> ParsedPage:
+    """`parse_html` in the parse pool (inline for tiny documents, where IPC costs more)."""
+    if len(html) < settings.HTML_INLINE_PARSE_BYTES:
+        return parse_html(html, base_url)
+    loop = asyncio.get_running_loop()
+    with metrics.span("html.parse", bytes=len(html), pool=True):
+        return await loop.run_in_executor(get_parse_pool(), parse_html, html, base_url)
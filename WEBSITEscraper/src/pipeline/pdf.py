@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+from urllib.parse import urlparse
+
+import aiohttp
+from pypdf import PdfReader
+
+from ..core.cache import http_cache
+from ..core.config import settings
+from ..core.fetcher import FetchResult, fetch_tier, save_body
+from ..core.metrics import metrics
+from ..core.network import network_manager
+from ..core.scheduler import host_scheduler
+from .pdf_cache import pdf_text_cache, sha256_file
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all PDF extractions (pypdf is pure Python and holds the GIL)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS or os.cpu_count())
+    return _pool
+
+def shutdown_pdf_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+def _count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Runs in a worker process: extracts the text of pages [start, stop)."""
+    reader = PdfReader(path)
+    texts = []
+    for page in reader.pages[start:stop]:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception as e:
+            texts.append("")
+            logger.debug(f"Failed to extract a page of {path}: {e}")
+    return texts
+
+async def download_pdf(url: str) -> tuple[Path, bool] | None:
+    """
+    Streams a PDF to disk. Returns `(path, is_temporary)`; the path points into
+    the HTTP cache when it is enabled, otherwise to a temp file the caller
+    must delete. Returns None if the document is unavailable. Waits for the
+    host's politeness slot first.
+    """
+    cached = await asyncio.to_thread(http_cache.get, url)
+    if settings.OFFLINE:
+        if cached is None:
+            logger.info(f"PDF not in cache (offline): {url}")
+            return None
+        http_cache.offline_hits += 1
+        return cached.path, False
+
+    await host_scheduler.acquire(url)
+    session = await fetch_tier.get_session()
+    headers = {"User-Agent": network_manager.get_random_user_agent()}
+    headers.update(http_cache.conditional_headers(cached))
+
+    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=settings.PDF_DOWNLOAD_TIMEOUT)) as response:
+        if response.status == 304 and cached is not None:
+            logger.info(f"PDF not modified, using cached copy: {url}")
+            await asyncio.to_thread(http_cache.touch, cached, response.headers)
+            return cached.path, False
+        response.raise_for_status()
+        tmp_name = await save_body(response, settings.PDF_MAX_BYTES, ".pdf")
+        if tmp_name is None:
+            logger.warning(f"PDF larger than {settings.PDF_MAX_BYTES} bytes, skipped: {url}")
+            return None
+
+    logger.info(f"Downloaded PDF ({os.path.getsize(tmp_name) / 1_000_000:.1f} MB): {url}")
+    entry = await asyncio.to_thread(http_cache.put_file, url, tmp_name, response.headers, "application/pdf")
+    if entry is not None:
+        return entry.path, False
+    return Path(tmp_name), True
+
+def is_pdf_url(url: str) -> bool:
+    return urlparse(url).path.lower().endswith(".pdf")
+
+async def fetch_pdf(url: str) -> FetchResult:
+    """
+    `download_pdf` as a crawl fetch, for PDFs the HTTP tier didn't get: a
+    browser would start a download instead of rendering them. HTTP errors
+    become the result's status, so they are retried or skipped like pages.
+    """
+    try:
+        downloaded = await download_pdf(url)
+    except aiohttp.ClientResponseError as e:
+        return FetchResult(url, e.status, "", "application/pdf")
+    if downloaded is None:
+        return FetchResult(url, 200, "", "application/pdf")  # Over PDF_MAX_BYTES
+    path, temporary = downloaded
+    return FetchResult(url, 200, "", "application/pdf", path=path, temporary=temporary)
+
+def _missing_ranges(missing: List[int], step: int) -> List[tuple[int, int]]:
+    """Groups sorted page numbers into contiguous [start, stop) ranges of at most `step` pages."""
+    ranges = []
+    for page in missing:
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < step:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+async def extract_pdf_text(path: str | Path, max_pages: int | None = None) -> str:
+    """
+    Extracts up to `max_pages` pages of text, fanning page ranges out over the
+    PDF process pool so large reports don't block the event loop. Pages already
+    in the content-addressed text cache are not parsed again.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pdf_pool()
+    path = str(path)
+    max_pages = max_pages or settings.PDF_MAX_PAGES
+
+    # Hashing and the SQLite cache are blocking I/O; keep them off the event loop
+    digest = await asyncio.to_thread(sha256_file, path)
+    total_pages = await asyncio.to_thread(pdf_text_cache.get_page_count, digest)
+    if total_pages is None:
+        total_pages = await loop.run_in_executor(pool, _count_pages, path)
+        await asyncio.to_thread(pdf_text_cache.set_page_count, digest, total_pages)
+
+    page_count = min(total_pages, max_pages)
+    texts = await asyncio.to_thread(pdf_text_cache.get_pages, digest, range(page_count))
+    missing = [page for page in range(page_count) if page not in texts]
+
+    if missing:
+        ranges = _missing_ranges(missing, max(1, settings.PDF_PAGES_PER_TASK))
+        parts = await asyncio.gather(*[
+            loop.run_in_executor(pool, _extract_page_range, path, start, stop)
+            for start, stop in ranges
+        ])
+        extracted = {
+            start + offset: text
+            for (start, _), part in zip(ranges, parts)
+            for offset, text in enumerate(part)
+        }
+        await asyncio.to_thread(pdf_text_cache.put_pages, digest, extracted)
+        texts.update(extracted)
+    else:
+        logger.info(f"PDF text served from cache ({page_count} pages, sha256 {digest[:12]})")
+
+    return "\n".join(texts[page] for page in range(page_count)) + "\n"
+
+async def get_pdf_text(url: str, max_pages: int | None = None,
+                       downloaded: tuple[Path, bool] | None = None) -> str:
+    """
+    Downloads a PDF (streamed to disk) and extracts its text. A body the
+    fetch tier already saved is passed as `downloaded`, `(path, is_temporary)`
+    like `download_pdf` returns, and is not fetched again.
+    """
+    try:
+        if downloaded is None:
+            with metrics.span("pdf.download", url=url):
+                downloaded = await download_pdf(url)
+        if downloaded is None:
+            return ""
+        path, is_temporary = downloaded
+        try:
+            with metrics.span("pdf.extract", url=url):
+                text = await extract_pdf_text(path, max_pages)
+        finally:
+            if is_temporary:
+                os.unlink(path)
+        logger.info(f"Extracted {len(text)} chars from PDF: {url}")
+        return text
+    except Exception as e:
+        logger.error(f"Error reading PDF {url}: {e}")
+        return ""
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def sha256_file(path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PdfTextCache:
+    """
+    Content-addressed cache of extracted PDF text.
+
+    Documents are identified by the SHA-256 of their bytes, so the same report
+    linked from many URLs or sites is parsed once. Text is stored per page, so a
+    document first extracted with a low page cap can be extended later without
+    re-parsing the pages already seen.
+    """
+    def __init__(self, path: str | None = None):
+        self._path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.page_hits = 0
+        self.page_misses = 0
+
+    def configure(self, path: str):
+        self.close()
+        self._path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            path = Path(self._path or settings.PDF_TEXT_CACHE_PATH)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS documents (sha256 TEXT PRIMARY KEY, page_count INTEGER)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " sha256 TEXT, page INTEGER, text BLOB, PRIMARY KEY (sha256, page))"
+            )
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_page_count(self, sha256: str) -> int | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT page_count FROM documents WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, sha256: str, page_count: int):
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?)", (sha256, page_count)
+            )
+
+    def get_pages(self, sha256: str, pages: Iterable[int]) -> Dict[int, str]:
+        """Returns the cached text of the requested pages that are present."""
+        wanted = set(pages)
+        if not wanted:
+            return {}
+        # Only the requested span is read (the primary key index covers it), not the whole document
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT page, text FROM pages WHERE sha256 = ? AND page BETWEEN ? AND ?",
+                (sha256, min(wanted), max(wanted)),
+            ).fetchall()
+        found = {page: zlib.decompress(text).decode("utf-8") for page, text in rows if page in wanted}
+        with self._lock:
+            self.page_hits += len(found)
+            self.page_misses += len(wanted) - len(found)
+        return found
+
+    def put_pages(self, sha256: str, texts: Dict[int, str]):
+        rows = [(sha256, page, zlib.compress(text.encode("utf-8"))) for page, text in texts.items()]
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", rows)
+            db.execute("COMMIT")
+
+    def summary(self) -> str:
+        return f"PDF text cache: {self.page_hits} pages reused, {self.page_misses} pages parsed"
+
+pdf_text_cache = PdfTextCache()
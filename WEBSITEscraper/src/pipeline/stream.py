@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Tuple, TypeVar
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+async def map_concurrent(source: AsyncIterator[T], func: Callable[[T], Awaitable[R]],
+                         concurrency: int, maxsize: int | None = None) -> AsyncIterator[Tuple[T, R]]:
+    """
+    Pipeline stage: applies `func` to the items of `source` with `concurrency`
+    workers and yields `(item, result)` pairs in completion order.
+
+    Input and output are bounded queues of `maxsize` items, so a slow consumer
+    stalls the workers and, through them, the source. Items whose `func`
+    raised are logged and skipped.
+    """
+    maxsize = maxsize or settings.PIPELINE_QUEUE_SIZE
+    inbox: asyncio.Queue = asyncio.Queue(maxsize)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize)
+    failures = []
+
+    async def feed():
+        try:
+            async for item in source:
+                await inbox.put(item)
+        except Exception as e:
+            failures.append(e)
+        for _ in range(concurrency):
+            await inbox.put(_DONE)
+
+    async def work():
+        while (item := await inbox.get()) is not _DONE:
+            try:
+                result = await func(item)
+            except Exception as e:
+                logger.error(f"Pipeline stage {getattr(func, '__name__', func)} failed: {e}")
+                continue
+            await outbox.put((item, result))
+        await outbox.put(_DONE)
+
+    tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < concurrency:
+            output = await outbox.get()
+            if output is _DONE:
+                finished += 1
+            else:
+                yield output
+        if failures:
+            raise failures[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if hasattr(source, "aclose"):
+            await source.aclose()
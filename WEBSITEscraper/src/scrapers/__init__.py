@@ -0,0 +1,4 @@
+from .base import SOURCES, Source, SourceDocument, register_source
+from .runner import create_sources, run_sources
+# Importing the plugins registers them
+from . import efrag_scraper, eurlex_scraper, finance_ec_scraper
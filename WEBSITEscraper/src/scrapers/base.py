@@ -0,0 +1,147 @@
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Tuple, Type
+
+from playwright.async_api import BrowserContext
+
+from src.core.browser import PagePool
+from src.core.config import settings
+from src.core.fetcher import fetch_tier
+from src.pipeline.parsing import Link, ParsedPage, parse_html_async
+from src.pipeline.stream import map_concurrent
+from src.utils import get_pdf_text
+
+logger = logging.getLogger(__name__)
+
+# Where sources get browser pages: a shared pool, or a bare context (what the
+# scrape_* functions took before pooling), which opens a temporary page per fetch
+Pages = PagePool | BrowserContext
+
+@dataclass
+class SourceDocument:
+    """One page or PDF fetched from a regulatory source."""
+    source: str  # Name of the source plugin
+    url: str
+    title: str
+    kind: str  # "page" or "pdf"
+    text: str
+    parent: str | None = None  # Page that linked to it
+    fetched_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def page_title(page: ParsedPage, url: str) -> str:
+    """First heading of a parsed page, or its URL."""
+    return next((section.heading for section in page.sections if section.heading), url)
+
+def join_documents(documents: List[SourceDocument]) -> str:
+    """The documents as one text, as the original per-source scrapers returned them."""
+    return "".join(f"\n--- {doc.kind.upper()}: {doc.title} ({doc.url}) ---\n{doc.text}\n" for doc in documents)
+
+class Source:
+    """
+    A regulatory source plugin.
+
+    The runner fetches `entry_url()`, keeps it as a document (see
+    `start_document`), then fetches the sub-links picked by `select_links`,
+    up to `concurrency` at a time and `max_pages` in total, start page
+    included. Subclasses set the class attributes and override the hooks.
+
+    Limits default to SOURCE_CONCURRENCY / SOURCE_MAX_PAGES and can be set per
+    source in SOURCE_LIMITS.
+    """
+    name = "base"
+    start_url = ""
+    domain = ""  # Sub-links must be on this site
+    keywords: Tuple[str, ...] = ()  # Sub-links must mention one in their anchor text
+    fallback_url: str | None = None  # Fetched instead when no sub-link matches
+
+    def __init__(self, start_url: str | None = None, concurrency: int | None = None, max_pages: int | None = None):
+        limits = settings.SOURCE_LIMITS.get(self.name, {})
+        self.start_url = start_url or self.start_url
+        self.concurrency = max(1, concurrency or limits.get("concurrency") or settings.SOURCE_CONCURRENCY)
+        self.max_pages = max(1, max_pages or limits.get("max_pages") or settings.SOURCE_MAX_PAGES)
+        self.pages_fetched = 0
+        self.documents_emitted = 0
+        self.elapsed = 0.0
+
+    def entry_url(self) -> str:
+        return self.start_url
+
+    def start_document(self, url: str, page: ParsedPage) -> SourceDocument | None:
+        """Document for the entry page itself (None leaves it out)."""
+        return SourceDocument(self.name, url, page_title(page, url), "page", page.text)
+
+    def select_links(self, page: ParsedPage) -> List[Link]:
+        """Sub-links to follow, in page order and without duplicates."""
+        seen = set()
+        links = []
+        for link in page.links:
+            text = link.text.lower()
+            if link.url not in seen and self.domain in link.url and any(k in text for k in self.keywords):
+                seen.add(link.url)
+                links.append(link)
+        return links
+
+    async def fetch_page(self, url: str, pool: Pages) -> ParsedPage | None:
+        if isinstance(pool, PagePool):
+            result = await fetch_tier.fetch(url, pool=pool)
+        else:
+            result = await fetch_tier.fetch(url, context=pool)
+        if result is None or result.status >= 400:
+            logger.warning(f"[{self.name}] Could not fetch {url}")
+            return None
+        if result.temporary:
+            os.unlink(result.path)  # A PDF behind a link without the .pdf suffix; only its page is parsed
+        return await parse_html_async(result.content, result.url)
+
+    async def fetch_document(self, link: Link, parent: str, pool: Pages) -> SourceDocument | None:
+        if link.url.lower().endswith(".pdf"):
+            text = await get_pdf_text(link.url)
+            return SourceDocument(self.name, link.url, link.text or link.url, "pdf", text, parent)
+        page = await self.fetch_page(link.url, pool)
+        if page is None:
+            return None
+        return SourceDocument(self.name, link.url, link.text or page_title(page, link.url), "page", page.text, parent)
+
+    async def documents(self, pool: Pages) -> AsyncIterator[SourceDocument]:
+        """Streams the source's documents as they are fetched."""
+        entry = self.entry_url()
+        page = await self.fetch_page(entry, pool)
+        self.pages_fetched = 1
+        if page is None:
+            return
+        document = self.start_document(entry, page)
+        if document is not None:
+            self.documents_emitted += 1
+            yield document
+
+        links = self.select_links(page)
+        if not links and self.fallback_url:
+            logger.info(f"[{self.name}] No matching links on {entry}, using {self.fallback_url}")
+            links = [Link(self.fallback_url, "")]
+        links = links[:self.max_pages - 1]
+        logger.info(f"[{self.name}] Fetching {len(links)} sub-pages, {self.concurrency} at a time")
+
+        async def pending():
+            for link in links:
+                yield link
+
+        async def fetch(link: Link) -> SourceDocument | None:
+            return await self.fetch_document(link, entry, pool)
+
+        async for _, document in map_concurrent(pending(), fetch, self.concurrency):
+            self.pages_fetched += 1
+            if document is not None:
+                self.documents_emitted += 1
+                yield document
+
+SOURCES: Dict[str, Type[Source]] = {}
+
+def register_source(cls: Type[Source]) -> Type[Source]:
+    """Class decorator that makes a source available to the runner and the CLI."""
+    SOURCES[cls.name] = cls
+    return cls
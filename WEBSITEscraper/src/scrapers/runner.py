@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import AsyncIterator, List
+
+from src.core.browser import PagePool
+from src.core.config import settings
+from src.scrapers.base import SOURCES, Source, SourceDocument
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+def create_sources(names: List[str] | None = None) -> List[Source]:
+    """Instances of the named sources (all registered sources by default)."""
+    names = names or list(SOURCES)
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown source(s): {', '.join(unknown)} (available: {', '.join(SOURCES)})")
+    return [SOURCES[name]() for name in names]
+
+async def run_sources(sources: List[Source], pool: PagePool) -> AsyncIterator[SourceDocument]:
+    """
+    Runs all `sources` at once over one shared page pool and yields their
+    documents as they arrive, so a refresh takes about as long as the slowest
+    source. A failing source is logged and doesn't stop the others.
+    """
+    queue: asyncio.Queue = asyncio.Queue(settings.PIPELINE_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+
+    async def drain(source: Source):
+        started = loop.time()
+        try:
+            async for document in source.documents(pool):
+                await queue.put(document)
+        except Exception as e:
+            logger.error(f"Source {source.name} failed: {e}")
+        source.elapsed = loop.time() - started
+        await queue.put(_DONE)
+
+    tasks = [asyncio.create_task(drain(source)) for source in sources]
+    try:
+        finished = 0
+        while finished < len(tasks):
+            item = await queue.get()
+            if item is _DONE:
+                finished += 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,69 @@
+import pytest
+from aiohttp import web
+
+from src.core.cache import http_cache
+from src.core.config import settings
+from src.core.fetcher import fetch_tier
+from src.core.scheduler import host_scheduler
+from src.pipeline.llm_cache import llm_cache
+from src.pipeline.pdf_cache import pdf_text_cache
+
+@pytest.fixture(autouse=True)
+def offline_settings(tmp_path, monkeypatch):
+    """Keeps every on-disk cache in a temp directory and turns off politeness delays."""
+    for name, value in {
+        "HTTP_CACHE_DIR": str(tmp_path / "http"),
+        "PDF_TEXT_CACHE_PATH": str(tmp_path / "pdf_text.db"),
+        "LLM_CACHE_PATH": str(tmp_path / "llm.db"),
+        "CHECKPOINT_PATH": str(tmp_path / "crawls.db"),
+        "SITEMAP_STATE_PATH": str(tmp_path / "recrawl.db"),
+        "PAGE_STORE_SPILL_DIR": str(tmp_path),
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(host_scheduler, "rate", 1000.0)
+    monkeypatch.setattr(host_scheduler, "burst", 100)
+    monkeypatch.setattr(host_scheduler, "jitter", 0.0)
+    monkeypatch.setattr(host_scheduler, "respect_crawl_delay", False)
+    monkeypatch.setattr(fetch_tier, "host_modes", {})
+    host_scheduler.reset()
+    yield
+    host_scheduler.reset()
+    for cache in (http_cache, pdf_text_cache, llm_cache):
+        cache.close()
+
+@pytest.fixture
+def serve():
+    """
+    Starts a local site from `{path: (body, content_type)}`, or from a
+    handler taking the request. Returns `(runner, base_url, hits)`; `hits`
+    lists the requested paths in order.
+    """
+    async def start(routes):
+        hits = []
+
+        async def handle(request: web.Request) -> web.StreamResponse:
+            hits.append(request.path)
+            if callable(routes):
+                return await routes(request)
+            if request.path not in routes:
+                return web.Response(status=404, text="Not found")
+            body, content_type = routes[request.path]
+            return web.Response(body=body, content_type=content_type)
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        return runner, f"http://127.0.0.1:{runner.addresses[0][1]}", hits
+
+    return start
+
+@pytest.fixture
+def make_page():
+    """Builds an HTML page with enough text to be fetched over plain HTTP."""
+    return page
+
+def page(title: str, links=(), words: int = 60) -> str:
+    anchors = "".join(f'<a href="{href}">Sustainability report {href}</a>' for href in links)
+    return f"<html><body><h1>{title}</h1><p>{'Scope 1 emissions and governance. ' * words}</p>{anchors}</body></html>"
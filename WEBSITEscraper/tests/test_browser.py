@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from src.core.browser import PagePool
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+class FakeContext:
+    async def close(self):
+        pass
+
+class FakeBrowserManager:
+    """Stands in for `BrowserManager`, handing out fake contexts and pages."""
+    async def get_new_context(self, blocker=None):
+        return FakeContext()
+
+    async def get_new_page(self, context):
+        return FakePage()
+
+def test_close_wakes_workers_waiting_for_a_page():
+    async def scenario():
+        pool = PagePool(FakeBrowserManager(), size=1)
+        await pool.start()
+        borrowed = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)  # The pool is exhausted; the waiter blocks
+        assert not waiter.done()
+        await pool.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(waiter, timeout=5)
+        await pool.release(borrowed)
+        return borrowed
+
+    assert asyncio.run(scenario()).closed
@@ -0,0 +1,45 @@
+from src.core.cache import HttpCache, normalize_url
+from src.pipeline.pdf_cache import PdfTextCache
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com:443/a?b=2&a=1#frag") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+def test_put_get_and_validators(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=1_000_000)
+    cache.put("https://example.com/a", b"<html>a</html>", {"ETag": '"v1"'}, "text/html")
+    entry = cache.get("https://EXAMPLE.com/a#top")
+    assert entry.read_text() == "<html>a</html>"
+    assert HttpCache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+    assert cache.get("https://example.com/missing") is None
+    cache.close()
+
+def test_evicts_least_recently_used_and_tracks_size(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=250)
+    for name in "abc":
+        cache.put(f"https://example.com/{name}", b"x" * 100)
+        cache.get("https://example.com/a")  # Keep "a" recently used
+    assert cache.get("https://example.com/a") is not None
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/c") is not None
+    assert cache._total == 200
+
+    # Replacing an entry counts its new size only
+    cache.put("https://example.com/c", b"x" * 50)
+    assert cache._total == 150
+
+    # The running total survives a reconnect
+    cache.close()
+    cache._connect()
+    assert cache._total == 150
+    cache.close()
+
+def test_pdf_text_cache_returns_only_requested_pages(tmp_path):
+    cache = PdfTextCache(str(tmp_path / "pdf_text.db"))
+    cache.put_pages("abc", {page: f"page {page}" for page in range(10)})
+    cache.put_pages("other", {3: "other document"})
+    assert cache.get_pages("abc", range(3, 5)) == {3: "page 3", 4: "page 4"}
+    assert cache.get_pages("abc", [2, 8, 12]) == {2: "page 2", 8: "page 8"}
+    assert cache.get_pages("abc", []) == {}
+    assert (cache.page_hits, cache.page_misses) == (4, 1)
+    cache.close()
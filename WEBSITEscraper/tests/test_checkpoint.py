@@ -0,0 +1,57 @@
+import asyncio
+
+from src.core.fetcher import fetch_tier
+from src.engine.checkpoint import CrawlCheckpoint
+from src.engine.crawler import Crawler
+
+def test_buffered_writes_survive_reopening(tmp_path):
+    async def scenario():
+        checkpoint = CrawlCheckpoint("crawl-1", str(tmp_path / "crawls.db"))
+        checkpoint.start("https://example.com/", 2, 0)
+        checkpoint.enqueued("https://example.com/", 0, 1.0)
+        checkpoint.enqueued("https://example.com/a", 1, 0.5)
+        checkpoint.enqueued("https://example.com/b", 1, 0.2)
+        checkpoint.done("https://example.com/", "# Home\nText", "text/html", 0)
+        checkpoint.done("https://example.com/b")  # Skipped page, nothing stored
+        await checkpoint.flush()
+        checkpoint.close()
+
+    asyncio.run(scenario())
+    reopened = CrawlCheckpoint("crawl-1", str(tmp_path / "crawls.db"))
+    assert reopened.info().start_url == "https://example.com/"
+    assert sorted(reopened.visited()) == ["https://example.com/", "https://example.com/a", "https://example.com/b"]
+    assert reopened.queued() == [("https://example.com/a", 1, 0.5)]
+    assert list(reopened.completed_pages()) == [("https://example.com/", "# Home\nText", "text/html", 0)]
+    assert reopened.completed_count() == 2
+    assert CrawlCheckpoint("other", str(tmp_path / "crawls.db")).info() is None
+    reopened.close()
+
+def test_resumed_crawl_fetches_each_page_once(serve, make_page):
+    routes = {"/": (make_page("Home", [f"/p{i}" for i in range(6)]), "text/html")}
+    routes.update({f"/p{i}": (make_page(f"Page {i}"), "text/html") for i in range(6)})
+
+    async def crawl(base: str, max_pages: int) -> list:
+        checkpoint = CrawlCheckpoint("crawl-1")
+        checkpoint.start(base + "/", 2, max_pages)
+        crawler = Crawler(None, concurrency=2, max_pages=max_pages, checkpoint=checkpoint)
+        try:
+            return [record.url for record in await crawler.crawl(base + "/")]
+        finally:
+            checkpoint.close()
+            crawler.store.close()
+
+    async def scenario():
+        runner, base, hits = await serve(routes)
+        try:
+            first = await crawl(base, max_pages=3)
+            resumed = await crawl(base, max_pages=0)
+        finally:
+            await fetch_tier.close()
+            await runner.cleanup()
+        return base, first, resumed, hits
+
+    base, first, resumed, hits = asyncio.run(scenario())
+    assert len(first) == 3
+    assert resumed[:3] == first  # Replayed from the checkpoint
+    assert sorted(resumed) == sorted(base + path for path in routes)
+    assert sorted(hits) == sorted(routes)
@@ -0,0 +1,65 @@
+from src.pipeline.chunking import chunk_document, chunk_sections, estimate_tokens, text_to_sections
+from src.pipeline.merge import merge_reports
+from src.pipeline.models import ESGReport, EnvironmentalData, GovernanceData, SocialData
+from src.pipeline.parsing import Section
+
+def report(name: str, scores: tuple, summary: str = "Summary.") -> ESGReport:
+    e, s, g = scores
+    return ESGReport(
+        company_name=name, url="https://example.com", summary=summary,
+        environmental=EnvironmentalData(score=e, assessment=f"Environment {e}."),
+        social=SocialData(score=s, assessment=f"Social {s}.", gaps="No human rights policy."),
+        governance=GovernanceData(score=g, assessment=f"Governance {g}."),
+        timestamp="2024-01-01T00:00:00",
+    )
+
+def test_text_sections_from_markdown_and_pdf_headings():
+    text = "Intro line\n# Climate\nScope 1 fell.\n2.1 Water use\nWithdrawal fell.\nSOCIAL MATTERS\nTurnover rose."
+    sections = text_to_sections(text)
+    assert [(s.heading, s.text) for s in sections] == [
+        ("", "Intro line"),
+        ("Climate", "Scope 1 fell."),
+        ("2.1 Water use", "Withdrawal fell."),
+        ("SOCIAL MATTERS", "Turnover rose."),
+    ]
+
+def test_chunks_respect_budget_and_keep_sections_whole():
+    sections = [Section(f"Heading {i}", 2, "x" * 400) for i in range(10)]
+    chunks = chunk_sections(sections, max_tokens=250)
+    assert len(chunks) == 5
+    assert all(estimate_tokens(chunk) <= 250 for chunk in chunks)
+    assert all(chunk.count("Heading") == 2 for chunk in chunks)
+    assert "".join(chunks).count("x") == 4000
+
+def test_oversized_sections_are_split_on_lines():
+    section = Section("Report", 1, "\n".join(["y" * 200] * 10) + "\n" + "z" * 2000)
+    chunks = chunk_sections([section], max_tokens=120)
+    assert all(estimate_tokens(chunk) <= 130 for chunk in chunks)  # Heading line on top of the budget
+    assert all(chunk.startswith("Report\n") for chunk in chunks)
+    assert "".join(chunks).count("y") == 2000
+    assert "".join(chunks).count("z") == 2000
+
+def test_html_document_splits_on_headings():
+    html = "<html><body>" + "".join(f"<h2>Topic {i}</h2><p>{'word ' * 300}</p>" for i in range(4)) + "</body></html>"
+    chunks = chunk_document(html, is_html=True, max_tokens=400)
+    assert len(chunks) == 4
+    assert [chunk.splitlines()[0] for chunk in chunks] == [f"Topic {i}" for i in range(4)]
+
+def test_merge_weights_scores_and_ignores_zero_and_missing_chunks():
+    merged = merge_reports(
+        [report("Acme AG", (80, 0, 50)), None, report("ACME AG", (20, 0, 50)), report("Other", (0, 0, 50))],
+        [3, 5, 1, 1], "https://example.com/report",
+    )
+    assert merged.company_name == "Acme AG"
+    assert merged.url == "https://example.com/report"
+    assert merged.environmental.score == 65  # (80 * 3 + 20 * 1) / 4
+    assert merged.social.score == 0
+    assert merged.governance.score == 50
+    assert merged.environmental.assessment == "Environment 80. Environment 20. Environment 0."
+    assert merged.social.gaps == "No human rights policy."
+    assert merged.summary == "Summary."
+
+def test_merge_of_one_report_returns_it():
+    single = report("Acme AG", (10, 20, 30))
+    assert merge_reports([None, single], [1, 1], "https://example.com") is single
+    assert merge_reports([None], [1], "https://example.com") is None
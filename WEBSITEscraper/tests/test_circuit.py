@@ -0,0 +1,106 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import scheduler as scheduler_module
+from src.core.config import settings
+from src.core.scheduler import HostScheduler, LatencyEstimator
+
+URL = "https://slow.example/report"
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the scheduler's monotonic clock with one the test advances."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+@pytest.fixture
+def breaker(monkeypatch):
+    for name, value in {
+        "CIRCUIT_BREAKER_THRESHOLD": 3,
+        "CIRCUIT_BREAKER_COOLDOWN": 10.0,
+        "CIRCUIT_BREAKER_MAX_COOLDOWN": 25.0,
+        "CIRCUIT_BREAKER_MAX_TRIPS": 3,
+        "ADAPTIVE_TIMEOUTS": True,
+        "ADAPTIVE_TIMEOUT_MIN": 5.0,
+        "ADAPTIVE_TIMEOUT_SAMPLES": 2,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return HostScheduler(rate=100, burst=10)
+
+def test_estimator_follows_rfc_6298():
+    estimator = LatencyEstimator()
+    estimator.add(1.0)
+    # First sample: SRTT = R, RTTVAR = R/2
+    assert (estimator.srtt, estimator.rttvar, estimator.timeout) == (1.0, 0.5, 3.0)
+    estimator.add(2.0)
+    # RTTVAR = 3/4 RTTVAR + 1/4 |SRTT - R|, then SRTT = 7/8 SRTT + 1/8 R
+    assert estimator.rttvar == pytest.approx(0.625)
+    assert estimator.srtt == pytest.approx(1.125)
+    assert estimator.timeout == pytest.approx(1.125 + 4 * 0.625)
+
+def test_adaptive_timeout_floor_ceiling_and_backoff(breaker):
+    assert breaker.timeout(URL, "http", 20.0) == 20.0  # Too few samples yet
+    breaker.record_success(URL, "http", 0.1)
+    breaker.record_success(URL, "http", 0.1)
+    assert breaker.timeout(URL, "http", 20.0) == 5.0  # Never below ADAPTIVE_TIMEOUT_MIN
+    assert breaker.timeout(URL, "browser", 60.0) == 60.0  # Tiers are estimated separately
+
+    breaker.record_failure(URL, timed_out=True)
+    assert breaker.timeout(URL, "http", 20.0) == 10.0
+    breaker.record_failure(URL, timed_out=True)
+    breaker.record_failure(URL, timed_out=True)
+    assert breaker.timeout(URL, "http", 20.0) == 20.0  # Backoff is capped by the ceiling
+    breaker.record_success(URL, "http", 0.1)
+    assert breaker.timeout(URL, "http", 20.0) == 5.0
+
+def test_circuit_opens_at_threshold_and_backs_off(breaker, clock):
+    breaker.record_failure(URL)
+    breaker.record_failure(URL)
+    assert breaker.circuit_wait(URL) == 0.0
+    breaker.record_failure(URL)
+    assert breaker.circuit_open(URL)
+    assert breaker.circuit_wait(URL) == 10.0
+    assert breaker.circuit_wait("https://other.example/") == 0.0
+
+    clock.value += 10
+    assert breaker.circuit_wait(URL) == 0.0  # Half-open: this request is the probe
+    assert 0 < breaker.circuit_wait(URL) <= settings.ADAPTIVE_TIMEOUT_MIN  # Others wait for its outcome
+
+    breaker.record_failure(URL)  # The probe failed
+    assert breaker.circuit_wait(URL) == 20.0
+    clock.value += 20
+    assert breaker.circuit_wait(URL) == 0.0
+    breaker.record_failure(URL)
+    assert breaker.circuit_wait(URL) == 25.0  # CIRCUIT_BREAKER_MAX_COOLDOWN
+
+    clock.value += 25
+    assert breaker.circuit_wait(URL) == 0.0
+    breaker.record_failure(URL)  # Fourth trip, over CIRCUIT_BREAKER_MAX_TRIPS
+    assert breaker.circuit_wait(URL) == math.inf
+    assert breaker.report()["slow.example"].circuit_trips == 4
+
+def test_successful_probe_closes_the_circuit(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure(URL)
+    clock.value += 10
+    assert breaker.circuit_wait(URL) == 0.0
+    breaker.record_success(URL, "http", 0.5)
+    assert not breaker.circuit_open(URL)
+    assert breaker.circuit_wait(URL) == 0.0
+
+    # Trips were reset, so the next trip starts over at the base cooldown
+    for _ in range(3):
+        breaker.record_failure(URL)
+    assert breaker.circuit_wait(URL) == 10.0
+
+def test_lost_probe_lets_another_through(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure(URL)
+    clock.value += 10
+    assert breaker.circuit_wait(URL) == 0.0
+    # Never reports back; after both tiers' timeouts a new probe is allowed
+    clock.value += settings.HTTP_TIMEOUT + settings.REQUEST_TIMEOUT / 1000
+    assert breaker.circuit_wait(URL) == 0.0
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import random
+
+from src.pipeline.dedupe import ClusterFallback, NearDuplicateIndex, hamming_distance, simhash
+from src.pipeline.parsing import shutdown_parse_pool
+
+def reference_simhash(text: str) -> int:
+    """The textbook bit-by-bit SimHash `simhash` must agree with."""
+    words = text.lower().split()
+    shingles = [" ".join(words[i:i + 3]) for i in range(len(words) - 2)] or [" ".join(words)]
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def article(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+def test_matches_reference():
+    for text in ["", "one", "two words", article(1, 3), article(2), article(3, 5000)]:
+        assert simhash(text) == reference_simhash(text)
+
+def test_near_duplicates_are_close_and_others_far():
+    text = article(1)
+    edited = text.replace("word1 ", "word2 ", 1) + " cookie banner"
+    assert hamming_distance(simhash(text), simhash(text.upper())) == 0
+    assert hamming_distance(simhash(text), simhash(edited)) <= 3
+    assert hamming_distance(simhash(text), simhash(article(2))) > 10
+
+def test_index_clusters_duplicates():
+    index = NearDuplicateIndex(max_distance=3)
+    text = article(1)
+    assert index.add(text, "https://example.com/en") is None
+    assert index.add(text.replace("word1 ", "word2 ", 1), "https://example.com/en?print=1") == "https://example.com/en"
+    assert index.add(article(2), "https://example.com/other") is None
+    assert index.clusters == {"https://example.com/en": ["https://example.com/en?print=1"], "https://example.com/other": []}
+    assert index.duplicates == 1
+
+def test_add_async_fingerprints_long_texts_in_pool():
+    index = NearDuplicateIndex(max_distance=3)
+    text = article(4, 20_000)
+
+    async def scenario():
+        return [await index.add_async(text, "https://example.com/a"), await index.add_async(text, "https://example.com/b")]
+
+    try:
+        assert asyncio.run(scenario()) == [None, "https://example.com/a"]
+    finally:
+        shutdown_parse_pool()
+
+def test_failed_extraction_falls_back_to_the_next_duplicate():
+    released = []
+    fallback = ClusterFallback(released.append)
+    fallback.started("a")
+    assert not fallback.duplicate("a", "a?print=1")  # Waits while "a" is extracted
+    assert not fallback.duplicate("a", "a?lang=en")
+    assert fallback.finished("a", extracted=False) == "a?print=1"
+    assert fallback.finished("a", extracted=True) is None
+    assert released == ["a?lang=en"]
+    assert not fallback.duplicate("a", "a?ref=1")  # Cluster done: released right away
+    assert released == ["a?lang=en", "a?ref=1"]
+
+    fallback.started("b")
+    assert fallback.finished("b", extracted=False) is None
+    assert fallback.duplicate("b", "b?print=1")  # Nothing was waiting; the next one is extracted
+    assert not fallback.duplicate("b", "b?lang=en")
+    assert fallback.finished("b", extracted=False) == "b?lang=en"
+    assert fallback.fallbacks == 3
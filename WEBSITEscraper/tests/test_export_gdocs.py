@@ -0,0 +1,104 @@
+from collections import Counter
+
+from src.pipeline import export_gdocs
+from src.pipeline.export_gdocs import GDocsExporter
+from src.pipeline.models import ESGReport, EnvironmentalData, GovernanceData, SocialData
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+class FakeDocs:
+    """Stands in for the Docs v1 client, recording every request."""
+    def __init__(self, calls: Counter):
+        self.calls = calls
+        self.inserted = []
+
+    def documents(self):
+        return self
+
+    def create(self, body):
+        self.calls["docs.create"] += 1
+        return Call({"documentId": "new-doc"})
+
+    def batchUpdate(self, documentId, body):
+        self.calls["docs.batchUpdate"] += 1
+        self.inserted.append((documentId, body["requests"]))
+        return Call({})
+
+class FakeDrive:
+    """Stands in for the Drive v3 client."""
+    def __init__(self, calls: Counter, files=()):
+        self.calls = calls
+        self.files_found = list(files)
+
+    def files(self):
+        return self
+
+    def list(self, q, fields):
+        self.calls["drive.list"] += 1
+        return Call({"files": self.files_found})
+
+def report(name: str) -> ESGReport:
+    return ESGReport(
+        company_name=name, url=f"https://{name.lower()}.example", summary="Summary.",
+        environmental=EnvironmentalData(score=50, assessment="Environment."),
+        social=SocialData(score=50, assessment="Social."),
+        governance=GovernanceData(score=50, assessment="Governance."),
+        timestamp="2024-01-01T00:00:00",
+    )
+
+def test_credentials_and_clients_are_built_once(monkeypatch):
+    calls = Counter()
+    docs, drive = FakeDocs(calls), FakeDrive(calls, files=[{"id": "existing", "name": "ESG"}])
+
+    def get_credentials():
+        calls["credentials"] += 1
+        return object()
+
+    def build(service, version, credentials):
+        calls[f"build.{service}"] += 1
+        return docs if service == "docs" else drive
+
+    monkeypatch.setattr(export_gdocs, "get_credentials", get_credentials)
+    monkeypatch.setattr(export_gdocs, "build", build)
+    exporter = GDocsExporter("ESG", batch_size=2)
+    for i in range(5):
+        exporter.add(report(f"Company{i}"))
+    exporter.flush()
+
+    assert calls == Counter({
+        "credentials": 1, "build.docs": 1, "build.drive": 1, "drive.list": 1, "docs.batchUpdate": 3,
+    })
+    assert {document_id for document_id, _ in docs.inserted} == {"existing"}
+
+def test_buffered_reports_are_written_in_one_batch_update():
+    calls = Counter()
+    docs = FakeDocs(calls)
+    exporter = GDocsExporter("ESG", batch_size=0, docs_service=docs, drive_service=FakeDrive(calls))
+    for name in ("Alpha", "Beta", "Gamma"):
+        assert exporter.add(report(name)) is None
+    assert calls["docs.batchUpdate"] == 0
+
+    assert exporter.flush() == "https://docs.google.com/document/d/new-doc/edit"
+    assert exporter.flush() is None  # Nothing left to write
+    assert calls == Counter({"drive.list": 1, "docs.create": 1, "docs.batchUpdate": 1})
+    (_, requests), = docs.inserted
+    text = requests[0]["insertText"]["text"]
+    # Newest report first, at the top of the document
+    assert text.index("Gamma") < text.index("Beta") < text.index("Alpha")
+    assert exporter.api_calls == 3
+    assert exporter.reports_exported == 3
+
+def test_flush_threshold_adds_one_batch_update_per_batch():
+    calls = Counter()
+    exporter = GDocsExporter("ESG", batch_size=4, docs_service=FakeDocs(calls), drive_service=FakeDrive(calls))
+    links = [exporter.add(report(f"Company{i}")) for i in range(10)]
+    assert sum(link is not None for link in links) == 2
+    assert (calls["docs.batchUpdate"], exporter.pending) == (2, 2)
+    exporter.flush()
+    assert calls["docs.batchUpdate"] == 3
+    assert calls["drive.list"] == 1
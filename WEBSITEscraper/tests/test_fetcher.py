@@ -0,0 +1,35 @@
+import asyncio
+
+from benchmarks.site import make_pdf
+from src.core.fetcher import fetch_tier, needs_browser
+from src.pipeline.pdf import get_pdf_text, shutdown_pdf_pool
+
+PAGE = "<html><body><h1>Sustainability</h1><p>" + "Scope 1 emissions fell. " * 20 + "</p></body></html>"
+
+def test_needs_browser():
+    assert needs_browser("")
+    assert needs_browser('<html><body><div id="root"></div><script src="a.js"></script></body></html>')
+    assert not needs_browser(PAGE)
+
+def test_pdf_is_downloaded_once(serve):
+    pdf = make_pdf([["Scope 1 emissions page one"], ["Scope 2 emissions page two"]])
+
+    async def scenario():
+        runner, base, hits = await serve({"/page": (PAGE, "text/html"), "/report.pdf": (pdf, "application/pdf")})
+        try:
+            page = await fetch_tier.try_http(f"{base}/page")
+            result = await fetch_tier.try_http(f"{base}/report.pdf")
+            text = await get_pdf_text(result.url, downloaded=(result.path, result.temporary))
+        finally:
+            await fetch_tier.close()
+            await runner.cleanup()
+        return page, result, text, hits
+
+    try:
+        page, result, text, hits = asyncio.run(scenario())
+    finally:
+        shutdown_pdf_pool()
+    assert "Sustainability" in page.content
+    assert result.path is not None and result.path.exists()
+    assert "Scope 2 emissions page two" in text
+    assert hits == ["/page", "/report.pdf"]
@@ -0,0 +1,277 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from src.core.config import settings
+from src.core.fetcher import fetch_tier
+from src.core.metrics import metrics
+from src.engine import crawler as crawler_module
+from src.engine.crawler import Crawler
+from src.engine.frontier import Frontier
+from src.engine import shared_frontier
+from src.engine.shared_frontier import RedisFrontierBackend, SharedFrontier, SqliteFrontierBackend
+
+def test_local_frontier_is_best_first():
+    async def scenario():
+        frontier = Frontier()
+        frontier.push("https://example.com/low", 1, 0.1)
+        frontier.push("https://example.com/high", 1, 0.9)
+        frontier.push("https://example.com/tie", 2, 0.1)
+        order = []
+        while len(frontier):
+            url, _, priority = await frontier.pop()
+            order.append((url, priority))
+            frontier.done(url)
+        await frontier.join()
+        return order
+
+    assert asyncio.run(scenario()) == [
+        ("https://example.com/high", 0.9), ("https://example.com/low", 0.1), ("https://example.com/tie", 0.1),
+    ]
+
+def test_sqlite_lease_ack_release(tmp_path):
+    backend = SqliteFrontierBackend(str(tmp_path / "frontier.db"))
+    items = [(f"https://example.com/{i}", 1, float(i)) for i in range(5)]
+    assert backend.add("c1", items) == 5
+    assert backend.add("c1", items[:2]) == 0  # Seen before
+    assert backend.add("c2", items[:1]) == 1  # Crawls are separate
+
+    first = backend.lease("c1", "worker-a", 2, lease_seconds=60)
+    second = backend.lease("c1", "worker-b", 2, lease_seconds=60)
+    assert first == [("https://example.com/4", 1, 4.0), ("https://example.com/3", 1, 3.0)]
+    assert second == [("https://example.com/2", 1, 2.0), ("https://example.com/1", 1, 1.0)]
+
+    backend.ack("c1", "worker-a", ["https://example.com/4"])
+    backend.release("c1", "worker-a", ["https://example.com/3"])
+    backend.ack("c1", "worker-a", ["https://example.com/2"])  # worker-b's lease
+    assert backend.stats("c1") == {"queued": 2, "leased": 2, "done": 1}
+    assert backend.lease("c1", "worker-c", 1, lease_seconds=60) == [("https://example.com/3", 1, 3.0)]
+    assert backend.unfinished("c1") == 4
+    backend.close()
+
+def test_sqlite_dedupes_on_the_canonical_url(tmp_path):
+    backend = SqliteFrontierBackend(str(tmp_path / "frontier.db"))
+    assert backend.add("c1", [("https://example.com/a/?utm_source=feed", 0, 1.0)]) == 1
+    assert backend.add("c1", [("HTTPS://Example.com:443/a#top", 0, 1.0), ("https://example.com/a", 1, 2.0)]) == 0
+    # The URL is handed out as it was first found
+    assert backend.lease("c1", "worker-a", 5, lease_seconds=60) == [("https://example.com/a/?utm_source=feed", 0, 1.0)]
+    backend.close()
+
+def test_sqlite_expired_lease_is_handed_out_again(tmp_path):
+    backend = SqliteFrontierBackend(str(tmp_path / "frontier.db"))
+    backend.add("c1", [("https://example.com/a", 0, 1.0)])
+    assert backend.lease("c1", "crashed", 1, lease_seconds=0.05) == [("https://example.com/a", 0, 1.0)]
+    assert backend.lease("c1", "worker-b", 1, lease_seconds=60) == []
+    time.sleep(0.1)
+    assert backend.lease("c1", "worker-b", 1, lease_seconds=60) == [("https://example.com/a", 0, 1.0)]
+    backend.close()
+
+def test_held_url_keeps_its_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FRONTIER_LEASE_SECONDS", 0.05)
+    backend = SqliteFrontierBackend(str(tmp_path / "frontier.db"))
+    backend.add("c1", [("https://example.com/a", 0, 1.0), ("https://example.com/b", 0, 0.5)])
+
+    async def scenario():
+        frontier = SharedFrontier(backend, "c1", worker="worker-a")
+        url, _, _ = await frontier.pop()
+        # Waiting out an open circuit, longer than the lease
+        frontier.hold(url, 60)
+        await frontier._sync()
+        return url
+
+    assert asyncio.run(scenario()) == "https://example.com/a"
+    backend.extend("c1", "worker-b", [("https://example.com/b", time.time() + 60)])  # Not worker-b's lease
+    time.sleep(0.1)
+    assert backend.lease("c1", "worker-b", 5, lease_seconds=60) == [("https://example.com/b", 0, 0.5)]
+    backend.close()
+
+def test_page_budget_is_shared_by_all_workers(tmp_path, monkeypatch, serve, make_page):
+    monkeypatch.setattr(settings, "FRONTIER_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "FRONTIER_LEASE_BATCH", 2)
+    routes = {"/": (make_page("Home", [f"/p{i}" for i in range(12)]), "text/html")}
+    routes.update({f"/p{i}": (make_page(f"Page {i}"), "text/html") for i in range(12)})
+    path = str(tmp_path / "frontier.db")
+
+    async def scenario():
+        runner, base, hits = await serve(routes)
+        backends = [SqliteFrontierBackend(path) for _ in range(2)]  # One connection per "process"
+        try:
+            crawlers = [
+                Crawler(None, concurrency=2, max_pages=5, frontier=SharedFrontier(backend, "c1", worker=f"w{i}"))
+                for i, backend in enumerate(backends)
+            ]
+            records = await asyncio.gather(*(crawler.crawl(base + "/") for crawler in crawlers))
+            for crawler in crawlers:
+                crawler.store.close()
+        finally:
+            for backend in backends:
+                backend.close()
+            await fetch_tier.close()
+            await runner.cleanup()
+        return records, hits
+
+    records, hits = asyncio.run(scenario())
+    assert sum(len(r) for r in records) == 5
+    assert len([path for path in hits if path != "/robots.txt"]) == 5
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(shared_frontier.redis, "Redis", fakeredis.FakeRedis)
+    backend = RedisFrontierBackend("redis://localhost:6379/0")
+    backend.client.flushall()
+    yield backend
+    backend.close()
+
+def test_redis_stale_ack_after_requeue(redis_backend):
+    backend = redis_backend
+    backend.add("c1", [("https://example.com/a", 0, 1.0)])
+    assert backend.lease("c1", "worker-a", 1, lease_seconds=0.05) == [("https://example.com/a", 0, 1.0)]
+    time.sleep(0.1)
+    backend.add("c1", [("https://example.com/b", 0, 2.0)])
+    # Puts the expired lease back in the queue and hands out b
+    assert backend.lease("c1", "worker-b", 1, lease_seconds=60) == [("https://example.com/b", 0, 2.0)]
+    backend.extend("c1", "worker-a", [("https://example.com/b", time.time() + 600)])  # Not worker-a's lease
+    backend.ack("c1", "worker-a", ["https://example.com/a", "https://example.com/b"])  # Fetched a late
+    assert backend.stats("c1") == {"queued": 0, "leased": 1, "done": 1}
+    assert backend.lease("c1", "worker-c", 5, lease_seconds=60) == []
+    backend.release("c1", "worker-b", ["https://example.com/b"])
+    assert backend.lease("c1", "worker-c", 5, lease_seconds=60) == [("https://example.com/b", 0, 2.0)]
+
+def test_redis_ack_ignores_a_lease_taken_over(redis_backend):
+    backend = redis_backend
+    backend.add("c1", [("https://example.com/a", 0, 1.0)])
+    backend.lease("c1", "worker-a", 1, lease_seconds=0.05)
+    time.sleep(0.1)
+    assert backend.lease("c1", "worker-b", 1, lease_seconds=0.05) == [("https://example.com/a", 0, 1.0)]
+    backend.ack("c1", "worker-a", ["https://example.com/a"])
+    backend.extend("c1", "worker-b", [("https://example.com/a", time.time() + 60)])
+    time.sleep(0.1)
+    assert backend.stats("c1") == {"queued": 0, "leased": 1, "done": 0}
+    assert backend.lease("c1", "worker-c", 1, lease_seconds=60) == []  # Extended by its owner
+    backend.ack("c1", "worker-b", ["https://example.com/a"])
+    assert backend.unfinished("c1") == 0
+
+def test_redis_page_budget(redis_backend):
+    assert [redis_backend.claim("c1", 2) for _ in range(3)] == [True, True, False]
+    assert redis_backend.claim("c2", 2)
+
+class RecordingFrontier(Frontier):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def hold(self, url, seconds):
+        self.calls.append(("hold", url, seconds))
+
+    def requeue(self, url, depth, priority=0.0):
+        self.calls.append(("requeue", url, depth, priority))
+        super().requeue(url, depth, priority)
+
+def test_retry_keeps_the_queued_priority():
+    async def scenario():
+        frontier = RecordingFrontier()
+        crawler = Crawler(None, frontier=frontier)
+        crawler._requeued = asyncio.Event()
+        crawler._retry_later("https://example.com/report", 2, 0.75, 0.01)
+        await crawler._requeued.wait()
+        crawler.store.close()
+        return frontier.calls, await frontier.pop()
+
+    calls, popped = asyncio.run(scenario())
+    assert calls == [("hold", "https://example.com/report", 0.01), ("requeue", "https://example.com/report", 2, 0.75)]
+    assert popped == ("https://example.com/report", 2, 0.75)
+
+def test_budget_stop_leaves_unfetched_urls_queued(tmp_path, monkeypatch, serve, make_page):
+    monkeypatch.setattr(settings, "FRONTIER_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "FRONTIER_LEASE_BATCH", 4)
+    routes = {"/": (make_page("Home", [f"/p{i}" for i in range(8)]), "text/html")}
+    routes.update({f"/p{i}": (make_page(f"Page {i}"), "text/html") for i in range(8)})
+    backend = SqliteFrontierBackend(str(tmp_path / "frontier.db"))
+
+    async def scenario():
+        runner, base, hits = await serve(routes)
+        try:
+            crawler = Crawler(None, concurrency=4, max_pages=3, frontier=SharedFrontier(backend, "c1"))
+            records = await crawler.crawl(base + "/")
+            crawler.store.close()
+        finally:
+            await fetch_tier.close()
+            await runner.cleanup()
+        return records, hits
+
+    records, hits = asyncio.run(scenario())
+    stats = backend.stats("c1")
+    backend.close()
+    assert len(records) == 3
+    # Only what was fetched is done; whatever this process had leased went back to the queue
+    assert stats == {"queued": 6, "leased": 0, "done": len(hits)}
+
+class HttpPage:
+    """Stands in for a browser page, loading URLs with a plain HTTP client."""
+    def __init__(self, session):
+        self.session = session
+        self.url = ""
+        self.html = ""
+
+    async def goto(self, url, timeout, wait_until):
+        async with self.session.get(url) as response:
+            self.url = url
+            self.html = await response.text()
+            return SimpleNamespace(status=response.status, headers={"content-type": response.content_type})
+
+    async def content(self):
+        return self.html
+
+class HttpPagePool:
+    def __init__(self, browser_manager, size=None, blocker=None):
+        self.session = None
+
+    async def start(self):
+        self.session = aiohttp.ClientSession()
+
+    @asynccontextmanager
+    async def page(self):
+        yield HttpPage(self.session)
+
+    async def close(self):
+        await self.session.close()
+
+    def summary(self):
+        return "HTTP page pool"
+
+def test_server_errors_are_retried_until_the_page_loads(monkeypatch, serve, make_page):
+    # Browser only, so each attempt is one request
+    monkeypatch.setattr(settings, "HTTP_FIRST", False)
+    monkeypatch.setattr(settings, "RETRY_DELAY_BASE", 0.01)
+    monkeypatch.setattr(crawler_module, "PagePool", HttpPagePool)
+    failures = [503, 503]
+
+    async def flaky(request):
+        if request.path != "/p":
+            return web.Response(status=404)
+        if failures:
+            return web.Response(status=failures.pop(0))
+        return web.Response(text=make_page("Report"), content_type="text/html")
+
+    async def scenario():
+        metrics.reset()
+        runner, base, hits = await serve(flaky)
+        try:
+            crawler = Crawler(None, concurrency=2)
+            records = await asyncio.wait_for(crawler.crawl(base + "/p"), timeout=30)
+            crawler.store.close()
+        finally:
+            await fetch_tier.close()
+            await runner.cleanup()
+        return [record.url for record in records], hits, base
+
+    urls, hits, base = asyncio.run(scenario())
+    assert hits.count("/p") == 3
+    assert urls == [base + "/p"]
+    assert metrics.counters["crawl.retries"] == 2
@@ -0,0 +1,59 @@
+import pytest
+
+from benchmarks.site import SyntheticSite
+from src.pipeline.parsing import LxmlBackend, ParsedPage, SoupBackend, lxml
+
+pytestmark = pytest.mark.skipif(lxml is None, reason="lxml is not installed")
+
+BASE = "https://example.com/sustainability/"
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>ESG</title><style>body{color:red}</style><script>var x = "<h1>no</h1>";</script></head>
+<body>
+<header><a href="/">Home</a></header>
+<nav><a href="/about/">About</a></nav>
+<main>
+<p>Intro text before any heading.</p>
+<h1>Climate <small>2024</small></h1>
+<p>Scope 1 emissions fell by <b>12%</b>.</p>
+<p>See the <a href="report.pdf#page=3" class="download primary">full  report</a>.</p>
+<h2>Water</h2>
+<ul><li>Withdrawal: 40 ML</li><li>Discharge: 30 ML</li></ul>
+<noscript>Enable JavaScript</noscript>
+<a href="javascript:void(0)">Menu</a><a href="mailto:esg@example.com">Mail</a>
+<h3>Targets</h3>
+<table><tr><td>2030</td><td>Net zero</td></tr></table>
+</main>
+<footer>Copyright</footer>
+</body></html>"""
+
+def both(html: str, base_url: str = BASE) -> tuple[ParsedPage, ParsedPage]:
+    return LxmlBackend().parse(html, base_url), SoupBackend().parse(html, base_url)
+
+def test_backends_agree_on_sections_and_links():
+    fast, slow = both(PAGE)
+    assert fast.sections == slow.sections
+    assert fast.links == slow.links
+    assert [(s.heading, s.level) for s in fast.sections] == [("", 0), ("Climate 2024", 1), ("Water", 2), ("Targets", 3)]
+    assert "12%" in fast.sections[1].text
+    assert "Enable JavaScript" not in fast.text and "Copyright" not in fast.text
+    assert [link.url for link in fast.links] == [
+        "https://example.com/", "https://example.com/about/", "https://example.com/sustainability/report.pdf",
+    ]
+    assert fast.links[2].text == "full report"
+    assert fast.links[2].classes == "download primary"
+
+def test_markdown_keeps_heading_levels():
+    lines = LxmlBackend().parse(PAGE).to_markdown().splitlines()
+    assert [line for line in lines if line.startswith("#")] == ["# Climate 2024", "## Water", "### Targets"]
+
+def test_empty_documents():
+    for page in both(""):
+        assert page.sections == [] and page.links == []
+
+def test_backends_agree_on_generated_site():
+    site = SyntheticSite(pages=40, pdfs=2, pdf_pages=1)
+    for path, html in site.pages.items():
+        fast, slow = both(html, f"https://example.com{path}")
+        assert fast.links == slow.links, path
+        assert fast.text.split() == slow.text.split(), path
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from src.core.scheduler import HostScheduler, TokenBucket
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_bucket_allows_burst_then_spaces_requests():
+    async def scenario():
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        return [bucket.reserve() for _ in range(5)]
+
+    waits = run(scenario())
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.5, abs=1e-3)
+    assert waits[4] == pytest.approx(1.0, abs=1e-3)
+
+def test_bucket_refills_up_to_capacity():
+    async def scenario():
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        bucket.reserve()
+        bucket.reserve()
+        bucket.updated -= 10  # Ten idle seconds
+        return [bucket.reserve(), bucket.reserve()], bucket.reserve()
+
+    waits, third = run(scenario())
+    assert waits == [0.0, 0.0]
+    assert third == pytest.approx(1.0, abs=1e-3)
+
+def test_acquire_paces_each_host_independently():
+    scheduler = HostScheduler(rate=10.0, burst=1, jitter=0.0, respect_crawl_delay=False)
+
+    async def scenario():
+        first = await asyncio.gather(scheduler.acquire("https://a.example/1"),
+                                     scheduler.acquire("https://b.example/1"))
+        second = await scheduler.acquire("https://a.example/2")
+        return first, second
+
+    first, second = run(scenario())
+    assert first == [pytest.approx(0.0, abs=0.02)] * 2
+    assert second == pytest.approx(0.1, abs=0.05)
+    report = scheduler.report()
+    assert report["a.example"].requests == 2
+    assert report["b.example"].requests == 1
+
+def test_host_of_ignores_case():
+    assert HostScheduler.host_of("https://Example.COM:8080/Path") == "example.com:8080"
@@ -0,0 +1,49 @@
+import asyncio
+
+from src.core.config import settings
+from src.scrapers.efrag_scraper import scrape_efrag
+
+PAGES = {
+    "https://www.efrag.org/en/sustainability-reporting":
+        '<h1>Sustainability reporting</h1><p>Overview.</p><a href="/en/esrs">ESRS standards</a><a href="/en/news">News</a>',
+    "https://www.efrag.org/en/esrs": "<h1>ESRS</h1><p>European Sustainability Reporting Standards.</p>",
+}
+
+class FakeResponse:
+    status = 200
+    headers = {"content-type": "text/html"}
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = ""
+
+    async def goto(self, url, timeout, wait_until):
+        self.url = url
+        self.context.visited.append(url)
+        return FakeResponse()
+
+    async def content(self):
+        return f"<html><body>{PAGES[self.url]}</body></html>"
+
+    async def close(self):
+        self.context.open_pages -= 1
+
+class FakeContext:
+    """Stands in for a Playwright BrowserContext."""
+    def __init__(self):
+        self.visited = []
+        self.open_pages = 0
+
+    async def new_page(self):
+        self.open_pages += 1
+        return FakePage(self)
+
+def test_scrape_functions_still_accept_a_browser_context(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_FIRST", False)
+    context = FakeContext()
+    text = asyncio.run(scrape_efrag(context))
+    assert context.visited == list(PAGES)
+    assert context.open_pages == 0  # Temporary pages are closed again
+    assert "--- PAGE: ESRS standards (https://www.efrag.org/en/esrs) ---" in text
+    assert "European Sustainability Reporting Standards." in text
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from src.core.config import settings
+from src.core.fetcher import fetch_tier
+from src.engine.sitemap import RecrawlState, SitemapDiscovery
+
+DAY = 86400
+
+def urlset(entries) -> str:
+    body = "".join(
+        f"<url><loc>{url}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</url>" for url, lastmod in entries
+    )
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{body}</urlset>'
+
+def test_state_lookups_are_batched(tmp_path):
+    state = RecrawlState(str(tmp_path / "recrawl.db"))
+    for i in range(0, 1200, 2):
+        state.crawled(f"https://example.com/{i}", None, None)
+    state.flush()
+    found = state.get_many(f"https://example.com/{i}" for i in range(1200))
+    assert len(found) == 600
+    assert set(found) == {f"https://example.com/{i}" for i in range(0, 1200, 2)}
+    assert found["https://example.com/0"] == state.get("https://example.com/0")
+    state.close()
+
+def test_state_writes_from_a_thread_on_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHECKPOINT_BATCH", 10)
+    state = RecrawlState(str(tmp_path / "recrawl.db"))
+
+    async def main():
+        for i in range(25):
+            state.crawled(f"https://example.com/{i}", None, None)
+        flushing = state._flushing
+        await state.aclose()
+        return flushing
+
+    assert asyncio.run(main()) is not None  # A full batch went to a thread, not written inline
+    assert len(state.get_many(f"https://example.com/{i}" for i in range(25))) == 25
+    state.close()
+
+def test_unchanged_child_sitemap_still_refreshes_old_urls(serve):
+    routes = {}  # Filled in once the server's port is known
+
+    async def handle(request):
+        if request.path not in routes:
+            return web.Response(status=404)
+        body, content_type = routes[request.path]
+        return web.Response(text=body, content_type=content_type)
+
+    async def main():
+        runner, base, hits = await serve(handle)
+        sitemap = f"{base}/sm.xml"
+        routes["/robots.txt"] = (f"Sitemap: {base}/index.xml\n", "text/plain")
+        routes["/index.xml"] = (
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"<sitemap><loc>{sitemap}</loc><lastmod>2024-01-01</lastmod></sitemap></sitemapindex>",
+            "application/xml",
+        )
+        routes["/sm.xml"] = (urlset([]), "application/xml")
+
+        # A previous run crawled everything the child sitemap listed
+        state = RecrawlState()
+        now = time.time()
+        state._pending = [
+            ("url", f"{base}/stale", now - 30 * DAY, None, sitemap),
+            ("url", f"{base}/fresh", now - DAY, None, sitemap),
+            ("url", f"{base}/dated", now - 30 * DAY, now - 60 * DAY, sitemap),
+        ]
+        state.sitemap_done(sitemap, now - 400 * DAY)
+        state.flush()
+
+        discovery = SitemapDiscovery(state)
+        found = {url: changed async for url, changed in discovery.discover(base)}
+        await fetch_tier.close()
+        await runner.cleanup()
+        await discovery.finish()
+        return found, hits, discovery.stats, base
+
+    found, hits, stats, base = asyncio.run(main())
+    assert "/sm.xml" not in hits
+    # Only the URL without <lastmod> that is older than SITEMAP_REFRESH_DAYS is due
+    assert found == {f"{base}/stale": True, f"{base}/fresh": False, f"{base}/dated": False}
+    assert (stats["sitemaps skipped"], stats["changed"], stats["unchanged"]) == (1, 1, 2)
+
+def test_sitemap_download_may_outlast_the_page_timeout(serve, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_TIMEOUT", 0.5)
+    entries = [(f"https://example.com/{i}", "2024-01-01") for i in range(200)]
+    body = urlset(entries).encode()
+
+    async def slow(request):
+        # Steady trickle: no read stalls for HTTP_TIMEOUT, but longer than it in total
+        response = web.StreamResponse(headers={"Content-Type": "application/xml"})
+        await response.prepare(request)
+        step = len(body) // 6 + 1
+        for start in range(0, len(body), step):
+            await response.write(body[start:start + step])
+            await asyncio.sleep(0.2)
+        await response.write_eof()
+        return response
+
+    async def main():
+        runner, base, _ = await serve(slow)
+        discovery = SitemapDiscovery(RecrawlState())
+        chunks = [chunk async for chunk in discovery._stream(f"{base}/sitemap.xml")]
+        await fetch_tier.close()
+        await runner.cleanup()
+        await discovery.finish()
+        return b"".join(chunks)
+
+    assert asyncio.run(main()) == body
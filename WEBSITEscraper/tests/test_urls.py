@@ -0,0 +1,56 @@
+import pytest
+
+from src.core.config import settings
+from src.engine import urls
+from src.engine.urls import BloomFilter, VisitedSet, canonicalize_url, url_fingerprint
+
+@pytest.mark.parametrize("url, canonical", [
+    ("HTTPS://Example.COM/About", "https://example.com/About"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("https://example.com/a#section", "https://example.com/a"),
+    ("https://example.com/a/./b/../c", "https://example.com/a/c"),
+    ("https://example.com//a//b/", "https://example.com/a/b"),
+    ("https://example.com/reports/index.html", "https://example.com/reports"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/%7euser/%2f", "https://example.com/~user/%2F"),
+    ("https://example.com/a;jsessionid=ABC123?x=1", "https://example.com/a?x=1"),
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&utm_medium=y&gclid=z&fbclid=w&mc_cid=v", "https://example.com/a"),
+    ("https://example.com/a?pk_campaign=x&id=7", "https://example.com/a?id=7"),
+])
+def test_canonicalize_url(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+def test_generic_parameters_are_kept():
+    # These select content on some sites (e.g. ?source=annual-report)
+    url = "https://example.com/a?ref=main&sid=3&source=annual"
+    assert canonicalize_url(url) == "https://example.com/a?ref=main&sid=3&source=annual"
+
+def test_configured_parameters(monkeypatch):
+    monkeypatch.setattr(settings, "URL_STRIP_PARAMS", ["ref"])
+    monkeypatch.setattr(settings, "URL_HOST_RULES", {
+        "example.com": {"strip_params": ["lang"], "keep_params": ["utm_source"], "lowercase_path": True, "drop_www": True},
+    })
+    monkeypatch.setattr(urls, "_rules", None)
+    assert canonicalize_url("https://www.Example.com/News?lang=en&ref=x&utm_source=feed") == "https://example.com/news?utm_source=feed"
+    assert canonicalize_url("https://other.org/News?lang=en&ref=x") == "https://other.org/News?lang=en"
+
+def test_visited_set_counts_variants_and_repeats():
+    visited = VisitedSet("exact")
+    assert visited.add("https://example.com/a")
+    assert not visited.add("https://example.com/a#top")  # Fragments are never fetched, so a repeat
+    assert not visited.add("https://EXAMPLE.com/a?utm_source=x")
+    assert not visited.add("https://example.com/a")
+    assert "https://example.com/a/" in visited
+    assert "https://example.com/b" not in visited
+    assert (len(visited), visited.variants_avoided, visited.repeats_avoided) == (1, 1, 2)
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    fingerprints = [url_fingerprint(f"https://example.com/{i}") for i in range(1000)]
+    assert all(bloom.add(f) for f in fingerprints[:500])
+    assert all(f in bloom for f in fingerprints[:500])
+    false_positives = sum(f in bloom for f in fingerprints[500:])
+    assert false_positives < 25